@@ -1,17 +1,34 @@
 # File: ai-service/app.py
-from flask import Flask, request, jsonify
+import time
+_init_started = time.perf_counter()
+
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
+import json
+import tempfile
 import traceback
 import logging
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from models.cycle_predictor import AdvancedCyclePredictor
 from models.symptom_analyzer import AdvancedSymptomAnalyzer
 from models.health_tracker import AdvancedHealthTracker
 from models.recommender import AdvancedRecommenderSystem
-import numpy as np
+from models.batch_predictor import BatchCyclePredictor
+from models.analysis_context import AnalysisContext
+from models.population_model import PopulationCycleModel, estimate_model_bytes
+from models.lazy_imports import lazy_load_report
+from services.cache import LRUCache, payload_fingerprint
+from services.coalescing import SingleFlight
+from services.encoding import NumpyEncoder
+from services.profiling import PROFILE_HEADER, StackProfiler, profiling_requested
+from services.metrics import (REGISTRY, REQUEST_LATENCY, REQUEST_ERRORS, STAGE_LATENCY,
+                              cache_collector, observe_payload, single_flight_collector)
+from services.pipeline import AnalysisPipeline, analysis_result, calculate_user_engagement
+from services.state_store import UserStateStore
 
 load_dotenv()
 
@@ -22,11 +39,104 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)
 
+def load_population_model():
+    """Load the offline-trained cycle model, if one is configured"""
+    path = os.getenv('CYCLE_MODEL_PATH', os.path.join('models', 'artifacts', 'cycle_population.joblib'))
+    if not os.path.exists(path):
+        logger.warning(f"No cycle model at {path}; ML ensemble will fit per request")
+        return None
+
+    try:
+        model = PopulationCycleModel.load(path)
+        logger.info(f"Loaded cycle model {model.version} from {path}")
+        return model
+    except Exception as e:
+        logger.error(f"Could not load cycle model from {path}: {str(e)}")
+        return None
+
+# CYCLE_ML_MODE=per_request keeps the old fit-per-request ensemble for comparison
+CYCLE_ML_MODE = os.getenv('CYCLE_ML_MODE', 'pretrained').lower()
+
+# Per-user estimators fitted in per-request mode, keyed by userId and a
+# fingerprint of the training rows, bounded by estimated model size
+model_cache = LRUCache(
+    max_entries=int(os.getenv('MODEL_CACHE_MAX_ENTRIES', 512)),
+    max_bytes=int(os.getenv('MODEL_CACHE_MAX_BYTES', 128 * 1024 * 1024)),
+    ttl_seconds=float(os.getenv('MODEL_CACHE_TTL_SECONDS', 24 * 3600)),
+    sizeof=estimate_model_bytes
+)
+
 # Initialize enhanced AI models
-cycle_predictor = AdvancedCyclePredictor()
-symptom_analyzer = AdvancedSymptomAnalyzer()
+cycle_predictor = AdvancedCyclePredictor(
+    population_model=load_population_model() if CYCLE_ML_MODE == 'pretrained' else None,
+    ml_mode=CYCLE_ML_MODE,
+    model_cache=model_cache
+)
+# SYMPTOM_CLUSTER_MODE=fast clusters symptom days with one k-means++ init,
+# warm-started from each user's last centroids (mini-batch for long histories)
+centroid_cache = LRUCache(
+    max_entries=int(os.getenv('CENTROID_CACHE_MAX_ENTRIES', 10000)),
+    max_bytes=None,
+    ttl_seconds=float(os.getenv('CENTROID_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+)
+symptom_analyzer = AdvancedSymptomAnalyzer(
+    cluster_mode=os.getenv('SYMPTOM_CLUSTER_MODE', 'full').lower(),
+    centroid_cache=centroid_cache
+)
 health_tracker = AdvancedHealthTracker()
 recommender = AdvancedRecommenderSystem()
+batch_predictor = BatchCyclePredictor(cycle_predictor)
+
+# Encoded /analyze responses keyed by payload hash. The TTL keeps
+# date-relative fields such as daysSinceLastLog from going stale.
+response_cache = LRUCache(
+    max_entries=int(os.getenv('ANALYZE_CACHE_MAX_ENTRIES', 1024)),
+    max_bytes=int(os.getenv('ANALYZE_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+    ttl_seconds=float(os.getenv('ANALYZE_CACHE_TTL_SECONDS', 900))
+)
+
+# Individual stage results keyed by the inputs each stage reads, so a new
+# symptom log does not recompute the cycle-only stages
+stage_cache = LRUCache(
+    max_entries=int(os.getenv('STAGE_CACHE_MAX_ENTRIES', 4096)),
+    max_bytes=None,
+    ttl_seconds=float(os.getenv('STAGE_CACHE_TTL_SECONDS', 900))
+)
+# ANALYZE_EXECUTOR=threads runs the independent stages concurrently
+stage_executor = None
+if os.getenv('ANALYZE_EXECUTOR', 'serial').lower() == 'threads':
+    stage_executor = ThreadPoolExecutor(
+        max_workers=int(os.getenv('ANALYZE_MAX_WORKERS', 4)),
+        thread_name_prefix='analyze-stage'
+    )
+
+analysis_pipeline = AnalysisPipeline(
+    cycle_predictor, symptom_analyzer, health_tracker, recommender,
+    stage_cache=stage_cache,
+    executor=stage_executor
+)
+
+# Concurrent /analyze calls with the same payload share one computation;
+# a follower waiting longer than the timeout computes on its own
+analyze_flights = SingleFlight(
+    follower_timeout=float(os.getenv('ANALYZE_COALESCE_TIMEOUT_SECONDS', 10))
+)
+
+# Running per-user statistics for the incremental endpoints
+user_states = UserStateStore(max_users=int(os.getenv('USER_STATE_MAX_USERS', 10000)))
+
+REGISTRY.add_collector(cache_collector({
+    'responses': response_cache,
+    'stages': stage_cache,
+    'models': model_cache,
+    'centroids': centroid_cache,
+    'userStates': user_states
+}))
+REGISTRY.add_collector(single_flight_collector({'analyze': analyze_flights}))
+
+# pandas, scipy and scikit-learn load on first use; see lazyImports in /health
+APP_INIT_SECONDS = time.perf_counter() - _init_started
+logger.info(f"AI service initialized in {APP_INIT_SECONDS:.3f}s")
 
 # Add this route to your app.py
 @app.route('/')
@@ -39,9 +149,12 @@ def home():
             'health': '/health',
             'predict': '/predict',
             'analyze': '/analyze',
+            'analyze-batch': '/analyze/batch',
+            'anomaly-incremental': '/anomaly/incremental',
             'symptom-prediction': '/symptom-prediction',
             'health-analysis': '/health-analysis',
-            'cycle-insights': '/cycle-insights'
+            'cycle-insights': '/cycle-insights',
+            'metrics': '/metrics'
         },
         'documentation': 'See /health for more details'
     })
@@ -53,6 +166,7 @@ def handle_errors(f):
         try:
             return f(*args, **kwargs)
         except Exception as e:
+            REQUEST_ERRORS.inc(endpoint=f.__name__, exception=type(e).__name__)
             logger.error(f"Error in {f.__name__}: {str(e)}")
             logger.error(traceback.format_exc())
             return jsonify({
@@ -62,6 +176,63 @@ def handle_errors(f):
             }), 500
     return decorated_function
 
+# Opt-in profiling: send X-Profile-Token matching PROFILE_SECRET
+PROFILE_SECRET = os.getenv('PROFILE_SECRET')
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'solaris-profiles'))
+PROFILE_TOP_FUNCTIONS = int(os.getenv('PROFILE_TOP_FUNCTIONS', 25))
+
+def profiled(f):
+    """
+    Run the handler under StackProfiler when the request asks for it
+
+    The top cumulative functions are added to the JSON response under
+    'profile'; the report and collapsed stacks are written to PROFILE_DIR.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not profiling_requested(request.headers.get(PROFILE_HEADER), PROFILE_SECRET):
+            return f(*args, **kwargs)
+        
+        g.profiling = True
+        with StackProfiler() as profiler:
+            response = app.make_response(f(*args, **kwargs))
+        
+        profile = profiler.report(PROFILE_TOP_FUNCTIONS)
+        try:
+            profile['files'] = profiler.save(PROFILE_DIR, f.__name__, PROFILE_TOP_FUNCTIONS)
+        except OSError as e:
+            logger.error(f"Could not write profile to {PROFILE_DIR}: {str(e)}")
+        logger.info(f"Profiled {f.__name__} in {profile['elapsedMs']}ms: {profile.get('files')}")
+        
+        body = response.get_json(silent=True)
+        if isinstance(body, dict):
+            body['profile'] = profile
+            response.set_data(json.dumps(body, cls=NumpyEncoder))
+        response.headers['X-Profile-Elapsed-Ms'] = str(profile['elapsedMs'])
+        return response
+    return decorated_function
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Latency and payload-size metrics for every request"""
+    endpoint = request.endpoint or 'unmatched'
+    started = g.get('request_started')
+    if started is not None:
+        REQUEST_LATENCY.observe(time.perf_counter() - started,
+                                endpoint=endpoint, status=response.status_code)
+    if request.is_json:
+        observe_payload(endpoint, request.get_json(silent=True))
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text exposition of request, stage and cache metrics"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Enhanced health check with model status"""
@@ -81,11 +252,31 @@ def health_check():
             'symptom_analyzer': 'AdvancedSymptomAnalyzer v3.0',
             'health_tracker': 'AdvancedHealthTracker v3.0',
             'recommender': 'AdvancedRecommenderSystem v3.0'
+        },
+        'startup': {
+            'appInitSeconds': round(APP_INIT_SECONDS, 4),
+            'lazyImports': lazy_load_report()
+        },
+        'cycleModel': {
+            'mode': cycle_predictor.ml_mode,
+            'loaded': cycle_predictor.population_model is not None,
+            **(cycle_predictor.population_model.metadata if cycle_predictor.population_model else {})
+        },
+        'cache': {
+            'responses': response_cache.stats(),
+            'stages': stage_cache.stats(),
+            'models': model_cache.stats(),
+            'centroids': centroid_cache.stats(),
+            'userStates': user_states.stats()
+        },
+        'coalescing': {
+            'analyze': analyze_flights.stats()
         }
     })
 
 @app.route('/predict', methods=['POST'])
 @handle_errors
+@profiled
 def predict_cycle():
     """
     ML-enhanced cycle prediction
@@ -93,16 +284,26 @@ def predict_cycle():
     data = request.json
     cycles = data.get('cycles', [])
     health_metrics = data.get('healthMetrics')
+    engine = data.get('engine', 'ensemble')
     
     if not cycles:
         return jsonify({'error': 'No cycle data provided'}), 400
+    if engine not in cycle_predictor.ENGINES:
+        return jsonify({'error': f"engine must be one of {list(cycle_predictor.ENGINES)}"}), 400
     
-    prediction = cycle_predictor.predict_next_period(cycles, health_metrics)
+    context = _analysis_context(cycles, health_metrics=health_metrics, user_id=data.get('userId'))
+    try:
+        posterior = _cycle_posterior(context) if engine == 'bayesian' else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    prediction = cycle_predictor.predict_next_period(cycles, health_metrics, context=context,
+                                                     engine=engine, posterior=posterior)
     
     return jsonify(prediction)
 
 @app.route('/analyze', methods=['POST'])
 @handle_errors
+@profiled
 def comprehensive_analysis():
     """
     Complete AI-powered analysis with all enhancements
@@ -112,112 +313,188 @@ def comprehensive_analysis():
     cycles = data.get('cycles', [])
     symptoms = data.get('symptoms', [])
     health_metrics = data.get('healthMetrics')
+    engine = data.get('engine', 'ensemble')
     
     if not cycles:
         return jsonify({
             'hasData': False,
             'message': 'No cycle data to analyze'
         }), 200
+    if engine not in cycle_predictor.ENGINES:
+        return jsonify({'error': f"engine must be one of {list(cycle_predictor.ENGINES)}"}), 400
+    
+    # sections=prediction,anomaly runs only those stages and their dependencies
+    try:
+        sections = AnalysisPipeline.parse_sections(data.get('sections'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # 1. Advanced cycle prediction
-    prediction = cycle_predictor.predict_next_period(cycles, health_metrics)
+    # Profiled requests recompute every stage on this thread
+    profiling = g.get('profiling', False)
     
-    # 2. Enhanced anomaly detection
-    anomaly = cycle_predictor.detect_anomaly(cycles)
+    # Identical payloads skip every stage until the entry expires
+    cache_key = payload_fingerprint(user_id, cycles, symptoms, health_metrics, engine, sections)
+    cached_body = response_cache.get(cache_key) if not profiling else None
+    if cached_body is not None:
+        return _json_response(cached_body, cache_status='HIT')
     
-    # 3. Comprehensive cycle insights
-    cycle_insights = cycle_predictor.get_detailed_insights(cycles)
+    # Parse the payload once for every stage; only an invalid cycle history
+    # is the client's error, failures inside the stages are 500s
+    context = _analysis_context(cycles, symptoms, health_metrics, user_id=user_id)
+    try:
+        posterior = _cycle_posterior(context) if engine == 'bayesian' else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # 4. Advanced symptom analysis
-    symptom_insights = None
-    if symptoms and len(symptoms) >= 5:
-        symptom_insights = symptom_analyzer.analyze_patterns(
-            symptoms, cycles, health_metrics
-        )
+    def analyze():
+        # Steps 1-9, reusing cached stages whose inputs are unchanged
+        stages = analysis_pipeline.run(context, serial=profiling, use_cache=not profiling,
+                                       engine=engine, posterior=posterior, sections=sections)
+        logger.debug(f"Analyze stage timings for {user_id}: {stages['timings']}")
+        for stage, stage_ms in stages['timings']['stagesMs'].items():
+            STAGE_LATENCY.observe(stage_ms / 1000, stage=stage)
+        
+        # Comprehensive result
+        result = analysis_result(user_id, context, stages, sections)
+        
+        encode_started = time.perf_counter()
+        body = json.dumps(result, cls=NumpyEncoder)
+        STAGE_LATENCY.observe(time.perf_counter() - encode_started, stage='jsonEncoding')
+        response_cache.put(cache_key, body)
+        return body
+    
+    # Concurrent identical payloads wait for the first one's result
+    if profiling:
+        body, shared = analyze(), False
+    else:
+        body, shared = analyze_flights.do(cache_key, analyze)
+    
+    return _json_response(body, cache_status='COALESCED' if shared else 'MISS')
+
+@app.route('/analyze/batch', methods=['POST'])
+@handle_errors
+def batch_analysis():
+    """
+    Vectorized prediction, anomaly detection and recommendations for many users
+
+    Expects {"users": [{userId, cycles, symptoms, healthMetrics}, ...]} and
+    returns results keyed by userId.
+    """
+    data = request.json
+    users = data.get('users', [])
+    
+    if not users:
+        return jsonify({'error': 'No users provided'}), 400
+    
+    started = time.perf_counter()
+    
+    results = {}
+    analyzable = []
+    for index, user in enumerate(users):
+        user_id = user.get('userId', str(index))
+        if user.get('cycles'):
+            analyzable.append((user_id, user))
+        else:
+            results[user_id] = {
+                'hasData': False,
+                'message': 'No cycle data to analyze'
+            }
+    
+    cycles_by_user = [user.get('cycles', []) for _, user in analyzable]
+    health_by_user = [user.get('healthMetrics') for _, user in analyzable]
+    
+    # 1-2. Prediction and anomaly detection over all users at once
+    predictions = batch_predictor.predict_next_period(cycles_by_user, health_by_user)
+    anomalies = batch_predictor.detect_anomaly(cycles_by_user)
     
-    # 5. Health metrics analysis
-    health_insights = None
-    if health_metrics:
-        health_insights = health_tracker.comprehensive_health_analysis(
-            health_metrics, cycles, symptoms
+    # 3. Recommendations, risk and insights per user
+    for (user_id, user), prediction, anomaly in zip(analyzable, predictions, anomalies):
+        cycles = user.get('cycles', [])
+        symptoms = user.get('symptoms', [])
+        user_engagement = calculate_user_engagement(symptoms)
+        
+        recommendations = recommender.generate_comprehensive_recommendations(
+            prediction, anomaly, None, None, user_engagement, cycles
         )
+        results[user_id] = {
+            'userId': user_id,
+            'prediction': prediction,
+            'anomaly': anomaly,
+            'userEngagement': user_engagement,
+            'recommendations': recommendations,
+            'riskAssessment': recommender.assess_overall_risk(anomaly, None, None),
+            'personalizedInsights': recommender.generate_personalized_insights(
+                prediction, anomaly, None, None, recommendations
+            )
+        }
+    
+    elapsed = time.perf_counter() - started
     
-    # 6. User engagement metrics
-    user_engagement = {
-        'daysSinceLastLog': _calculate_days_since_last_log(symptoms),
-        'totalLogs': len(symptoms),
-        'consistencyScore': min(len(symptoms) / 30, 1.0),
-        'trackingStreak': _calculate_tracking_streak(symptoms)
+    result = {
+        'timestamp': datetime.now().isoformat(),
+        'results': results,
+        'metadata': {
+            'usersReceived': len(users),
+            'usersAnalyzed': len(analyzable),
+            'elapsedSeconds': round(elapsed, 4),
+            'usersPerSecond': round(len(users) / elapsed, 1) if elapsed > 0 else None
+        }
     }
     
-    # 7. Advanced recommendations
-    recommendations = recommender.generate_comprehensive_recommendations(
-        prediction,
-        anomaly,
-        symptom_insights,
-        health_insights,
-        user_engagement,
-        cycles
-    )
+    return _json_response(json.dumps(result, cls=NumpyEncoder))
+
+@app.route('/anomaly/incremental', methods=['POST'])
+@handle_errors
+def incremental_anomaly():
+    """
+    Score one new cycle against the user's running cycle statistics
+
+    Send {"userId", "cycles"} to (re)build the statistics from the full
+    history and score its last cycle, then {"userId", "cycleLength"} for each
+    newly logged cycle. "verify": true also recomputes from the full history.
+    """
+    data = request.json or {}
+    user_id = data.get('userId')
+    verify = bool(data.get('verify', False))
     
-    # 8. Risk assessment
-    risk_assessment = recommender.assess_overall_risk(
-        anomaly,
-        symptom_insights,
-        health_insights
-    )
+    if not user_id:
+        return jsonify({'error': 'userId is required'}), 400
     
-    # 9. Personalized insights
-    insights = recommender.generate_personalized_insights(
-        prediction,
-        anomaly,
-        symptom_insights,
-        health_insights,
-        recommendations
-    )
+    try:
+        with user_states.session(user_id) as states:
+            if data.get('cycles'):
+                lengths = AnalysisContext.from_payload(data['cycles']).cycle_lengths
+                if len(lengths) == 0:
+                    return jsonify({'error': 'No cycle lengths provided'}), 400
+                state = cycle_predictor.cycle_length_state(lengths[:-1])
+                states['cycleLengths'] = state
+                new_length = lengths[-1]
+            elif data.get('cycleLength') is not None:
+                state = states.get('cycleLengths')
+                if state is None:
+                    return jsonify({
+                        'error': 'No cycle history for this user; send cycles to initialize'
+                    }), 409
+                new_length = data['cycleLength']
+            else:
+                return jsonify({'error': 'Provide cycles or cycleLength'}), 400
+            
+            anomaly = cycle_predictor.detect_anomaly_incremental(state, new_length, verify=verify)
+            cycles_tracked = state.count
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # Comprehensive result
     result = {
         'userId': user_id,
         'timestamp': datetime.now().isoformat(),
-        'prediction': prediction,
         'anomaly': anomaly,
-        'cycleInsights': cycle_insights,
-        'symptomInsights': symptom_insights,
-        'healthInsights': health_insights,
-        'userEngagement': user_engagement,
-        'recommendations': recommendations,
-        'riskAssessment': risk_assessment,
-        'personalizedInsights': insights,
-        'metadata': {
-            'cyclesAnalyzed': len(cycles),
-            'symptomsAnalyzed': len(symptoms) if symptoms else 0,
-            'hasHealthData': health_metrics is not None,
-            'predictionQuality': prediction.get('predictionQuality') if prediction else None
-        }
+        'cyclesTracked': cycles_tracked
     }
-    
-    import json
-    class NumpyEncoder(json.JSONEncoder):
-        def default(self, obj):
-            if isinstance(obj, np.integer):
-                return int(obj)
-            elif isinstance(obj, np.floating):
-                return float(obj)
-            elif isinstance(obj, np.ndarray):
-                return obj.tolist()
-            elif isinstance(obj, np.bool_):
-                return bool(obj)
-            return super(NumpyEncoder, self).default(obj)
-
-    return app.response_class(
-        response=json.dumps(result, cls=NumpyEncoder),
-        status=200,
-        mimetype='application/json'
-    )
+    return _json_response(json.dumps(result, cls=NumpyEncoder))
 
 @app.route('/symptom-prediction', methods=['POST'])
 @handle_errors
+@profiled
 def predict_symptoms():
     """Advanced symptom prediction"""
     data = request.json
@@ -225,6 +502,11 @@ def predict_symptoms():
     current_cycle_day = data.get('currentCycleDay', 1)
     cycles = data.get('cycles', [])
     
+    # mode=cycle forecasts every day of the upcoming cycle in one call
+    if data.get('mode') == 'cycle':
+        forecast = symptom_analyzer.forecast_cycle(symptoms, cycles, data.get('cycleLength'))
+        return jsonify(forecast)
+    
     prediction = symptom_analyzer.predict_symptom_likelihood(
         symptoms, current_cycle_day, cycles
     )
@@ -282,44 +564,47 @@ def should_prompt_log():
         'priority': 'high' if current_cycle_day <= 5 else 'medium'
     })
 
-def _calculate_days_since_last_log(symptoms):
-    """Calculate days since last symptom log"""
-    if not symptoms:
-        return 999
-    
-    try:
-        last_log = symptoms[0]
-        last_date = datetime.fromisoformat(
-            last_log.get('date', last_log.get('createdAt')).replace('Z', '+00:00')
-        )
-        return (datetime.now() - last_date).days
-    except:
-        return 999
+def _analysis_context(cycles, symptoms=None, health_metrics=None, user_id=None):
+    """
+    Parse a payload, carrying the user's cycle trend statistics between requests
 
-def _calculate_tracking_streak(symptoms):
-    """Calculate current tracking streak"""
-    if not symptoms:
-        return 0
-    
-    try:
-        dates = []
-        for log in symptoms:
-            date_str = log.get('date', log.get('createdAt'))
-            dates.append(datetime.fromisoformat(date_str.replace('Z', '+00:00')).date())
-        
-        dates = sorted(set(dates), reverse=True)
-        streak = 1
-        
-        for i in range(len(dates) - 1):
-            diff = (dates[i] - dates[i+1]).days
-            if diff == 1:
-                streak += 1
-            else:
-                break
-        
-        return streak
-    except:
-        return 0
+    The stored statistics are synced with the payload's cycles (O(1) when
+    one cycle was added) under the user's lock. The context keeps the synced
+    statistics and the store takes a copy for the next request.
+    """
+    if not user_id:
+        return AnalysisContext.from_payload(cycles, symptoms, health_metrics)
+    with user_states.session(user_id) as states:
+        context = AnalysisContext.from_payload(cycles, symptoms, health_metrics, user_id=user_id,
+                                               cycle_trends=states.get('cycleTrends'))
+        states['cycleTrends'] = context.cycle_trends.copy()
+    return context
+
+def _cycle_posterior(context):
+    """
+    The user's cycle-length posterior, synced with this request's cycles
+
+    Posteriors of identified users are kept in user_states, so a request
+    that adds one cycle updates the stored posterior in O(1). A copy is
+    returned, so the prediction never sees a concurrent update.
+    """
+    if not context.user_id:
+        return cycle_predictor.cycle_posterior(context)
+    with user_states.session(context.user_id) as states:
+        posterior = cycle_predictor.cycle_posterior(context, states.get('cyclePosterior'))
+        states['cyclePosterior'] = posterior
+        return posterior.copy()
+
+def _json_response(body, status=200, cache_status=None):
+    """Wrap an already encoded JSON body in a response"""
+    response = app.response_class(
+        response=body,
+        status=status,
+        mimetype='application/json'
+    )
+    if cache_status:
+        response.headers['X-Cache'] = cache_status
+    return response
 
 if __name__ == '__main__':
     port = int(os.getenv('FLASK_PORT', 5000))
@@ -0,0 +1,262 @@
+# File: ai-service/batch_precompute.py
+"""
+Precompute /analyze results for many users offline
+
+Reads user payloads shaped like the /analyze body ({"userId", "cycles",
+"symptoms", "healthMetrics"}) from a JSON Lines file or a directory of
+.jsonl files, analyzes them on a process pool and appends one result line
+per user ({"userId", "result"} or {"userId", "error"}) to the output.
+
+    python batch_precompute.py users.jsonl -o insights.jsonl
+    python batch_precompute.py exports/ -o insights.jsonl --workers 8
+
+Progress is checkpointed after every batch to <output>.checkpoint, so
+running the same command again after an interruption resumes where the
+last batch finished. --restart discards the checkpoint and the output; an
+existing output without a checkpoint is only overwritten with --restart.
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+from models.analysis_context import AnalysisContext
+from services.encoding import NumpyEncoder
+from services.pipeline import AnalysisPipeline, analysis_result
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_PATH = os.path.join('models', 'artifacts', 'cycle_population.joblib')
+
+# Models of the current worker process, built once by _init_worker
+_worker = {}
+
+
+def input_files(path: str) -> List[str]:
+    """The input file, or every .jsonl file of a directory in name order"""
+    if os.path.isdir(path):
+        return sorted(os.path.join(path, name) for name in os.listdir(path)
+                      if name.endswith('.jsonl'))
+    return [path]
+
+
+def read_lines(paths: List[str]) -> Iterator[str]:
+    """Non-blank lines of the input files, streamed in order"""
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield line
+
+
+def _init_worker(ml_mode: str, model_path: str, cluster_mode: str, engine: str,
+                 sections: Optional[Tuple[str, ...]]) -> None:
+    """Build the models once per worker process"""
+    from models.cycle_predictor import AdvancedCyclePredictor
+    from models.symptom_analyzer import AdvancedSymptomAnalyzer
+    from models.health_tracker import AdvancedHealthTracker
+    from models.recommender import AdvancedRecommenderSystem
+    from models.population_model import PopulationCycleModel
+    population_model = None
+    if ml_mode == 'pretrained' and os.path.exists(model_path):
+        population_model = PopulationCycleModel.load(model_path)
+
+    _worker['engine'] = engine
+    _worker['sections'] = sections
+    _worker['pipeline'] = AnalysisPipeline(
+        AdvancedCyclePredictor(population_model=population_model, ml_mode=ml_mode),
+        AdvancedSymptomAnalyzer(cluster_mode=cluster_mode),
+        AdvancedHealthTracker(),
+        AdvancedRecommenderSystem()
+    )
+
+
+def analyze_line(line: str) -> Tuple[str, Dict[str, float], bool]:
+    """
+    Analyze one payload line in a worker
+
+    Returns the encoded output line, the milliseconds spent per stage (plus
+    'parse' and 'jsonEncoding') and whether it failed. Errors are reported
+    in the output line rather than raised, so one bad payload does not stop
+    the run.
+    """
+    stage_ms: Dict[str, float] = {}
+    user_id = None
+    try:
+        started = time.perf_counter()
+        payload = json.loads(line)
+        user_id = payload.get('userId')
+        cycles = payload.get('cycles', [])
+        if not cycles:
+            return json.dumps({'userId': user_id, 'result': {
+                'hasData': False,
+                'message': 'No cycle data to analyze'
+            }}), stage_ms, False
+
+        context = AnalysisContext.from_payload(cycles, payload.get('symptoms', []),
+                                               payload.get('healthMetrics'), user_id=user_id)
+        stage_ms['parse'] = (time.perf_counter() - started) * 1000
+
+        sections = _worker['sections']
+        stages = _worker['pipeline'].run(context, serial=True, use_cache=False,
+                                         engine=_worker['engine'], sections=sections)
+        stage_ms.update(stages['timings']['stagesMs'])
+
+        started = time.perf_counter()
+        result = analysis_result(user_id, context, stages, sections)
+        output = json.dumps({'userId': user_id, 'result': result}, cls=NumpyEncoder)
+        stage_ms['jsonEncoding'] = (time.perf_counter() - started) * 1000
+        return output, stage_ms, False
+    except Exception as e:
+        return json.dumps({'userId': user_id, 'error': f'{type(e).__name__}: {e}'}), stage_ms, True
+
+
+class Checkpoint:
+    """
+    Lines completed and output size after the last finished batch
+
+    Saved atomically next to the output. On resume the output is truncated
+    back to the checkpointed size, dropping lines of an unfinished batch.
+    """
+
+    def __init__(self, path: str, inputs: List[str]):
+        self.path = path
+        self.inputs = inputs
+        self.completed = 0
+        self.output_bytes = 0
+        self.errors = 0
+
+    @classmethod
+    def load(cls, path: str, inputs: List[str]) -> Optional['Checkpoint']:
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            state = json.load(f)
+        if state.get('inputs') != inputs:
+            raise ValueError(f"Checkpoint {path} is for inputs {state.get('inputs')}; "
+                             f"use --restart to start over")
+        checkpoint = cls(path, inputs)
+        checkpoint.completed = state['completed']
+        checkpoint.output_bytes = state['outputBytes']
+        checkpoint.errors = state.get('errors', 0)
+        return checkpoint
+
+    def save(self) -> None:
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump({
+                'inputs': self.inputs,
+                'completed': self.completed,
+                'outputBytes': self.output_bytes,
+                'errors': self.errors
+            }, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('input', help='JSON Lines file, or directory of .jsonl files')
+    parser.add_argument('-o', '--output', required=True, help='JSON Lines file of results')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='worker processes (default: one per CPU)')
+    parser.add_argument('--batch-size', type=int, default=1000,
+                        help='users per checkpoint')
+    parser.add_argument('--engine', choices=('ensemble', 'bayesian'), default='ensemble')
+    parser.add_argument('--sections', help='comma-separated outputs to compute (default: all)')
+    parser.add_argument('--ml-mode', choices=('pretrained', 'per_request'),
+                        default=os.getenv('CYCLE_ML_MODE', 'pretrained').lower())
+    parser.add_argument('--model-path', default=os.getenv('CYCLE_MODEL_PATH', DEFAULT_MODEL_PATH))
+    parser.add_argument('--cluster-mode', choices=('full', 'fast'),
+                        default=os.getenv('SYMPTOM_CLUSTER_MODE', 'full').lower())
+    parser.add_argument('--restart', action='store_true',
+                        help='ignore any checkpoint and overwrite the output')
+    args = parser.parse_args(argv)
+
+    try:
+        sections = AnalysisPipeline.parse_sections(args.sections)
+    except ValueError as e:
+        parser.error(str(e))
+
+    inputs = [os.path.abspath(path) for path in input_files(args.input)]
+    if not inputs:
+        logger.error(f"No .jsonl files in {args.input}")
+        return 1
+
+    checkpoint_path = f'{args.output}.checkpoint'
+    try:
+        checkpoint = None if args.restart else Checkpoint.load(checkpoint_path, inputs)
+    except ValueError as e:
+        logger.error(str(e))
+        return 1
+    if checkpoint is None:
+        if os.path.exists(args.output) and not args.restart:
+            logger.error(f"{args.output} exists without a checkpoint; "
+                         f"use --restart to overwrite it")
+            return 1
+        checkpoint = Checkpoint(checkpoint_path, inputs)
+    elif checkpoint.completed:
+        logger.info(f"Resuming after {checkpoint.completed} users")
+
+    if args.ml_mode == 'pretrained' and not os.path.exists(args.model_path):
+        logger.warning(f"No cycle model at {args.model_path}; ML ensemble will fit per user")
+
+    lines = itertools.islice(read_lines(inputs), checkpoint.completed, None)
+    stage_totals: Dict[str, float] = defaultdict(float)
+    users = 0
+    started = time.perf_counter()
+
+    mode = 'r+b' if os.path.exists(args.output) else 'wb'
+    with open(args.output, mode) as output, ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=_init_worker,
+        initargs=(args.ml_mode, args.model_path, args.cluster_mode, args.engine, sections)
+    ) as pool:
+        # Drop lines written after the last checkpoint
+        output.truncate(checkpoint.output_bytes)
+        output.seek(checkpoint.output_bytes)
+
+        while True:
+            batch = list(itertools.islice(lines, args.batch_size))
+            if not batch:
+                break
+
+            chunksize = max(1, len(batch) // (args.workers * 4))
+            for encoded, stage_ms, failed in pool.map(analyze_line, batch, chunksize=chunksize):
+                output.write(encoded.encode('utf-8') + b'\n')
+                checkpoint.errors += failed
+                for stage, ms in stage_ms.items():
+                    stage_totals[stage] += ms
+
+            output.flush()
+            os.fsync(output.fileno())
+            users += len(batch)
+            checkpoint.completed += len(batch)
+            checkpoint.output_bytes = output.tell()
+            checkpoint.save()
+
+            elapsed = time.perf_counter() - started
+            logger.info(f"{checkpoint.completed} users done ({users / elapsed:.1f} users/s)")
+
+    elapsed = time.perf_counter() - started
+    print(f"\n{users} users in {elapsed:.1f}s on {args.workers} workers: "
+          f"{users / elapsed if elapsed > 0 else 0:.1f} users/s "
+          f"({checkpoint.completed} total, {checkpoint.errors} errors)")
+    if users:
+        print(f"\n{'stage':<22} {'total s':>9} {'mean ms':>9} {'share':>7}")
+        worker_seconds = sum(stage_totals.values()) / 1000
+        for stage, ms in sorted(stage_totals.items(), key=lambda item: item[1], reverse=True):
+            print(f"{stage:<22} {ms / 1000:>9.2f} {ms / users:>9.2f} "
+                  f"{ms / 1000 / worker_seconds if worker_seconds else 0:>7.1%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,547 @@
+# File: ai-service/benchmark.py
+"""
+Benchmarks and stress checks for the AI service models
+
+    python benchmark.py stress --threads 16 --rounds 20
+    python benchmark.py startup --json >> startup-history.jsonl
+    python benchmark.py symptoms --days 90 365 1000
+    python benchmark.py clusters --days 90 365 1000
+    python benchmark.py forecast --days 90 365
+    python benchmark.py anomaly --cycles 12 120 1200
+    python benchmark.py bayesian --cycles 12 60 240
+    python benchmark.py trends --cycles 12 60 240
+    python benchmark.py coalescing --threads 2 8
+
+Every command builds synthetic users, so no backend or database is needed.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import statistics
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+from models.analysis_context import AnalysisContext, SYMPTOM_TYPES
+from models.cycle_statistics import CycleTrendStats
+from models.cycle_predictor import AdvancedCyclePredictor
+from models.symptom_analyzer import AdvancedSymptomAnalyzer
+from models.health_tracker import AdvancedHealthTracker
+from models.recommender import AdvancedRecommenderSystem
+from services.cache import LRUCache
+from services.coalescing import SingleFlight
+from services.pipeline import AnalysisPipeline
+
+
+def synthetic_user(seed: int, n_cycles: int, n_days: int, health: bool = True) -> Dict:
+    """A reproducible /analyze payload with n_cycles cycles and n_days symptom logs"""
+    rng = random.Random(seed)
+
+    cycles = []
+    start = date(2023, 1, 5)
+    for _ in range(n_cycles):
+        length = rng.choice([24, 26, 27, 28, 28, 29, 30, 31, 35])
+        cycles.append({
+            'startDate': f'{start.isoformat()}T00:00:00.000Z',
+            'endDate': None,
+            'cycleLength': length,
+            'flow': 'medium'
+        })
+        start += timedelta(days=length)
+    cycles.reverse()
+
+    symptoms = []
+    first_day = start - timedelta(days=n_days)
+    for i in range(n_days):
+        day = first_day + timedelta(days=i)
+        symptoms.append({
+            'date': f'{day.isoformat()}T00:00:00.000Z',
+            'cycleDay': i % 30 + 1,
+            'symptoms': {s_type: rng.choice([0, 0, 0, 1, 2, 3, 4, 5, 6, 7, 8, 9])
+                         for s_type in SYMPTOM_TYPES if rng.random() < 0.8}
+        })
+    symptoms.reverse()
+
+    health_metrics = {
+        'birthdate': '1990-05-02T00:00:00.000Z',
+        'height': 165.0,
+        'weight': rng.choice([50.0, 62.0, 85.0, 100.0]),
+        'useMetric': True
+    } if health else None
+
+    return {'userId': f'user-{seed}', 'cycles': cycles,
+            'symptoms': symptoms, 'healthMetrics': health_metrics}
+
+
+def _canonical(result) -> str:
+    # NumPy scalars compare by value, as they are encoded in responses
+    return json.dumps(result, sort_keys=True,
+                      default=lambda value: value.item() if hasattr(value, 'item') else str(value))
+
+
+def _check_concurrent(name: str, call: Callable[[Dict], object], payloads: List[Dict],
+                      threads: int, rounds: int) -> bool:
+    """Run call serially, then from many threads at once, and compare outputs"""
+    expected = [_canonical(call(payload)) for payload in payloads]
+
+    jobs = [i for _ in range(rounds) for i in range(len(payloads))]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        outputs = list(pool.map(lambda i: (i, _canonical(call(payloads[i]))), jobs))
+    elapsed = time.perf_counter() - started
+
+    mismatches = sum(1 for i, output in outputs if output != expected[i])
+    status = 'OK' if mismatches == 0 else 'FAILED'
+    print(f"{name:<10} {len(jobs):>5} calls on {threads} threads in {elapsed:.2f}s: "
+          f"{mismatches} mismatches [{status}]")
+    return mismatches == 0
+
+
+def stress(args) -> int:
+    """Check that concurrent requests give the same results as serial ones"""
+    payloads = [synthetic_user(seed, n_cycles=8 + seed % 12, n_days=30 + seed * 7,
+                               health=seed % 3 != 0)
+                for seed in range(args.users)]
+
+    # per_request mode exercises the estimators fitted inside the request
+    cycle_predictor = AdvancedCyclePredictor(ml_mode='per_request')
+    pipeline = AnalysisPipeline(cycle_predictor, AdvancedSymptomAnalyzer(),
+                                AdvancedHealthTracker(), AdvancedRecommenderSystem())
+
+    def predict(payload):
+        return cycle_predictor.predict_next_period(payload['cycles'], payload['healthMetrics'])
+
+    def analyze(payload):
+        stages = pipeline.run(AnalysisContext.from_payload(
+            payload['cycles'], payload['symptoms'], payload['healthMetrics']
+        ))
+        stages.pop('timings')
+        return stages
+
+    ok = _check_concurrent('predict', predict, payloads, args.threads, args.rounds)
+    ok = _check_concurrent('analyze', analyze, payloads, args.threads, args.rounds) and ok
+    return 0 if ok else 1
+
+
+# Packages the service must not import until a request needs them
+LAZY_PACKAGES = ('pandas', 'scipy', 'sklearn')
+
+# Runs in a fresh interpreter: cold import, first /health, first /analyze
+_STARTUP_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+loaded_with_app = [name for name in LAZY_PACKAGES if name in sys.modules]
+client = app.app.test_client()
+client.get('/health')
+health = time.perf_counter()
+client.post('/analyze', json=json.loads(PAYLOAD))
+analyzed = time.perf_counter()
+print(json.dumps({'seconds': {'importApp': imported - started, 'firstHealth': health - started,
+                              'firstAnalyze': analyzed - health},
+                  'lazyPackagesLoadedWithApp': loaded_with_app}))
+"""
+
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$')
+
+
+def _parse_importtime(stderr: str) -> List[Tuple[int, str, int, int]]:
+    """(depth, module, self_us, cumulative_us) for each -X importtime line"""
+    rows = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append(((len(indent) - 1) // 2, module, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def _self_time_by_package(rows: List[Tuple[int, str, int, int]]) -> List[Tuple[str, float]]:
+    """Seconds of import self time per top-level package, largest first"""
+    totals = defaultdict(float)
+    for _, module, self_us, _ in rows:
+        totals[module.split('.')[0]] += self_us / 1e6
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def startup(args) -> int:
+    """Report cold-start import time by package; fails if app imports a lazy package"""
+    payload = json.dumps(synthetic_user(1, n_cycles=10, n_days=90))
+    probe = f"PAYLOAD = {payload!r}\nLAZY_PACKAGES = {LAZY_PACKAGES!r}\n{_STARTUP_PROBE}"
+
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', probe],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        print(completed.stderr, file=sys.stderr)
+        return 1
+
+    probed = json.loads(completed.stdout.strip().splitlines()[-1])
+    timings = probed['seconds']
+    rows = _parse_importtime(completed.stderr)
+
+    # Imports that happened while app loaded vs. on first use, by package
+    app_index = next(i for i, row in enumerate(rows) if row[0] == 0 and row[1] == 'app')
+    eager = _self_time_by_package(rows[:app_index + 1])
+    deferred = _self_time_by_package(rows[app_index + 1:])
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'seconds': {name: round(value, 4) for name, value in timings.items()},
+        'importByPackage': {name: round(value, 4) for name, value in eager[:args.top]},
+        'deferredImports': {name: round(value, 4) for name, value in deferred[:args.top]},
+        'lazyPackagesLoadedWithApp': probed['lazyPackagesLoadedWithApp']
+    }
+    ok = not report['lazyPackagesLoadedWithApp']
+
+    if args.json:
+        print(json.dumps(report))
+        return 0 if ok else 1
+
+    for name, value in report['seconds'].items():
+        print(f"{name:<14} {value * 1000:8.1f} ms")
+    print("\nImported with app (self time by package):")
+    for name, value in report['importByPackage'].items():
+        print(f"  {name:<24} {value * 1000:8.1f} ms")
+    print("\nDeferred to first /analyze (self time by package):")
+    for name, value in report['deferredImports'].items():
+        print(f"  {name:<24} {value * 1000:8.1f} ms")
+    if not ok:
+        print(f"\nImported with app but meant to load lazily: "
+              f"{', '.join(report['lazyPackagesLoadedWithApp'])}")
+    return 0 if ok else 1
+
+
+def _median_ms(call: Callable[[], object], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def symptoms(args) -> int:
+    """Time the per-symptom statistics: one 2-D pass vs. a loop over symptoms"""
+    analyzer = AdvancedSymptomAnalyzer()
+    ok = True
+
+    print(f"{'days':>6} {'per-symptom':>12} {'2-D pass':>10} {'speedup':>8} {'analyze':>10}")
+    for n_days in args.days:
+        payload = synthetic_user(n_days, n_cycles=max(2, n_days // 28), n_days=n_days)
+        context = AnalysisContext.from_payload(payload['cycles'], payload['symptoms'])
+        df = analyzer._symptom_frame(context)
+        names = [s_type for s_type in analyzer.symptom_types if (df[s_type] != 0).any()]
+        matrix = df[names].to_numpy(dtype=float)
+
+        def per_symptom():
+            return {s_type: analyzer._analyze_symptom_comprehensive(s_type, df[s_type], df)
+                    for s_type in names}
+
+        def two_d():
+            return analyzer._analyze_symptom_matrix(matrix, names)
+
+        ok = _canonical(per_symptom()) == _canonical(two_d()) and ok
+        loop_ms = _median_ms(per_symptom, args.repeat)
+        kernel_ms = _median_ms(two_d, args.repeat)
+        analyze_ms = _median_ms(lambda: analyzer.analyze_patterns([], [], context=context),
+                                args.repeat)
+        print(f"{n_days:>6} {loop_ms:>10.2f}ms {kernel_ms:>8.2f}ms "
+              f"{loop_ms / kernel_ms:>7.1f}x {analyze_ms:>8.2f}ms")
+
+    if not ok:
+        print("2-D pass and per-symptom results differ [FAILED]")
+    return 0 if ok else 1
+
+
+def _inertia(X, labels) -> float:
+    """Within-cluster sum of squares of a labelling"""
+    return float(sum(((X[labels == k] - X[labels == k].mean(axis=0)) ** 2).sum()
+                     for k in set(labels.tolist())))
+
+
+def clusters(args) -> int:
+    """Time symptom-day clustering: full KMeans vs. the fast mode, cold and warm"""
+    full = AdvancedSymptomAnalyzer(cluster_mode='full')
+
+    print(f"{'days':>6} {'full':>9} {'fast cold':>10} {'fast warm':>10} "
+          f"{'inertia cold/full':>18} {'warm/full':>10}")
+    for n_days in args.days:
+        payload = synthetic_user(n_days, n_cycles=max(2, n_days // 28), n_days=n_days)
+        context = AnalysisContext.from_payload(payload['cycles'], payload['symptoms'])
+        df = full._symptom_frame(context)
+        names = [s_type for s_type in full.symptom_types if (df[s_type] != 0).any()]
+        X = df[names].to_numpy(dtype=float)
+        n_clusters = min(3, max(2, len(X) // 10))
+        key = (payload['userId'], tuple(names))
+
+        def fast_cold():
+            return AdvancedSymptomAnalyzer(cluster_mode='fast')._fit_clusters(X, n_clusters, key)
+
+        # Warm start: centroids cached from the history one log earlier
+        warm = AdvancedSymptomAnalyzer(cluster_mode='fast',
+                                       centroid_cache=LRUCache(max_bytes=None))
+        warm._fit_clusters(X[:-1], n_clusters, key)
+        primed = warm.centroid_cache.get(('centroids', n_clusters) + key)
+
+        def fast_warm():
+            warm.centroid_cache.put(('centroids', n_clusters) + key, primed)
+            return warm._fit_clusters(X, n_clusters, key)
+
+        full_ms = _median_ms(lambda: full._fit_clusters(X, n_clusters), args.repeat)
+        cold_ms = _median_ms(fast_cold, args.repeat)
+        warm_ms = _median_ms(fast_warm, args.repeat)
+
+        baseline = _inertia(X, full._fit_clusters(X, n_clusters))
+        print(f"{n_days:>6} {full_ms:>7.1f}ms {cold_ms:>8.1f}ms {warm_ms:>8.1f}ms "
+              f"{_inertia(X, fast_cold()) / baseline:>18.3f} "
+              f"{_inertia(X, fast_warm()) / baseline:>10.3f}")
+    return 0
+
+
+def forecast(args) -> int:
+    """Time a full-cycle symptom forecast vs. one request per cycle day"""
+    analyzer = AdvancedSymptomAnalyzer()
+
+    print(f"{'days':>6} {'cycle':>6} {'per-day calls':>14} {'forecast':>10} {'speedup':>8}")
+    for n_days in args.days:
+        payload = synthetic_user(n_days, n_cycles=max(2, n_days // 28), n_days=n_days)
+
+        # Each /symptom-prediction request parses the history again
+        def per_day():
+            return [analyzer.predict_symptom_likelihood(payload['symptoms'], day, payload['cycles'])
+                    for day in range(1, args.cycle_length + 1)]
+
+        def one_call():
+            return analyzer.forecast_cycle(payload['symptoms'], payload['cycles'], args.cycle_length)
+
+        per_day_ms = _median_ms(per_day, args.repeat)
+        forecast_ms = _median_ms(one_call, args.repeat)
+        print(f"{n_days:>6} {args.cycle_length:>6} {per_day_ms:>12.1f}ms {forecast_ms:>8.1f}ms "
+              f"{per_day_ms / forecast_ms:>7.1f}x")
+    return 0
+
+
+def anomaly(args) -> int:
+    """Time incremental anomaly scoring vs. a full recompute as cycles are appended"""
+    predictor = AdvancedCyclePredictor()
+    ok = True
+
+    print(f"{'cycles':>7} {'full':>10} {'incremental':>12} {'speedup':>8} {'mismatches':>11}")
+    for n_cycles in args.cycles:
+        rng = random.Random(n_cycles)
+        lengths = [rng.choice([24, 26, 27, 28, 28, 29, 30, 31, 35, 42]) for _ in range(n_cycles)]
+        cycles = [{'startDate': f'{(date(2000, 1, 1) + timedelta(days=29 * i)).isoformat()}',
+                   'cycleLength': length} for i, length in enumerate(lengths)]
+        history, new_cycles = lengths[:-args.appends], lengths[-args.appends:]
+        predictor.detect_anomaly(cycles[:3])
+
+        # Full recompute: every append re-parses and re-summarizes the history
+        started = time.perf_counter()
+        expected = [predictor.detect_anomaly(cycles[:len(history) + i + 1])
+                    for i in range(len(new_cycles))]
+        full_ms = (time.perf_counter() - started) * 1000 / len(new_cycles)
+
+        state = predictor.cycle_length_state(history)
+        started = time.perf_counter()
+        results = [predictor.detect_anomaly_incremental(state, length) for length in new_cycles]
+        incremental_ms = (time.perf_counter() - started) * 1000 / len(new_cycles)
+
+        mismatches = sum(_canonical(a) != _canonical(b) for a, b in zip(results, expected))
+        ok = ok and mismatches == 0
+        print(f"{n_cycles:>7} {full_ms:>8.3f}ms {incremental_ms:>10.3f}ms "
+              f"{full_ms / incremental_ms:>7.1f}x {mismatches:>11}")
+    return 0 if ok else 1
+
+
+def bayesian(args) -> int:
+    """Time the bayesian engine (rebuilt and incrementally updated) vs. the ensemble"""
+    predictor = AdvancedCyclePredictor()
+    ok = True
+
+    print(f"{'cycles':>7} {'ensemble':>10} {'rebuilt':>10} {'appended':>10} {'speedup':>8} "
+          f"{'max |diff|':>11}")
+    for n_cycles in args.cycles:
+        payload = synthetic_user(n_cycles, n_cycles, 0, health=False)
+        contexts = [AnalysisContext.from_payload(payload['cycles'][len(payload['cycles']) - n:])
+                    for n in range(n_cycles - args.appends, n_cycles + 1)]
+        context = contexts[-1]
+        predictor.predict_next_period(payload['cycles'], context=context, engine='bayesian')
+
+        ensemble_ms = _median_ms(lambda: predictor.predict_next_period(
+            payload['cycles'], context=context), args.repeat)
+        rebuilt_ms = _median_ms(lambda: predictor.predict_next_period(
+            payload['cycles'], context=context, engine='bayesian'), args.repeat)
+
+        # Each newly logged cycle updates the stored posterior
+        posterior = predictor.cycle_posterior(contexts[0])
+        started = time.perf_counter()
+        for step in contexts[1:]:
+            posterior = predictor.cycle_posterior(step, posterior)
+            appended = predictor.predict_next_period(step.cycles, context=step,
+                                                     engine='bayesian', posterior=posterior)
+        appended_ms = (time.perf_counter() - started) * 1000 / args.appends
+
+        rebuilt = predictor.cycle_posterior(context)
+        difference = max(abs(a - b) for a, b in zip(posterior.parameters(), rebuilt.parameters()))
+        matches = _canonical(appended) == _canonical(
+            predictor.predict_next_period(payload['cycles'], context=context, engine='bayesian'))
+        ok = ok and matches and difference < 1e-9
+        print(f"{n_cycles:>7} {ensemble_ms:>8.3f}ms {rebuilt_ms:>8.3f}ms {appended_ms:>8.3f}ms "
+              f"{ensemble_ms / appended_ms:>7.1f}x {difference:>11.1e}"
+              f"{'' if matches else '  [FAILED]'}")
+    return 0 if ok else 1
+
+
+def trends(args) -> int:
+    """Time trend fits and rolling features from running sums vs. refitting the history"""
+    import numpy as np
+    import pandas as pd
+    from scipy import stats
+
+    ok = True
+    print(f"{'cycles':>7} {'refit':>10} {'append+read':>12} {'speedup':>8} {'max |diff|':>11}")
+    for n_cycles in args.cycles:
+        rng = random.Random(n_cycles)
+        lengths = [rng.choice([24, 26, 27, 28, 28, 29, 30, 31, 35, 42]) for _ in range(n_cycles)]
+        y = np.array(lengths)
+        x = np.arange(n_cycles)
+
+        def refit():
+            linear = stats.linregress(x, y)
+            quadratic = np.polyfit(x, y, 2)
+            rolling = pd.Series(y).rolling(window=3, min_periods=1)
+            return (linear.slope, linear.intercept, linear.rvalue, linear.pvalue,
+                    *quadratic, rolling.mean().iloc[-1], rolling.std().iloc[-1],
+                    pd.Series(y).rolling(window=5, min_periods=1).mean().iloc[-1])
+
+        history = CycleTrendStats(lengths[:-1])
+
+        def append_and_read():
+            state = history.copy()
+            state.append(lengths[-1])
+            features = state.rolling_features()
+            return (*state.linear_trend(), *state.quadratic_trend()[:3],
+                    features['cycle_length_ma3'], features['cycle_length_std3'],
+                    features['cycle_length_ma5'])
+
+        refit_ms = _median_ms(refit, args.repeat)
+        incremental_ms = _median_ms(append_and_read, args.repeat)
+        difference = max(abs(a - b) / max(1.0, abs(b))
+                         for a, b in zip(append_and_read(), refit()))
+        ok = ok and difference < 1e-9
+        print(f"{n_cycles:>7} {refit_ms:>8.3f}ms {incremental_ms:>10.3f}ms "
+              f"{refit_ms / incremental_ms:>7.1f}x {difference:>11.1e}")
+    return 0 if ok else 1
+
+
+def coalescing(args) -> int:
+    """Time identical concurrent /analyze computations with and without single-flight"""
+    payload = synthetic_user(7, 12, 180)
+    cycle_predictor = AdvancedCyclePredictor(ml_mode='per_request')
+    pipeline = AnalysisPipeline(cycle_predictor, AdvancedSymptomAnalyzer(),
+                                AdvancedHealthTracker(), AdvancedRecommenderSystem())
+
+    def analyze():
+        stages = pipeline.run(AnalysisContext.from_payload(
+            payload['cycles'], payload['symptoms'], payload['healthMetrics']
+        ), use_cache=False)
+        stages.pop('timings')
+        return _canonical(stages)
+
+    expected = analyze()
+    ok = True
+
+    print(f"{'threads':>7} {'separate':>10} {'coalesced':>10} {'executions':>11} {'mismatches':>11}")
+    for threads in args.threads:
+        def burst(call) -> Tuple[float, List[str]]:
+            barrier = threading.Barrier(threads)
+
+            def request(_):
+                barrier.wait()
+                return call()
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                outputs = list(pool.map(request, range(threads)))
+            return (time.perf_counter() - started) * 1000, outputs
+
+        separate_ms, _ = burst(analyze)
+        flights = SingleFlight()
+        coalesced_ms, outputs = burst(lambda: flights.do('payload', analyze)[0])
+
+        mismatches = sum(output != expected for output in outputs)
+        ok = ok and mismatches == 0
+        print(f"{threads:>7} {separate_ms:>8.1f}ms {coalesced_ms:>8.1f}ms "
+              f"{flights.executions:>11} {mismatches:>11}")
+    return 0 if ok else 1
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    stress_parser = commands.add_parser('stress', help=stress.__doc__)
+    stress_parser.add_argument('--threads', type=int, default=16)
+    stress_parser.add_argument('--rounds', type=int, default=10)
+    stress_parser.add_argument('--users', type=int, default=12)
+    stress_parser.set_defaults(run=stress)
+
+    startup_parser = commands.add_parser('startup', help=startup.__doc__)
+    startup_parser.add_argument('--top', type=int, default=10)
+    startup_parser.add_argument('--json', action='store_true',
+                                help='print one JSON line, for tracking over time')
+    startup_parser.set_defaults(run=startup)
+
+    symptoms_parser = commands.add_parser('symptoms', help=symptoms.__doc__)
+    symptoms_parser.add_argument('--days', type=int, nargs='+', default=[90, 365, 1000])
+    symptoms_parser.add_argument('--repeat', type=int, default=20)
+    symptoms_parser.set_defaults(run=symptoms)
+
+    clusters_parser = commands.add_parser('clusters', help=clusters.__doc__)
+    clusters_parser.add_argument('--days', type=int, nargs='+', default=[90, 365, 1000])
+    clusters_parser.add_argument('--repeat', type=int, default=10)
+    clusters_parser.set_defaults(run=clusters)
+
+    forecast_parser = commands.add_parser('forecast', help=forecast.__doc__)
+    forecast_parser.add_argument('--days', type=int, nargs='+', default=[90, 365])
+    forecast_parser.add_argument('--cycle-length', type=int, default=28)
+    forecast_parser.add_argument('--repeat', type=int, default=5)
+    forecast_parser.set_defaults(run=forecast)
+
+    anomaly_parser = commands.add_parser('anomaly', help=anomaly.__doc__)
+    anomaly_parser.add_argument('--cycles', type=int, nargs='+', default=[12, 120, 1200])
+    anomaly_parser.add_argument('--appends', type=int, default=10)
+    anomaly_parser.set_defaults(run=anomaly)
+
+    bayesian_parser = commands.add_parser('bayesian', help=bayesian.__doc__)
+    bayesian_parser.add_argument('--cycles', type=int, nargs='+', default=[12, 60, 240])
+    bayesian_parser.add_argument('--appends', type=int, default=10)
+    bayesian_parser.add_argument('--repeat', type=int, default=10)
+    bayesian_parser.set_defaults(run=bayesian)
+
+    trends_parser = commands.add_parser('trends', help=trends.__doc__)
+    trends_parser.add_argument('--cycles', type=int, nargs='+', default=[12, 60, 240])
+    trends_parser.add_argument('--repeat', type=int, default=20)
+    trends_parser.set_defaults(run=trends)
+
+    coalescing_parser = commands.add_parser('coalescing', help=coalescing.__doc__)
+    coalescing_parser.add_argument('--threads', type=int, nargs='+', default=[2, 8])
+    coalescing_parser.set_defaults(run=coalescing)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
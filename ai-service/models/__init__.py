@@ -3,10 +3,18 @@ from .cycle_predictor import AdvancedCyclePredictor
 from .symptom_analyzer import AdvancedSymptomAnalyzer
 from .recommender import AdvancedRecommenderSystem
 from .health_tracker import AdvancedHealthTracker
+from .batch_predictor import BatchCyclePredictor
+from .analysis_context import AnalysisContext
+from .population_model import PopulationCycleModel
+from .phase_mapper import PhaseMapper
 
 __all__ = [
     'AdvancedCyclePredictor',
     'AdvancedSymptomAnalyzer',
     'AdvancedRecommenderSystem',
-    'AdvancedHealthTracker'
+    'AdvancedHealthTracker',
+    'BatchCyclePredictor',
+    'AnalysisContext',
+    'PopulationCycleModel',
+    'PhaseMapper'
 ]
\ No newline at end of file
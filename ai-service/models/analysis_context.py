@@ -0,0 +1,249 @@
+# File: ai-service/models/analysis_context.py
+from __future__ import annotations
+import numpy as np
+from dataclasses import dataclass
+from functools import cached_property
+from typing import List, Dict, Optional, Tuple
+from .cycle_statistics import CycleTrendStats
+from .lazy_imports import lazy_module
+
+pd = lazy_module('pandas')
+
+SYMPTOM_TYPES = (
+    'cramps', 'mood', 'energy', 'headache', 'bloating',
+    'acne', 'breast_tenderness', 'cravings', 'sleep_quality',
+    'anxiety', 'irritability', 'fatigue'
+)
+
+# Proleptic Gregorian ordinal of 1970-01-01
+_EPOCH_ORDINAL = 719163
+_NS_PER_DAY = 86_400_000_000_000
+
+
+def _parse_dates(values: List) -> pd.DatetimeIndex:
+    """Parse date strings in one call, falling back to per-value parsing"""
+    try:
+        return pd.DatetimeIndex(pd.to_datetime(values))
+    except (ValueError, TypeError):
+        # Mixed timezone awareness cannot share one vectorized parse
+        return pd.DatetimeIndex([pd.to_datetime(v) for v in values])
+
+
+def calculate_bmi(health_metrics: Optional[Dict]) -> float:
+    """Calculate BMI from health metrics (0 when unavailable)"""
+    if not health_metrics:
+        return 0
+
+    height = health_metrics.get('height', 0)
+    weight = health_metrics.get('weight', 0)
+    use_metric = health_metrics.get('useMetric', True)
+
+    if height <= 0 or weight <= 0:
+        return 0
+
+    if not use_metric:
+        height_cm = height * 30.48
+        weight_kg = weight * 0.453592
+    else:
+        height_cm = height
+        weight_kg = weight
+
+    height_m = height_cm / 100
+    return weight_kg / (height_m ** 2) if height_m > 0 else 0
+
+
+def calculate_age(birthdate_str: Optional[str]) -> Optional[int]:
+    """Calculate age from birthdate"""
+    if not birthdate_str:
+        return None
+
+    try:
+        birthdate = pd.to_datetime(birthdate_str)
+        today = pd.Timestamp.now()
+        age = today.year - birthdate.year
+        if today.month < birthdate.month or (
+            today.month == birthdate.month and today.day < birthdate.day
+        ):
+            age -= 1
+        return age
+    except:
+        return None
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array.setflags(write=False)
+    return array
+
+
+@dataclass(frozen=True, eq=False)
+class AnalysisContext:
+    """
+    Parsed, read-only view of one analysis payload
+
+    Built once per request and shared by every analysis stage, so dates are
+    parsed, rows sorted and BMI / age derived a single time. Arrays are
+    marked read-only; derived DataFrames are cached and must not be mutated.
+    """
+    cycles: List[Dict]
+    symptoms: List[Dict]
+    health_metrics: Optional[Dict]
+
+    # Cycles with a known length, sorted by start date
+    cycle_numbers: np.ndarray
+    cycle_lengths: np.ndarray
+    cycle_start_dates: pd.DatetimeIndex
+    cycle_start_ordinals: np.ndarray
+
+    # Symptom logs, sorted by date: (n_logs x len(SYMPTOM_TYPES))
+    symptom_dates: pd.DatetimeIndex
+    symptom_cycle_days: np.ndarray
+    symptom_matrix: np.ndarray
+    # Raw symptoms dict of each log, in the same order
+    symptom_values: List[Dict]
+
+    bmi: float
+    age: Optional[int]
+
+    user_id: Optional[str] = None
+    # Trend statistics kept from the user's earlier requests, if any
+    stored_cycle_trends: Optional[CycleTrendStats] = None
+
+    @classmethod
+    def from_payload(cls, cycles: Optional[List[Dict]] = None,
+                     symptoms: Optional[List[Dict]] = None,
+                     health_metrics: Optional[Dict] = None,
+                     user_id: Optional[str] = None,
+                     cycle_trends: Optional[CycleTrendStats] = None) -> 'AnalysisContext':
+        """Parse the JSON payload of an analysis request"""
+        cycles = cycles or []
+        symptoms = symptoms or []
+
+        numbers, lengths, start_dates = cls._parse_cycles(cycles)
+        dates, cycle_days, matrix, values = cls._parse_symptoms(symptoms)
+
+        return cls(
+            cycles=cycles,
+            symptoms=symptoms,
+            health_metrics=health_metrics,
+            cycle_numbers=_read_only(numbers),
+            cycle_lengths=_read_only(lengths),
+            cycle_start_dates=start_dates,
+            cycle_start_ordinals=_read_only(
+                start_dates.asi8 // _NS_PER_DAY + _EPOCH_ORDINAL
+            ),
+            symptom_dates=dates,
+            symptom_cycle_days=_read_only(cycle_days),
+            symptom_matrix=_read_only(matrix),
+            symptom_values=values,
+            bmi=calculate_bmi(health_metrics),
+            age=calculate_age(health_metrics.get('birthdate') if health_metrics else None),
+            user_id=user_id,
+            stored_cycle_trends=cycle_trends
+        )
+
+    @staticmethod
+    def _parse_cycles(cycles: List[Dict]) -> Tuple[np.ndarray, np.ndarray, pd.DatetimeIndex]:
+        """Cycle numbers, lengths and start dates of cycles with a length"""
+        rows = [(len(cycles) - i, cycle['cycleLength'], cycle['startDate'])
+                for i, cycle in enumerate(cycles) if cycle.get('cycleLength')]
+        if not rows:
+            return (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64),
+                    pd.DatetimeIndex([]))
+
+        numbers, lengths, raw_dates = zip(*rows)
+        start_dates = _parse_dates(list(raw_dates))
+        order = np.argsort(start_dates.asi8, kind='stable')
+
+        return (np.asarray(numbers, dtype=np.int64)[order],
+                np.asarray(lengths, dtype=np.int64)[order],
+                start_dates[order])
+
+    @staticmethod
+    def _parse_symptoms(symptoms: List[Dict]) -> Tuple[pd.DatetimeIndex, np.ndarray,
+                                                       np.ndarray, List[Dict]]:
+        """Symptom matrix, cycle days and raw symptoms dicts, sorted by date"""
+        logs = [log for log in symptoms if 'symptoms' in log]
+        n_logs = len(logs)
+
+        matrix = np.empty((n_logs, len(SYMPTOM_TYPES)))
+        if not logs:
+            return pd.DatetimeIndex([]), np.zeros(0, dtype=np.int64), matrix, []
+
+        # Fill one column per symptom straight from the JSON; None becomes NaN
+        values = [log['symptoms'] for log in logs]
+        for j, s_type in enumerate(SYMPTOM_TYPES):
+            matrix[:, j] = [v.get(s_type, 0) for v in values]
+
+        cycle_days = np.fromiter((log.get('cycleDay', 0) for log in logs),
+                                 dtype=np.int64, count=n_logs)
+
+        dates = _parse_dates([log.get('date', log.get('createdAt')) for log in logs])
+        order = np.argsort(dates.asi8, kind='stable')
+
+        return dates[order], cycle_days[order], matrix[order], [values[i] for i in order]
+
+    @cached_property
+    def symptom_totals(self) -> np.ndarray:
+        """
+        Sum of each log's symptom values, for the health stage
+
+        Totals cover every logged key, not just SYMPTOM_TYPES; values that
+        are not numbers (None, strings) are left out of the sum.
+        """
+        totals = np.fromiter(
+            (sum(value for value in values.values() if isinstance(value, (int, float)))
+             for values in self.symptom_values),
+            dtype=float, count=len(self.symptom_values)
+        )
+        return _read_only(totals)
+
+    @cached_property
+    def cycle_trends(self) -> CycleTrendStats:
+        """
+        Regression sums and recent window of the cycle lengths
+
+        Stored statistics are brought up to date (in O(1) when one cycle was
+        added, after an O(n) hash confirming the older cycles are unchanged)
+        and updated in place; otherwise they are built from the cycles.
+        """
+        return CycleTrendStats.sync(self.stored_cycle_trends, self.cycle_lengths,
+                                    self.cycle_start_ordinals)
+
+    @cached_property
+    def cycle_frame(self) -> Optional[pd.DataFrame]:
+        """
+        Feature-engineered cycle DataFrame, sorted by start date
+
+        Same columns as AdvancedCyclePredictor used to build per stage, with
+        health columns present when health metrics were supplied.
+        """
+        if len(self.cycle_lengths) == 0:
+            return None
+
+        start_dates = self.cycle_start_dates
+        months = np.asarray(start_dates.month, dtype=np.int64)
+
+        df = pd.DataFrame({
+            'cycle_number': self.cycle_numbers,
+            'cycle_length': self.cycle_lengths,
+            'start_date': start_dates,
+            'month': months,
+            'season': (months % 12 + 3) // 3,
+            'day_of_year': np.asarray(start_dates.dayofyear, dtype=np.int64)
+        })
+
+        if self.health_metrics:
+            df['bmi'] = self.bmi
+            df['age'] = self.age
+
+        # Feature engineering
+        df['cycle_length_ma3'] = df['cycle_length'].rolling(window=3, min_periods=1).mean()
+        df['cycle_length_ma5'] = df['cycle_length'].rolling(window=5, min_periods=1).mean()
+        df['cycle_length_std3'] = df['cycle_length'].rolling(window=3, min_periods=1).std()
+        df['days_since_start'] = (start_dates - start_dates.min()).days
+
+        # Lag features
+        df['prev_cycle_length'] = df['cycle_length'].shift(1)
+        df['prev_2_cycle_length'] = df['cycle_length'].shift(2)
+
+        return df
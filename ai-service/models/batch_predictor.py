@@ -0,0 +1,312 @@
+# File: ai-service/models/batch_predictor.py
+from __future__ import annotations
+import numpy as np
+from typing import List, Dict, Optional
+from .cycle_predictor import AdvancedCyclePredictor
+from .lazy_imports import lazy_module
+import warnings
+warnings.filterwarnings('ignore')
+
+pd = lazy_module('pandas')
+
+class BatchCyclePredictor:
+    """
+    Vectorized cycle prediction and anomaly detection for many users at once
+
+    Every user's cycle history is packed into one row of a padded
+    (users x cycles) array, so the statistical, time series and anomaly
+    methods of AdvancedCyclePredictor run as row-wise NumPy reductions
+    instead of building one DataFrame per user.
+    """
+
+    def __init__(self, predictor: Optional[AdvancedCyclePredictor] = None):
+        # Shared helpers (ML ensemble, formatting, health adjustments)
+        self.predictor = predictor or AdvancedCyclePredictor()
+
+    def predict_next_period(self, cycles_by_user: List[List[Dict]],
+                            health_metrics_by_user: Optional[List[Optional[Dict]]] = None
+                            ) -> List[Optional[Dict]]:
+        """
+        Batch equivalent of AdvancedCyclePredictor.predict_next_period
+
+        Returns one prediction per user, in input order. The ML ensemble is
+        still fitted per user, and only for users past the ensemble threshold.
+        """
+        if health_metrics_by_user is None:
+            health_metrics_by_user = [None] * len(cycles_by_user)
+
+        batch = self._pack(cycles_by_user)
+        lengths, valid, counts = batch['lengths'], batch['valid'], batch['counts']
+        results: List[Optional[Dict]] = [None] * len(cycles_by_user)
+
+        # Users that fall back to the standard 28-day baseline
+        active = np.array([
+            len(cycles) >= self.predictor.min_cycles_for_prediction and count >= 2
+            for cycles, count in zip(cycles_by_user, counts)
+        ], dtype=bool)
+
+        for i in np.where(~active)[0]:
+            results[i] = self.predictor._baseline_prediction(cycles_by_user[i])
+
+        if not active.any():
+            return results
+
+        stats = self._row_statistics(lengths)
+        statistical = self._statistical_prediction(lengths, valid, counts, stats)
+        time_series = self._time_series_prediction(lengths, valid, counts, stats, batch['months'])
+
+        # Method 3: ML ensemble, pretrained or fitted per user
+        ml_length = np.zeros(len(counts))
+        ml_confidence = np.zeros(len(counts))
+        ml_users = set()
+        for i in np.where(active)[0]:
+            cycles = cycles_by_user[i]
+            if len(cycles) >= self.predictor.ensemble_threshold:
+                health_metrics = health_metrics_by_user[i]
+                df = self.predictor._prepare_dataframe(cycles, health_metrics)
+                ml = self.predictor._ml_ensemble_prediction(df, health_metrics)
+                ml_users.add(i)
+                ml_confidence[i] = ml.get('confidence', 0)
+                ml_length[i] = ml.get('predicted_length', 28)
+
+        # Weighted ensemble of all methods (confidence > 0.3 only)
+        method_names = ['statistical', 'time_series', 'ml_ensemble']
+        lengths_by_method = np.stack([statistical['predicted_length'],
+                                      time_series['predicted_length'], ml_length], axis=1)
+        confidence_by_method = np.stack([statistical['confidence'],
+                                         time_series['confidence'], ml_confidence], axis=1)
+        used = confidence_by_method > 0.3
+        weights = np.where(used, confidence_by_method, 0.0)
+        weight_totals = weights.sum(axis=1, keepdims=True)
+        weights = np.divide(weights, weight_totals, out=np.zeros_like(weights),
+                            where=weight_totals > 0)
+        predicted_length = (weights * lengths_by_method).sum(axis=1)
+        final_confidence = (weights * confidence_by_method).sum(axis=1)
+
+        for i in np.where(active)[0]:
+            methods_used = method_names[:3] if i in ml_users else method_names[:2]
+            results[i] = self.predictor._format_prediction(
+                predicted_length[i],
+                final_confidence[i],
+                batch['last_start'][i],
+                stats['mean'][i],
+                stats['median'][i],
+                stats['std'][i],
+                int(counts[i]),
+                methods_used,
+                {name: weights[i, j] for j, name in enumerate(method_names) if used[i, j]},
+                health_metrics_by_user[i]
+            )
+
+        return results
+
+    def detect_anomaly(self, cycles_by_user: List[List[Dict]]) -> List[Dict]:
+        """
+        Batch equivalent of AdvancedCyclePredictor.detect_anomaly
+        """
+        batch = self._pack(cycles_by_user)
+        lengths, valid, counts = batch['lengths'], batch['valid'], batch['counts']
+        results: List[Optional[Dict]] = [None] * len(cycles_by_user)
+
+        for i, cycles in enumerate(cycles_by_user):
+            if len(cycles) < 3:
+                results[i] = {
+                    'detected': False,
+                    'score': 0,
+                    'severity': 'none',
+                    'description': 'Need at least 3 cycles for anomaly detection'
+                }
+            elif counts[i] < 3:
+                results[i] = {'detected': False, 'score': 0, 'severity': 'none'}
+
+        active = np.array([r is None for r in results], dtype=bool)
+        if not active.any():
+            return results
+
+        # Latest cycle vs. everything before it
+        rows = np.arange(len(counts))
+        last_index = np.maximum(counts - 1, 0)
+        current = lengths[rows, last_index]
+        historical = np.where(
+            valid & (np.arange(lengths.shape[1]) < last_index[:, None]), lengths, np.nan
+        )
+
+        mean_hist = np.nanmean(historical, axis=1)
+        std_hist = np.nanstd(historical, axis=1)
+        q1, q3 = np.nanpercentile(historical, [25, 75], axis=1)
+        median_hist = np.nanmedian(historical, axis=1)
+        mad = np.nanmedian(np.abs(historical - median_hist[:, None]), axis=1)
+
+        for i in np.where(active)[0]:
+            results[i] = self.predictor._score_anomaly(
+                current[i], mean_hist[i], std_hist[i], q1[i], q3[i], median_hist[i], mad[i]
+            )
+
+        return results
+
+    def _pack(self, cycles_by_user: List[List[Dict]]) -> Dict:
+        """
+        Pack cycle histories into padded arrays sorted by start date
+
+        Rows are left aligned; unused cells hold NaN in ``lengths`` and
+        False in ``valid``.
+        """
+        owners, lengths, raw_dates = [], [], []
+        for user_index, cycles in enumerate(cycles_by_user):
+            for cycle in cycles:
+                if not cycle.get('cycleLength'):
+                    continue
+                owners.append(user_index)
+                lengths.append(cycle['cycleLength'])
+                raw_dates.append(cycle['startDate'])
+
+        n_users = len(cycles_by_user)
+        owners = np.asarray(owners, dtype=np.int64)
+        counts = np.bincount(owners, minlength=n_users)
+        width = max(int(counts.max()) if n_users else 0, 1)
+
+        padded_lengths = np.full((n_users, width), np.nan)
+        padded_months = np.zeros((n_users, width), dtype=np.int64)
+        last_start = [None] * n_users
+
+        if len(owners):
+            dates, ordinals, months = self._parse_dates(raw_dates)
+
+            # Sort by (user, start date), keeping input order on ties
+            order = np.lexsort((ordinals, owners))
+            owners = owners[order]
+            offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            columns = np.arange(len(order)) - offsets[owners]
+
+            padded_lengths[owners, columns] = np.asarray(lengths, dtype=float)[order]
+            padded_months[owners, columns] = months[order]
+
+            for user_index in np.where(counts > 0)[0]:
+                last = order[offsets[user_index] + counts[user_index] - 1]
+                last_start[user_index] = dates[last]
+
+        return {
+            'lengths': padded_lengths,
+            'valid': ~np.isnan(padded_lengths),
+            'counts': counts,
+            'months': padded_months,
+            'last_start': last_start
+        }
+
+    def _parse_dates(self, raw_dates: List[str]):
+        """Parse all start dates in one call, falling back to per-value parsing"""
+        try:
+            dates = pd.to_datetime(raw_dates)
+            return dates, dates.asi8, np.asarray(dates.month)
+        except (ValueError, TypeError):
+            # Mixed timezone awareness cannot share one DatetimeIndex
+            dates = [pd.to_datetime(value) for value in raw_dates]
+            ordinals = np.array([d.value for d in dates], dtype=np.int64)
+            months = np.array([d.month for d in dates], dtype=np.int64)
+            return dates, ordinals, months
+
+    def _row_statistics(self, lengths: np.ndarray) -> Dict[str, np.ndarray]:
+        """Row-wise mean, median and population standard deviation"""
+        return {
+            'mean': np.nanmean(lengths, axis=1),
+            'median': np.nanmedian(lengths, axis=1),
+            'std': np.nanstd(lengths, axis=1)
+        }
+
+    def _statistical_prediction(self, lengths: np.ndarray, valid: np.ndarray,
+                                counts: np.ndarray, stats: Dict) -> Dict[str, np.ndarray]:
+        """
+        Vectorized AdvancedCyclePredictor._statistical_prediction
+        """
+        columns = np.arange(lengths.shape[1])
+        filled = np.where(valid, lengths, 0.0)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # Weighted average: exp(linspace(-1, 0, n)) per row
+            steps = np.maximum(counts - 1, 1)[:, None]
+            weights = np.where(valid, np.exp(-1 + columns / steps), 0.0)
+            weights[np.arange(len(counts)), np.maximum(counts - 1, 0)] = np.where(counts > 0, 1.0, 0.0)
+            weighted_avg = (weights * filled).sum(axis=1) / weights.sum(axis=1)
+
+            # Trimmed mean (10% cut from each end)
+            ordered = np.sort(lengths, axis=1)
+            cut = (0.1 * counts).astype(np.int64)[:, None]
+            kept = (columns >= cut) & (columns < counts[:, None] - cut)
+            trimmed_mean = np.where(kept, ordered, 0.0).sum(axis=1) / kept.sum(axis=1)
+
+            predicted_length = np.select(
+                [counts >= 6, counts >= 4],
+                [0.4 * weighted_avg + 0.3 * stats['median'] + 0.3 * trimmed_mean,
+                 0.5 * weighted_avg + 0.5 * stats['median']],
+                0.6 * weighted_avg + 0.4 * stats['median']
+            )
+
+            cv = np.where(stats['mean'] > 0, stats['std'] / stats['mean'], 1)
+
+        confidence = np.clip(1.0 - cv * 1.5, 0.3, 0.95)
+        confidence *= 0.7 + 0.3 * np.minimum(counts / 10, 1.0)
+
+        return {'predicted_length': predicted_length, 'confidence': confidence}
+
+    def _time_series_prediction(self, lengths: np.ndarray, valid: np.ndarray,
+                                counts: np.ndarray, stats: Dict,
+                                months: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Vectorized AdvancedCyclePredictor._time_series_prediction
+
+        Least squares on x = 0..n-1 per row, matching scipy.stats.linregress.
+        """
+        x = np.arange(lengths.shape[1], dtype=float)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            x_mean = (counts - 1) / 2
+            dx = np.where(valid, x - x_mean[:, None], 0.0)
+            dy = np.where(valid, lengths - stats['mean'][:, None], 0.0)
+            ssxm = (dx * dx).sum(axis=1)
+            ssym = (dy * dy).sum(axis=1)
+            ssxym = (dx * dy).sum(axis=1)
+
+            slope = np.where(ssxm > 0, ssxym / ssxm, 0.0)
+            intercept = stats['mean'] - slope * x_mean
+            r_value = np.where((ssxm > 0) & (ssym > 0), ssxym / np.sqrt(ssxm * ssym), 0.0)
+            r_value = np.clip(r_value, -1.0, 1.0)
+
+        trend_prediction = slope * counts + intercept
+        seasonality = self._seasonality(lengths, valid, counts, stats, months)
+
+        predicted_length = np.clip(trend_prediction + seasonality, 21, 40)
+        confidence = np.clip(np.abs(r_value) * np.minimum(counts / 10, 1.0), 0.4, 0.9)
+
+        return {'predicted_length': predicted_length, 'confidence': confidence}
+
+    def _seasonality(self, lengths: np.ndarray, valid: np.ndarray,
+                     counts: np.ndarray, stats: Dict,
+                     months: np.ndarray) -> np.ndarray:
+        """
+        Vectorized AdvancedCyclePredictor._detect_seasonality
+        """
+        seasonality = np.zeros(len(counts))
+        eligible = counts >= 12
+        if not eligible.any():
+            return seasonality
+
+        # Per-month sums and counts: (users x 12)
+        one_hot = (months[:, :, None] == np.arange(1, 13)) & valid[:, :, None]
+        filled = np.where(valid, lengths, 0.0)
+        month_counts = one_hot.sum(axis=1)
+        month_sums = (one_hot * filled[:, :, None]).sum(axis=1)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            monthly_avg = np.where(month_counts > 0, month_sums / month_counts, np.nan)
+            months_present = month_counts.astype(bool).sum(axis=1)
+            monthly_std = np.nanstd(monthly_avg, axis=1, ddof=1)
+            overall_std = np.nanstd(lengths, axis=1, ddof=1)
+
+        rows = np.arange(len(counts))
+        current_month = months[rows, np.maximum(counts - 1, 0)]
+        adjustment = monthly_avg[rows, np.clip(current_month - 1, 0, 11)] - stats['mean']
+
+        seasonal = eligible & (months_present >= 6) & (monthly_std > overall_std * 0.5)
+        seasonality[seasonal] = adjustment[seasonal]
+
+        return seasonality
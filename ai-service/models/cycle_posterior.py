@@ -0,0 +1,101 @@
+# File: ai-service/models/cycle_posterior.py
+from __future__ import annotations
+import copy
+import math
+from typing import Optional, Tuple
+from .cycle_statistics import CycleLengthStats
+from .lazy_imports import lazy_module
+
+pd = lazy_module('pandas')
+stats = lazy_module('scipy.stats')
+
+# Prior: about one 28-day cycle's worth of belief, with a 3-day spread
+PRIOR_MEAN = 28.0
+PRIOR_KAPPA = 1.0
+PRIOR_ALPHA = 2.0
+PRIOR_BETA = 9.0
+
+# Weight kept by each older cycle when a new one is appended
+DEFAULT_DISCOUNT = 0.9
+
+
+class CycleLengthPosterior:
+    """
+    Normal-Inverse-Gamma posterior over a user's cycle length
+
+    Each appended cycle multiplies the weight of every earlier cycle by
+    ``discount``, so the posterior follows recent cycles (about
+    1 / (1 - discount) cycles of memory) while the prior stays fixed.
+    The discounted weight, mean and sum of squared deviations are updated
+    Welford-style, so appending a cycle and reading the predictive
+    distribution are O(1). The undiscounted history summary used for the
+    descriptive response fields is kept in a CycleLengthStats.
+    """
+
+    def __init__(self, discount: float = DEFAULT_DISCOUNT, prior_mean: float = PRIOR_MEAN,
+                 prior_kappa: float = PRIOR_KAPPA, prior_alpha: float = PRIOR_ALPHA,
+                 prior_beta: float = PRIOR_BETA):
+        if not 0 < discount <= 1:
+            raise ValueError(f"Discount must be in (0, 1], got {discount}")
+        self.discount = discount
+        self.prior_mean = prior_mean
+        self.prior_kappa = prior_kappa
+        self.prior_alpha = prior_alpha
+        self.prior_beta = prior_beta
+
+        # Discounted effective cycle count, mean and squared deviations
+        self.weight = 0.0
+        self.weighted_mean = 0.0
+        self.weighted_m2 = 0.0
+
+        self.history = CycleLengthStats()
+        self.last_start: Optional[pd.Timestamp] = None
+        # Newest (start ordinal, length) and the fingerprint of the history
+        # the posterior was built from, set by cycle_posterior; None until then
+        self.last_cycle: Optional[Tuple[int, int]] = None
+        self.fingerprint: Optional[bytes] = None
+
+    @property
+    def count(self) -> int:
+        return self.history.count
+
+    def append(self, length: float, start_date: pd.Timestamp, start_ordinal: int) -> None:
+        """Add the newest cycle in O(1)"""
+        self.history.append(length)
+        value = float(length)
+
+        # Age the earlier cycles, then add this one with weight 1
+        self.weight = self.discount * self.weight + 1
+        self.weighted_m2 *= self.discount
+        delta = value - self.weighted_mean
+        self.weighted_mean += delta / self.weight
+        self.weighted_m2 += delta * (value - self.weighted_mean)
+
+        self.last_start = start_date
+        self.last_cycle = (int(start_ordinal), int(length))
+        # Stale until cycle_posterior stamps the fingerprint of the new history
+        self.fingerprint = None
+
+    def parameters(self) -> Tuple[float, float, float, float]:
+        """Posterior (mu, kappa, alpha, beta)"""
+        kappa = self.prior_kappa + self.weight
+        mu = (self.prior_kappa * self.prior_mean + self.weight * self.weighted_mean) / kappa
+        alpha = self.prior_alpha + self.weight / 2
+        shift = self.weighted_mean - self.prior_mean
+        beta = (self.prior_beta + self.weighted_m2 / 2
+                + self.prior_kappa * self.weight * shift * shift / (2 * kappa))
+        return mu, kappa, alpha, beta
+
+    def predictive(self) -> Tuple[float, float, float]:
+        """Student-t predictive of the next cycle length: (mean, scale, degrees of freedom)"""
+        mu, kappa, alpha, beta = self.parameters()
+        scale = math.sqrt(beta * (kappa + 1) / (alpha * kappa))
+        return mu, scale, 2 * alpha
+
+    def interval_half_width(self, level: float = 0.95) -> float:
+        """Half width of the central predictive interval"""
+        _, scale, dof = self.predictive()
+        return float(stats.t.ppf(0.5 + level / 2, dof)) * scale
+
+    def copy(self) -> 'CycleLengthPosterior':
+        return copy.deepcopy(self)
@@ -1,34 +1,59 @@
 # File: ai-service/models/cycle_predictor.py
+from __future__ import annotations
 import numpy as np
-import pandas as pd
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
-from scipy import stats
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.preprocessing import StandardScaler
+from .analysis_context import AnalysisContext, calculate_bmi, calculate_age
+from .cycle_posterior import CycleLengthPosterior
+from .cycle_statistics import (CycleLengthStats, CycleTrendStats, history_fingerprints,
+                               match_history, validate_cycle_length)
+from .lazy_imports import lazy_module
+from .population_model import PopulationCycleModel, ml_feature_columns
+import hashlib
 import warnings
 warnings.filterwarnings('ignore')
 
+pd = lazy_module('pandas')
+stats = lazy_module('scipy.stats')
+
 class AdvancedCyclePredictor:
     """
     Advanced cycle prediction using ensemble ML models and time series analysis
     """
     
-    def __init__(self):
+    ML_MODES = ('pretrained', 'per_request')
+    ENGINES = ('ensemble', 'bayesian')
+    
+    def __init__(self, population_model: Optional[PopulationCycleModel] = None,
+                 ml_mode: str = 'pretrained', model_cache=None):
+        if ml_mode not in self.ML_MODES:
+            raise ValueError(f"Unknown ML mode '{ml_mode}', expected one of {self.ML_MODES}")
+        
         self.min_cycles_for_prediction = 2
         self.ideal_cycles_for_ml = 6
         self.ensemble_threshold = 8  # Use ensemble when we have enough data
         
-        # ML models
-        self.rf_model = RandomForestRegressor(n_estimators=50, random_state=42)
-        self.gb_model = GradientBoostingRegressor(n_estimators=50, random_state=42)
-        self.scaler = StandardScaler()
+        # ML model settings; fitted estimators are never stored on the
+        # instance, so one predictor can serve concurrent requests
+        self.ml_n_estimators = 50
+        self.ml_random_state = 42
+        
+        # Offline-trained ensemble; 'per_request' fits fresh estimators instead
+        self.population_model = population_model
+        self.ml_mode = ml_mode
         
-        # Model trained flag
-        self.models_trained = False
+        # Optional get/put cache (services.cache.LRUCache) of per-user fitted
+        # estimators, so unchanged cycle histories are not refit
+        self.model_cache = model_cache
+        
+        # Recency discount of the 'bayesian' engine's cycle-length posterior
+        self.posterior_discount = 0.9
         
     def predict_next_period(self, cycles: List[Dict], 
-                           health_metrics: Optional[Dict] = None) -> Optional[Dict]:
+                           health_metrics: Optional[Dict] = None,
+                           context: Optional[AnalysisContext] = None,
+                           engine: str = 'ensemble',
+                           posterior: Optional[CycleLengthPosterior] = None) -> Optional[Dict]:
         """
         Advanced prediction with ensemble ML models and health integration
         
@@ -37,12 +62,32 @@ class AdvancedCyclePredictor:
         2. Time series decomposition
         3. Ensemble ML (Random Forest + Gradient Boosting)
         4. Health-adjusted predictions
+        
+        A prebuilt AnalysisContext takes precedence over cycles/health_metrics.
+        engine='bayesian' instead reads the prediction from a cycle-length
+        posterior (see cycle_posterior), built from the history unless an
+        up-to-date one is passed in, without fitting any model.
         """
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {self.ENGINES}")
+        
+        if context is None:
+            context = AnalysisContext.from_payload(cycles, health_metrics=health_metrics)
+        cycles = context.cycles
+        health_metrics = context.health_metrics
+        
         if len(cycles) < self.min_cycles_for_prediction:
             return self._baseline_prediction(cycles)
         
+        if engine == 'bayesian':
+            if len(context.cycle_lengths) < 2:
+                return self._baseline_prediction(cycles)
+            if posterior is None:
+                posterior = self.cycle_posterior(context)
+            return self._bayesian_prediction(posterior, health_metrics)
+        
         # Prepare data
-        df = self._prepare_dataframe(cycles, health_metrics)
+        df = context.cycle_frame
         
         if df is None or len(df) < 2:
             return self._baseline_prediction(cycles)
@@ -54,11 +99,13 @@ class AdvancedCyclePredictor:
         predictions['statistical'] = self._statistical_prediction(df, cycles)
         
         # Method 2: Time series prediction
-        predictions['time_series'] = self._time_series_prediction(df)
+        predictions['time_series'] = self._time_series_prediction(df, context.cycle_trends)
         
         # Method 3: ML ensemble (if enough data)
         if len(cycles) >= self.ensemble_threshold:
-            predictions['ml_ensemble'] = self._ml_ensemble_prediction(df, health_metrics)
+            predictions['ml_ensemble'] = self._ml_ensemble_prediction(
+                df, health_metrics, user_id=context.user_id
+            )
         
         # Method 4: Weighted ensemble of all methods
         final_prediction = self._ensemble_predictions(
@@ -74,49 +121,7 @@ class AdvancedCyclePredictor:
         """
         Prepare pandas DataFrame from cycle data with feature engineering
         """
-        if not cycles:
-            return None
-        
-        data = []
-        for i, cycle in enumerate(cycles):
-            if not cycle.get('cycleLength'):
-                continue
-            
-            row = {
-                'cycle_number': len(cycles) - i,
-                'cycle_length': cycle['cycleLength'],
-                'start_date': pd.to_datetime(cycle['startDate']),
-            }
-            
-            # Add temporal features
-            row['month'] = row['start_date'].month
-            row['season'] = (row['start_date'].month % 12 + 3) // 3
-            row['day_of_year'] = row['start_date'].dayofyear
-            
-            # Add health metrics if available
-            if health_metrics:
-                row['bmi'] = self._calculate_bmi(health_metrics)
-                row['age'] = self._calculate_age(health_metrics.get('birthdate'))
-            
-            data.append(row)
-        
-        if not data:
-            return None
-        
-        df = pd.DataFrame(data)
-        df = df.sort_values('start_date')
-        
-        # Feature engineering
-        df['cycle_length_ma3'] = df['cycle_length'].rolling(window=3, min_periods=1).mean()
-        df['cycle_length_ma5'] = df['cycle_length'].rolling(window=5, min_periods=1).mean()
-        df['cycle_length_std3'] = df['cycle_length'].rolling(window=3, min_periods=1).std()
-        df['days_since_start'] = (df['start_date'] - df['start_date'].min()).dt.days
-        
-        # Lag features
-        df['prev_cycle_length'] = df['cycle_length'].shift(1)
-        df['prev_2_cycle_length'] = df['cycle_length'].shift(2)
-        
-        return df
+        return AnalysisContext.from_payload(cycles, health_metrics=health_metrics).cycle_frame
     
     def _statistical_prediction(self, df: pd.DataFrame, 
                                cycles: List[Dict]) -> Dict:
@@ -175,15 +180,14 @@ class AdvancedCyclePredictor:
             }
         }
     
-    def _time_series_prediction(self, df: pd.DataFrame) -> Dict:
+    def _time_series_prediction(self, df: pd.DataFrame, trends: CycleTrendStats) -> Dict:
         """
         Time series analysis using decomposition and trend detection
         """
         cycle_lengths = df['cycle_length'].values
         
-        # Detect trend using linear regression
-        x = np.arange(len(cycle_lengths))
-        slope, intercept, r_value, p_value, std_err = stats.linregress(x, cycle_lengths)
+        # Detect trend using linear regression over the running sums
+        slope, intercept, r_value, p_value = trends.linear_trend()
         
         # Predict next value
         next_x = len(cycle_lengths)
@@ -241,7 +245,8 @@ class AdvancedCyclePredictor:
         return 0
     
     def _ml_ensemble_prediction(self, df: pd.DataFrame, 
-                               health_metrics: Optional[Dict]) -> Dict:
+                               health_metrics: Optional[Dict],
+                               user_id: Optional[str] = None) -> Dict:
         """
         Machine learning ensemble prediction using Random Forest and Gradient Boosting
         """
@@ -249,13 +254,7 @@ class AdvancedCyclePredictor:
             return {'method': 'ml_ensemble', 'confidence': 0, 'note': 'Insufficient data for ML'}
         
         # Prepare features
-        feature_cols = ['cycle_number', 'cycle_length_ma3', 'cycle_length_ma5']
-        
-        if 'bmi' in df.columns:
-            feature_cols.extend(['bmi', 'age'])
-        
-        if 'month' in df.columns:
-            feature_cols.extend(['month', 'season'])
+        feature_cols = ml_feature_columns(df)
         
         # Remove rows with NaN
         df_clean = df[feature_cols + ['cycle_length']].dropna()
@@ -271,21 +270,17 @@ class AdvancedCyclePredictor:
             return {'method': 'ml_ensemble', 'confidence': 0, 'note': 'Need more data'}
         
         try:
-            # Scale features
-            X_scaled = self.scaler.fit_transform(X)
-            
-            # Train models
-            self.rf_model.fit(X_scaled, y)
-            self.gb_model.fit(X_scaled, y)
-            
             # Prepare prediction features
             last_row = df_clean[feature_cols].iloc[-1:].values
             last_row[0] += 1  # Increment cycle number
-            X_pred = self.scaler.transform(last_row)
             
-            # Get predictions
-            rf_pred = self.rf_model.predict(X_pred)[0]
-            gb_pred = self.gb_model.predict(X_pred)[0]
+            if self.ml_mode == 'pretrained' and self.population_model is not None \
+                    and self.population_model.supports(feature_cols):
+                rf_pred, gb_pred = self.population_model.predict(feature_cols, last_row)
+                model_version = self.population_model.version
+            else:
+                rf_pred, gb_pred = self._fit_and_predict(X, y, last_row, user_id)
+                model_version = 'per_request'
             
             # Ensemble prediction (weighted average)
             predicted_length = 0.6 * rf_pred + 0.4 * gb_pred
@@ -300,7 +295,8 @@ class AdvancedCyclePredictor:
                 'confidence': min(confidence, 0.92),
                 'rf_prediction': rf_pred,
                 'gb_prediction': gb_pred,
-                'model_agreement': agreement
+                'model_agreement': agreement,
+                'model_version': model_version
             }
         
         except Exception as e:
@@ -310,6 +306,58 @@ class AdvancedCyclePredictor:
                 'error': str(e)
             }
     
+    def _fit_and_predict(self, X: np.ndarray, y: np.ndarray, X_pred: np.ndarray,
+                         user_id: Optional[str] = None) -> Tuple[float, float]:
+        """
+        Predict with per-user Random Forest and Gradient Boosting models
+        
+        Fitted models are reused from the model cache while the user's
+        training rows (and so their cycle lengths) are unchanged.
+        """
+        key = None
+        models = None
+        if self.model_cache is not None:
+            fingerprint = hashlib.sha256()
+            for array in (X, y):
+                array = np.ascontiguousarray(array, dtype=float)
+                fingerprint.update(str(array.shape).encode())
+                fingerprint.update(array.tobytes())
+            key = ('ml_ensemble', user_id, fingerprint.hexdigest())
+            models = self.model_cache.get(key)
+        
+        if models is None:
+            models = self._fit_models(X, y)
+            if key is not None:
+                self.model_cache.put(key, models)
+        
+        scaler, rf_model, gb_model = models
+        
+        # Get predictions
+        X_pred = scaler.transform(X_pred)
+        return rf_model.predict(X_pred)[0], gb_model.predict(X_pred)[0]
+    
+    def _fit_models(self, X: np.ndarray, y: np.ndarray) -> Tuple:
+        """
+        Fit a fresh scaler, Random Forest and Gradient Boosting model
+        """
+        from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+        from sklearn.preprocessing import StandardScaler
+        
+        scaler = StandardScaler()
+        rf_model = RandomForestRegressor(n_estimators=self.ml_n_estimators,
+                                         random_state=self.ml_random_state)
+        gb_model = GradientBoostingRegressor(n_estimators=self.ml_n_estimators,
+                                             random_state=self.ml_random_state)
+        
+        # Scale features
+        X_scaled = scaler.fit_transform(X)
+        
+        # Train models
+        rf_model.fit(X_scaled, y)
+        gb_model.fit(X_scaled, y)
+        
+        return scaler, rf_model, gb_model
+    
     def _ensemble_predictions(self, predictions: Dict, 
                              df: pd.DataFrame,
                              health_metrics: Optional[Dict]) -> Dict:
@@ -339,28 +387,105 @@ class AdvancedCyclePredictor:
             predicted_length = np.average(predicted_lengths, weights=weights)
         
         # Get base prediction data
-        stat_pred = predictions.get('statistical', {})
         last_start = df['start_date'].iloc[-1]
-        predicted_date = last_start + timedelta(days=int(predicted_length))
         
         # Calculate final confidence
         confidences = [p['confidence'] for p in valid_predictions]
         final_confidence = np.average(confidences, weights=weights)
         
+        # Calculate statistics
+        cycle_lengths = df['cycle_length'].values
+        
+        return self._format_prediction(
+            predicted_length,
+            final_confidence,
+            last_start,
+            np.mean(cycle_lengths),
+            np.median(cycle_lengths),
+            np.std(cycle_lengths),
+            len(cycle_lengths),
+            list(predictions.keys()),
+            {p.get('method'): w for p, w in zip(valid_predictions, weights)},
+            health_metrics
+        )
+    
+    def cycle_posterior(self, context: AnalysisContext,
+                        posterior: Optional[CycleLengthPosterior] = None) -> CycleLengthPosterior:
+        """
+        Bring a stored cycle-length posterior up to date with a request's history
+        
+        A posterior that holds the request's whole history is returned as is,
+        and one that holds it without its latest cycle takes that cycle in
+        O(1). Anything else (edited, inserted or removed cycles) is rebuilt
+        from every cycle. Confirming a match hashes the history once (see
+        match_history), so a request costs O(n) hashing but no refit.
+        """
+        lengths = context.cycle_lengths
+        ordinals = context.cycle_start_ordinals
+        
+        status, fingerprint = match_history(posterior, lengths, ordinals)
+        if status is None:
+            posterior = CycleLengthPosterior(discount=self.posterior_discount)
+            for i in range(len(lengths)):
+                posterior.append(lengths[i], context.cycle_start_dates[i], ordinals[i])
+            fingerprint = history_fingerprints(lengths, ordinals)[1]
+        elif status == 'behind':
+            posterior.append(lengths[-1], context.cycle_start_dates[-1], ordinals[-1])
+        posterior.fingerprint = fingerprint
+        return posterior
+    
+    def _bayesian_prediction(self, posterior: CycleLengthPosterior,
+                             health_metrics: Optional[Dict]) -> Dict:
+        """
+        Prediction from the posterior predictive of the next cycle length
+        """
+        predicted_length, scale, _ = posterior.predictive()
+        
+        # Same confidence scale as the statistical method, using the
+        # predictive spread and the discounted (effective) cycle count
+        cv = scale / predicted_length if predicted_length > 0 else 1
+        confidence = max(0.3, min(0.95, 1.0 - (cv * 1.5)))
+        confidence *= (0.7 + 0.3 * min(posterior.weight / 10, 1.0))
+        
+        history = posterior.history
+        return self._format_prediction(
+            predicted_length,
+            confidence,
+            posterior.last_start,
+            history.mean(),
+            history.median(),
+            history.std(),
+            history.count,
+            ['bayesian'],
+            {'bayesian': 1.0},
+            health_metrics,
+            window_days=max(2, int(posterior.interval_half_width(0.95)))
+        )
+    
+    def _format_prediction(self, predicted_length: float, final_confidence: float,
+                          last_start: pd.Timestamp, mean_length: float,
+                          median_length: float, std_length: float,
+                          num_cycles: int, methods_used: List[str],
+                          method_weights: Dict[str, float],
+                          health_metrics: Optional[Dict],
+                          window_days: Optional[int] = None) -> Dict:
+        """
+        Build the prediction response from already combined ensemble values
+        
+        window_days defaults to 1.96 standard deviations of the history.
+        """
+        predicted_date = last_start + timedelta(days=int(predicted_length))
+        
         # Adjust for health metrics
         if health_metrics:
             health_adjustment = self._health_adjustment_factor(health_metrics)
             final_confidence *= health_adjustment
         
-        # Calculate statistics
-        cycle_lengths = df['cycle_length'].values
-        mean_length = np.mean(cycle_lengths)
-        std_length = np.std(cycle_lengths)
-        median_length = np.median(cycle_lengths)
         variability = std_length / mean_length if mean_length > 0 else 0
         
         # Probability window
-        window_days = max(2, int(std_length * 1.96))
+        if window_days is None:
+            window_days = max(2, int(std_length * 1.96))
         window_start = predicted_date - timedelta(days=window_days)
         window_end = predicted_date + timedelta(days=window_days)
         
@@ -368,7 +493,7 @@ class AdvancedCyclePredictor:
         regularity_score = 1.0 - min(variability, 1.0)
         
         # Prediction quality
-        quality = self._get_prediction_quality(len(cycle_lengths), final_confidence)
+        quality = self._get_prediction_quality(num_cycles, final_confidence)
         
         # Build comprehensive result
         result = {
@@ -386,12 +511,12 @@ class AdvancedCyclePredictor:
             'variability': round(float(variability), 2),
             'standardDeviation': round(float(std_length), 2),
             'regularityScore': round(float(regularity_score), 2),
-            'cyclesAnalyzed': len(cycle_lengths),
+            'cyclesAnalyzed': num_cycles,
             'predictionQuality': quality,
-            'methodsUsed': list(predictions.keys()),
+            'methodsUsed': methods_used,
             'ensembleWeight': {
                 method: round(float(w), 2) 
-                for method, w in zip([p.get('method') for p in valid_predictions], weights)
+                for method, w in method_weights.items()
             }
         }
         
@@ -401,7 +526,7 @@ class AdvancedCyclePredictor:
         
         # Add insights
         result['insights'] = self._generate_insights(
-            predicted_length, mean_length, regularity_score, len(cycle_lengths)
+            predicted_length, mean_length, regularity_score, num_cycles
         )
         
         return result
@@ -459,42 +584,11 @@ class AdvancedCyclePredictor:
     
     def _calculate_bmi(self, health_metrics: Dict) -> float:
         """Calculate BMI from health metrics"""
-        if not health_metrics:
-            return 0
-        
-        height = health_metrics.get('height', 0)
-        weight = health_metrics.get('weight', 0)
-        use_metric = health_metrics.get('useMetric', True)
-        
-        if height <= 0 or weight <= 0:
-            return 0
-        
-        if not use_metric:
-            height_cm = height * 30.48
-            weight_kg = weight * 0.453592
-        else:
-            height_cm = height
-            weight_kg = weight
-        
-        height_m = height_cm / 100
-        return weight_kg / (height_m ** 2) if height_m > 0 else 0
+        return calculate_bmi(health_metrics)
     
     def _calculate_age(self, birthdate_str: Optional[str]) -> Optional[int]:
         """Calculate age from birthdate"""
-        if not birthdate_str:
-            return None
-        
-        try:
-            birthdate = pd.to_datetime(birthdate_str)
-            today = pd.Timestamp.now()
-            age = today.year - birthdate.year
-            if today.month < birthdate.month or (
-                today.month == birthdate.month and today.day < birthdate.day
-            ):
-                age -= 1
-            return age
-        except:
-            return None
+        return calculate_age(birthdate_str)
     
     def _baseline_prediction(self, cycles: List[Dict]) -> Optional[Dict]:
         """Fallback baseline prediction"""
@@ -574,10 +668,15 @@ class AdvancedCyclePredictor:
         
         return insights
     
-    def detect_anomaly(self, cycles: List[Dict]) -> Dict:
+    def detect_anomaly(self, cycles: List[Dict],
+                       context: Optional[AnalysisContext] = None) -> Dict:
         """
         Advanced anomaly detection with multiple statistical methods
         """
+        if context is None:
+            context = AnalysisContext.from_payload(cycles)
+        cycles = context.cycles
+        
         if len(cycles) < 3:
             return {
                 'detected': False,
@@ -586,29 +685,75 @@ class AdvancedCyclePredictor:
                 'description': 'Need at least 3 cycles for anomaly detection'
             }
         
-        df = self._prepare_dataframe(cycles, None)
-        if df is None or len(df) < 3:
+        cycle_lengths = context.cycle_lengths
+        if len(cycle_lengths) < 3:
             return {'detected': False, 'score': 0, 'severity': 'none'}
         
-        cycle_lengths = df['cycle_length'].values
         current_length = cycle_lengths[-1]
         historical = cycle_lengths[:-1]
         
+        return self._score_anomaly(current_length, *self._anomaly_statistics(historical))
+    
+    def _anomaly_statistics(self, historical: np.ndarray) -> Tuple:
+        """Mean, std, q1, q3, median and MAD of the earlier cycle lengths"""
+        q1, q3 = np.percentile(historical, [25, 75])
+        median_hist = np.median(historical)
+        mad = np.median(np.abs(historical - median_hist))
+        return np.mean(historical), np.std(historical), q1, q3, median_hist, mad
+    
+    def cycle_length_state(self, cycle_lengths: np.ndarray) -> CycleLengthStats:
+        """Running statistics of a cycle history for detect_anomaly_incremental"""
+        return CycleLengthStats(cycle_lengths)
+    
+    def detect_anomaly_incremental(self, state: CycleLengthStats, cycle_length: float,
+                                   verify: bool = False) -> Dict:
+        """
+        Score a newly logged cycle against a user's running statistics, then add it
+        
+        Gives the detect_anomaly result for the history with this cycle last,
+        in O(log n). With verify, the statistics are also recomputed from the
+        full history and 'consistencyCheck' reports whether both results match.
+        """
+        validate_cycle_length(cycle_length)
+        
+        if state.count < 2:
+            result = {
+                'detected': False,
+                'score': 0,
+                'severity': 'none',
+                'description': 'Need at least 3 cycles for anomaly detection'
+            }
+        else:
+            result = self._score_anomaly(cycle_length, *state.summary())
+            
+            if verify:
+                expected = self._score_anomaly(
+                    cycle_length, *self._anomaly_statistics(state.lengths())
+                )
+                result['consistencyCheck'] = {
+                    'matches': expected == result,
+                    'fullRecompute': expected
+                }
+        
+        state.append(cycle_length)
+        return result
+    
+    def _score_anomaly(self, current_length: float, mean_hist: float,
+                      std_hist: float, q1: float, q3: float,
+                      median_hist: float, mad: float) -> Dict:
+        """
+        Score the latest cycle against summary statistics of the earlier ones
+        """
         # Method 1: Z-score
-        mean_hist = np.mean(historical)
-        std_hist = np.std(historical)
         z_score = abs((current_length - mean_hist) / std_hist) if std_hist > 0 else 0
         
         # Method 2: IQR method
-        q1, q3 = np.percentile(historical, [25, 75])
         iqr = q3 - q1
         lower_bound = q1 - 1.5 * iqr
         upper_bound = q3 + 1.5 * iqr
         is_outlier_iqr = current_length < lower_bound or current_length > upper_bound
         
         # Method 3: Modified Z-score (more robust)
-        median_hist = np.median(historical)
-        mad = np.median(np.abs(historical - median_hist))
         modified_z = 0.6745 * (current_length - median_hist) / mad if mad > 0 else 0
         
         # Combine methods
@@ -664,18 +809,23 @@ class AdvancedCyclePredictor:
             }
         }
     
-    def get_detailed_insights(self, cycles: List[Dict]) -> Dict:
+    def get_detailed_insights(self, cycles: List[Dict],
+                              context: Optional[AnalysisContext] = None) -> Dict:
         """
         Comprehensive cycle analysis with advanced metrics
         """
+        if context is None:
+            context = AnalysisContext.from_payload(cycles)
+        cycles = context.cycles
+        
         if not cycles:
             return {'hasData': False, 'message': 'No cycle data available'}
         
-        df = self._prepare_dataframe(cycles, None)
+        df = context.cycle_frame
         if df is None:
             return {'hasData': False, 'message': 'Invalid cycle data'}
         
-        cycle_lengths = df['cycle_length'].dropna().values
+        cycle_lengths = context.cycle_lengths
         
         if len(cycle_lengths) == 0:
             return {'hasData': False, 'message': 'No completed cycles'}
@@ -697,7 +847,7 @@ class AdvancedCyclePredictor:
         regularity = self._assess_regularity(cycle_lengths)
         
         # Trend detection
-        trends = self._detect_comprehensive_trends(df)
+        trends = self._detect_comprehensive_trends(df, context.cycle_trends)
         
         # Consistency metrics
         consistency = self._calculate_advanced_consistency(cycle_lengths)
@@ -765,19 +915,17 @@ class AdvancedCyclePredictor:
             'withinTwoDaysPercent': round(float(within_two_days * 100), 1)
         }
     
-    def _detect_comprehensive_trends(self, df: pd.DataFrame) -> Dict:
+    def _detect_comprehensive_trends(self, df: pd.DataFrame, trends: CycleTrendStats) -> Dict:
         """Advanced trend detection"""
         if len(df) < 4:
             return {'hasTrend': False, 'description': 'Need more data for trend analysis'}
         
-        cycle_lengths = df['cycle_length'].values
-        x = np.arange(len(cycle_lengths))
-        
         # Linear trend
-        slope, intercept, r_value, p_value, std_err = stats.linregress(x, cycle_lengths)
+        slope, intercept, r_value, p_value = trends.linear_trend()
         
         # Polynomial trend (2nd degree)
-        poly_coeffs = np.polyfit(x, cycle_lengths, 2) if len(cycle_lengths) >= 6 else None
+        quadratic = trends.quadratic_trend() if len(df) >= 6 else None
+        recent = trends.rolling_features()
         
         # Determine trend direction and significance
         if p_value > 0.05:
@@ -805,7 +953,13 @@ class AdvancedCyclePredictor:
             'rSquared': round(float(r_value ** 2), 3),
             'pValue': round(float(p_value), 4),
             'significance': 'significant' if p_value < 0.05 else 'not significant',
-            'trendStrength': 'strong' if abs(r_value) > 0.7 else 'moderate' if abs(r_value) > 0.4 else 'weak'
+            'trendStrength': 'strong' if abs(r_value) > 0.7 else 'moderate' if abs(r_value) > 0.4 else 'weak',
+            'curvature': round(float(quadratic[0]), 4) if quadratic else None,
+            'quadraticRSquared': round(float(quadratic[3]), 3) if quadratic else None,
+            'recentAverage': {
+                'last3Cycles': round(recent['cycle_length_ma3'], 1),
+                'last5Cycles': round(recent['cycle_length_ma5'], 1)
+            }
         }
     
     def _calculate_advanced_consistency(self, cycle_lengths: np.ndarray) -> Dict:
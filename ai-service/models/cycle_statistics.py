@@ -0,0 +1,342 @@
+# File: ai-service/models/cycle_statistics.py
+import hashlib
+import math
+import numpy as np
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from .lazy_imports import lazy_module
+
+stats = lazy_module('scipy.stats')
+
+# Longest cycle length, in days, the running statistics can hold
+MAX_CYCLE_DAYS = 180
+
+
+def validate_cycle_length(length: float) -> int:
+    """Validate a cycle length for the order-statistics tree"""
+    value = float(length)
+    if not value.is_integer() or not 1 <= value <= MAX_CYCLE_DAYS:
+        raise ValueError(f"Cycle length must be a whole number of days between 1 and "
+                         f"{MAX_CYCLE_DAYS}, got {length}")
+    return int(value)
+
+
+def history_fingerprints(lengths: Sequence[int],
+                         start_ordinals: Sequence[int]) -> Tuple[bytes, bytes]:
+    """
+    Fingerprints of a cycle history without its newest cycle and in full
+
+    Both come from one SHA-256 pass over the packed (start ordinal, length)
+    pairs, so this is O(n) but costs a few microseconds for hundreds of cycles.
+    """
+    cycles = np.column_stack((np.asarray(start_ordinals, dtype='<i8'),
+                              np.asarray(lengths, dtype='<i8')))
+    digest = hashlib.sha256(cycles[:-1].tobytes())
+    previous = digest.digest()
+    digest.update(cycles[-1:].tobytes())
+    return previous, digest.digest()
+
+
+def match_history(state, lengths: Sequence[int],
+                  start_ordinals: Sequence[int]) -> Tuple[Optional[str], Optional[bytes]]:
+    """
+    How a stored per-user state relates to a request's full cycle history
+
+    Returns ('current', fingerprint) when the state holds exactly the
+    history, ('behind', fingerprint) when it holds all of it but the newest
+    cycle and (None, None) otherwise. The state's count and newest
+    (start ordinal, length) are compared first, so a state that cannot
+    match is rejected without hashing; only a candidate match is confirmed
+    against the fingerprint, which catches edits to older cycles.
+    """
+    n_cycles = len(lengths)
+    if state is None or state.fingerprint is None or n_cycles == 0:
+        return None, None
+
+    if state.count == n_cycles:
+        newest = -1
+    elif state.count == n_cycles - 1 and n_cycles > 1:
+        newest = -2
+    else:
+        return None, None
+    if state.last_cycle != (int(start_ordinals[newest]), int(lengths[newest])):
+        return None, None
+
+    previous, fingerprint = history_fingerprints(lengths, start_ordinals)
+    if newest == -1 and state.fingerprint == fingerprint:
+        return 'current', fingerprint
+    if newest == -2 and state.fingerprint == previous:
+        return 'behind', fingerprint
+    return None, None
+
+
+class FenwickCounter:
+    """
+    Counts of small non-negative integers in a Fenwick (binary indexed) tree
+
+    Adding a value, counting values <= x and finding the k-th smallest
+    value are all O(log size).
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._tree: List[int] = [0] * (size + 1)
+        self._top_bit = 1 << (size.bit_length() - 1) if size > 0 else 0
+
+    def add(self, value: int, delta: int = 1) -> None:
+        i = value + 1
+        while i <= self.size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def count_le(self, value: int) -> int:
+        """Number of stored values <= value"""
+        i = min(value + 1, self.size)
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def kth(self, k: int) -> int:
+        """k-th smallest stored value (0-based)"""
+        position = 0
+        remaining = k + 1
+        bit = self._top_bit
+        while bit:
+            step = position + bit
+            if step <= self.size and self._tree[step] < remaining:
+                position = step
+                remaining -= self._tree[step]
+            bit >>= 1
+        return position
+
+    def counts(self) -> np.ndarray:
+        """Count of every value 0..size-1"""
+        cumulative = np.array([self.count_le(value) for value in range(self.size)])
+        return np.diff(cumulative, prepend=0)
+
+
+class CycleLengthStats:
+    """
+    Running summary of a user's cycle lengths for incremental anomaly scoring
+
+    Keeps the count, sum and sum of squares as exact integers plus a Fenwick
+    tree of how often each length occurred, so the mean, standard deviation,
+    quartiles, median and MAD of the history are read in O(log n) instead
+    of sorting it for every new cycle.
+    """
+
+    def __init__(self, lengths: Iterable[float] = ()):
+        self.count = 0
+        self.total = 0
+        self.total_squares = 0
+        self._tree = FenwickCounter(MAX_CYCLE_DAYS + 1)
+        for length in lengths:
+            self.append(length)
+
+    def append(self, length: float) -> None:
+        value = validate_cycle_length(length)
+        self._tree.add(value)
+        self.count += 1
+        self.total += value
+        self.total_squares += value * value
+
+    def mean(self) -> float:
+        return self.total / self.count
+
+    def std(self) -> float:
+        """Population standard deviation (as np.std)"""
+        # n^2 * variance is an exact integer
+        spread = self.count * self.total_squares - self.total * self.total
+        return math.sqrt(spread) / self.count
+
+    def percentile(self, q: float) -> float:
+        """Linearly interpolated percentile (as np.percentile)"""
+        position = q / 100 * (self.count - 1)
+        below = math.floor(position)
+        above = min(below + 1, self.count - 1)
+        fraction = position - below
+
+        low, high = self._tree.kth(below), self._tree.kth(above)
+        difference = high - low
+        if fraction >= 0.5:
+            return high - difference * (1 - fraction)
+        return low + difference * fraction
+
+    def median(self) -> float:
+        middle = self.count // 2
+        if self.count % 2:
+            return float(self._tree.kth(middle))
+        return (self._tree.kth(middle - 1) + self._tree.kth(middle)) / 2
+
+    def mad(self) -> float:
+        """Median absolute deviation from the median"""
+        median = self.median()
+        middle = self.count // 2
+        if self.count % 2:
+            return self._kth_deviation(median, middle)
+        return (self._kth_deviation(median, middle - 1) + self._kth_deviation(median, middle)) / 2
+
+    def _kth_deviation(self, center: float, k: int) -> float:
+        """k-th smallest |length - center|, by binary search over the deviation"""
+        # Deviations from a whole or half-day center step by whole days
+        offset = center - math.floor(center)
+        low, high = 0, MAX_CYCLE_DAYS + 1
+        while low < high:
+            step = (low + high) // 2
+            deviation = step + offset
+            within = (self._tree.count_le(math.floor(center + deviation))
+                      - self._tree.count_le(math.ceil(center - deviation) - 1))
+            if within >= k + 1:
+                high = step
+            else:
+                low = step + 1
+        return low + offset
+
+    def summary(self) -> Tuple[float, float, float, float, float, float]:
+        """Mean, std, q1, q3, median and MAD, as passed to _score_anomaly"""
+        return (self.mean(), self.std(), self.percentile(25), self.percentile(75),
+                self.median(), self.mad())
+
+    def lengths(self) -> np.ndarray:
+        """Every stored length in ascending order"""
+        counts = self._tree.counts()
+        return np.repeat(np.arange(len(counts)), counts).astype(float)
+
+
+class CycleTrendStats:
+    """
+    Regression sums and a recent-cycle window over a user's cycle lengths
+
+    Cycle i (0-based, oldest first) is the point (x = i, y = length). The
+    sums of x^k (k <= 4), y, y^2, xy and x^2y are exact integers, so the
+    linear trend (as scipy.stats.linregress), the quadratic trend (as
+    np.polyfit) and their R-squared are read in O(1) after an O(1) append,
+    as are the rolling features of the newest cycle from the window.
+    """
+
+    WINDOW = 5
+
+    def __init__(self, lengths: Iterable[int] = ()):
+        self.count = 0
+        self.sum_x = self.sum_x2 = self.sum_x3 = self.sum_x4 = 0
+        self.sum_y = self.sum_y2 = self.sum_xy = self.sum_x2y = 0
+        self.window: deque = deque(maxlen=self.WINDOW)
+        # Newest (start ordinal, length) and the fingerprint of the history
+        # the sums were built from, set by sync; None until then
+        self.last_cycle: Optional[Tuple[int, int]] = None
+        self.fingerprint: Optional[bytes] = None
+        for length in lengths:
+            self.append(length)
+
+    @classmethod
+    def sync(cls, state: Optional['CycleTrendStats'], lengths: Sequence[int],
+             start_ordinals: Sequence[int]) -> 'CycleTrendStats':
+        """
+        Bring a stored state up to date with a full cycle history
+
+        A state that holds the whole history is returned as is, and one that
+        holds it without its newest cycle takes that cycle in O(1); anything
+        else (an edited, inserted or removed cycle) is rebuilt from every
+        cycle. Confirming a match hashes the history once (see
+        match_history), so a request costs O(n) hashing but no refit.
+        """
+        status, fingerprint = match_history(state, lengths, start_ordinals)
+        if status is None:
+            state = cls()
+            for length, ordinal in zip(lengths, start_ordinals):
+                state.append(length, ordinal)
+            fingerprint = history_fingerprints(lengths, start_ordinals)[1]
+        elif status == 'behind':
+            state.append(lengths[-1], start_ordinals[-1])
+        state.fingerprint = fingerprint
+        return state
+
+    def append(self, length: int, start_ordinal: Optional[int] = None) -> None:
+        """Add the newest cycle in O(1)"""
+        x, y = self.count, int(length)
+        x2 = x * x
+        self.count += 1
+        self.sum_x += x
+        self.sum_x2 += x2
+        self.sum_x3 += x2 * x
+        self.sum_x4 += x2 * x2
+        self.sum_y += y
+        self.sum_y2 += y * y
+        self.sum_xy += x * y
+        self.sum_x2y += x2 * y
+        self.window.append(y)
+        self.last_cycle = (int(start_ordinal), y) if start_ordinal is not None else None
+        # Stale until sync stamps the fingerprint of the new history
+        self.fingerprint = None
+
+    def linear_trend(self) -> Tuple[float, float, float, float]:
+        """(slope, intercept, r, p) as scipy.stats.linregress; needs two cycles"""
+        n = self.count
+        # n^2 times the (co)variances, as exact integers
+        sxx = n * self.sum_x2 - self.sum_x * self.sum_x
+        syy = n * self.sum_y2 - self.sum_y * self.sum_y
+        sxy = n * self.sum_xy - self.sum_x * self.sum_y
+
+        slope = sxy / sxx
+        intercept = (self.sum_y - slope * self.sum_x) / n
+        r_value = sxy / math.sqrt(sxx * syy) if syy > 0 else 0.0
+        r_value = min(max(r_value, -1.0), 1.0)
+
+        if n == 2:
+            p_value = 1.0 if syy == 0 else 0.0
+        else:
+            dof = n - 2
+            t_value = r_value * math.sqrt(dof / ((1.0 - r_value + 1e-20) * (1.0 + r_value + 1e-20)))
+            p_value = float(2 * stats.t.sf(abs(t_value), dof))
+        return slope, intercept, r_value, p_value
+
+    def quadratic_trend(self) -> Tuple[float, float, float, float]:
+        """(a, b, c, R-squared) of the least-squares y = a*x^2 + b*x + c; needs three cycles"""
+        n = self.count
+        s1, s2, s3, s4 = self.sum_x, self.sum_x2, self.sum_x3, self.sum_x4
+        t0, t1, t2 = self.sum_y, self.sum_xy, self.sum_x2y
+
+        def det(a, b, c, d, e, f, g, h, i):
+            return a * (e * i - f * h) - b * (d * i - f * g) + c * (d * h - e * g)
+
+        # Cramer's rule on the integer normal equations keeps them exact
+        d = det(s4, s3, s2, s3, s2, s1, s2, s1, n)
+        da = det(t2, s3, s2, t1, s2, s1, t0, s1, n)
+        db = det(s4, t2, s2, s3, t1, s1, s2, t0, n)
+        dc = det(s4, s3, t2, s3, s2, t1, s2, s1, t0)
+
+        # Residual and total sums of squares, scaled by d and by n
+        explained = da * t2 + db * t1 + dc * t0
+        total = n * self.sum_y2 - t0 * t0
+        r_squared = 1 - n * (self.sum_y2 * d - explained) / (d * total) if total > 0 else 0.0
+        return da / d, db / d, dc / d, r_squared
+
+    def rolling_features(self) -> Dict[str, float]:
+        """
+        Rolling and lag features of the newest cycle, as in AnalysisContext.cycle_frame
+
+        Only the insights trend reads these; the ML ensemble trains on every
+        row, so its rolling features still come from cycle_frame.
+        """
+        recent = list(self.window)
+        last3 = recent[-3:]
+        mean3 = sum(last3) / len(last3)
+        if len(last3) > 1:
+            std3 = math.sqrt(sum((value - mean3) ** 2 for value in last3) / (len(last3) - 1))
+        else:
+            std3 = math.nan
+        return {
+            'cycle_length_ma3': mean3,
+            'cycle_length_ma5': sum(recent) / len(recent),
+            'cycle_length_std3': std3,
+            'prev_cycle_length': float(recent[-2]) if len(recent) > 1 else math.nan,
+            'prev_2_cycle_length': float(recent[-3]) if len(recent) > 2 else math.nan
+        }
+
+    def copy(self) -> 'CycleTrendStats':
+        state = CycleTrendStats()
+        state.__dict__.update(self.__dict__)
+        state.window = deque(self.window, maxlen=self.WINDOW)
+        return state
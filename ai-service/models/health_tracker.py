@@ -1,7 +1,7 @@
 # File: ai-service/models/health_tracker_advanced.py
-from datetime import datetime
 from typing import Dict, Optional, List
 import numpy as np
+from .analysis_context import AnalysisContext
 
 class AdvancedHealthTracker:
     """Advanced health metrics analysis with cycle correlation"""
@@ -18,26 +18,31 @@ class AdvancedHealthTracker:
     
     def comprehensive_health_analysis(self, health_metrics: Dict,
                                      cycles: List[Dict],
-                                     symptoms: List[Dict]) -> Dict:
+                                     symptoms: List[Dict],
+                                     context: Optional[AnalysisContext] = None) -> Dict:
         """Complete health analysis with cycle correlation"""
-        age = self._calculate_age(health_metrics.get('birthdate'))
-        bmi_data = self._comprehensive_bmi_analysis(health_metrics)
+        if context is None:
+            context = AnalysisContext.from_payload(cycles, symptoms, health_metrics)
+        symptoms = context.symptoms
+        
+        age = context.age
+        bmi_data = self._comprehensive_bmi_analysis(context.health_metrics, context.bmi)
         
         # Correlation with cycle
         cycle_impact = self._analyze_health_cycle_correlation(
-            bmi_data, cycles
+            bmi_data, context
         )
         
         # Symptom correlation
         symptom_correlation = None
         if symptoms and len(symptoms) >= 10:
             symptom_correlation = self._analyze_health_symptom_correlation(
-                bmi_data, symptoms
+                bmi_data, context.symptom_totals
             )
         
         # Risk assessment
         risk_assessment = self._comprehensive_risk_assessment(
-            bmi_data, age, cycles
+            bmi_data, age, context.cycle_lengths
         )
         
         # Recommendations
@@ -59,23 +64,15 @@ class AdvancedHealthTracker:
             'overallScore': self._calculate_health_score(bmi_data, age, risk_assessment)
         }
     
-    def _comprehensive_bmi_analysis(self, health_metrics: Dict) -> Dict:
+    def _comprehensive_bmi_analysis(self, health_metrics: Dict, bmi: float) -> Dict:
         """Detailed BMI analysis"""
+        if bmi <= 0:
+            return {'status': 'incomplete_data'}
+        
         height = health_metrics.get('height', 0)
-        weight = health_metrics.get('weight', 0)
         use_metric = health_metrics.get('useMetric', True)
+        height_cm = height if use_metric else height * 30.48
         
-        if not use_metric:
-            height_cm = height * 30.48
-            weight_kg = weight * 0.453592
-        else:
-            height_cm = height
-            weight_kg = weight
-        
-        if height_cm <= 0 or weight_kg <= 0:
-            return {'status': 'incomplete_data'}
-        
-        bmi = weight_kg / ((height_cm / 100) ** 2)
         category = self._get_detailed_bmi_category(bmi)
         ideal_range = self._calculate_ideal_weight_range(height_cm, use_metric)
         
@@ -176,15 +173,15 @@ class AdvancedHealthTracker:
         return implications.get(category, ['Consult healthcare provider'])
     
     def _analyze_health_cycle_correlation(self, bmi_data: Dict,
-                                         cycles: List[Dict]) -> Dict:
+                                         context: AnalysisContext) -> Dict:
         """Analyze correlation between health metrics and cycle"""
-        if not cycles or 'value' not in bmi_data:
+        if not context.cycles or 'value' not in bmi_data:
             return {'status': 'insufficient_data'}
         
         bmi = bmi_data['value']
-        cycle_lengths = [c['cycleLength'] for c in cycles if c.get('cycleLength')]
+        cycle_lengths = context.cycle_lengths
         
-        if not cycle_lengths:
+        if len(cycle_lengths) == 0:
             return {'status': 'no_cycle_data'}
         
         variability = np.std(cycle_lengths) / np.mean(cycle_lengths) if len(cycle_lengths) > 1 else 0
@@ -224,19 +221,12 @@ class AdvancedHealthTracker:
             return 'Maintain current healthy habits'
     
     def _analyze_health_symptom_correlation(self, bmi_data: Dict,
-                                           symptoms: List[Dict]) -> Dict:
+                                           total_severity: np.ndarray) -> Dict:
         """Analyze correlation between health and symptoms"""
         if 'value' not in bmi_data:
             return {'status': 'insufficient_data'}
         
-        # Aggregate symptom severity
-        total_severity = []
-        for log in symptoms:
-            if 'symptoms' in log:
-                severity = sum(log['symptoms'].values())
-                total_severity.append(severity)
-        
-        if not total_severity:
+        if len(total_severity) == 0:
             return {'status': 'no_symptom_data'}
         
         avg_severity = np.mean(total_severity)
@@ -262,7 +252,7 @@ class AdvancedHealthTracker:
         }
     
     def _comprehensive_risk_assessment(self, bmi_data: Dict, age: Optional[int],
-                                      cycles: List[Dict]) -> Dict:
+                                      cycle_lengths: np.ndarray) -> Dict:
         """Comprehensive health risk assessment"""
         if 'value' not in bmi_data:
             return {'level': 'unknown', 'factors': []}
@@ -287,13 +277,11 @@ class AdvancedHealthTracker:
             risk_score += 1
         
         # Cycle variability
-        if cycles:
-            lengths = [c['cycleLength'] for c in cycles if c.get('cycleLength')]
-            if lengths:
-                var = np.std(lengths) / np.mean(lengths)
-                if var > 0.2:
-                    risk_factors.append('High cycle variability detected')
-                    risk_score += 1
+        if len(cycle_lengths) > 0:
+            var = np.std(cycle_lengths) / np.mean(cycle_lengths)
+            if var > 0.2:
+                risk_factors.append('High cycle variability detected')
+                risk_score += 1
         
         # Determine overall level
         if risk_score == 0:
@@ -421,17 +409,3 @@ class AdvancedHealthTracker:
             'rating': rating,
             'interpretation': f"Your health score is {rating.replace('_', ' ')}"
         }
-    
-    def _calculate_age(self, birthdate_str: Optional[str]) -> Optional[int]:
-        """Calculate age from birthdate"""
-        if not birthdate_str:
-            return None
-        try:
-            birthdate = datetime.fromisoformat(birthdate_str.replace('Z', '+00:00'))
-            today = datetime.now()
-            age = today.year - birthdate.year
-            if today.month < birthdate.month or (today.month == birthdate.month and today.day < birthdate.day):
-                age -= 1
-            return age
-        except:
-            return None
\ No newline at end of file
@@ -0,0 +1,61 @@
+# File: ai-service/models/lazy_imports.py
+import importlib
+import threading
+import time
+from types import ModuleType
+from typing import Dict, Optional
+
+_lock = threading.RLock()
+_modules: Dict[str, 'LazyModule'] = {}
+_load_seconds: Dict[str, float] = {}
+
+
+class LazyModule(ModuleType):
+    """
+    Stand-in for a heavy module that is imported on first attribute access
+
+    Lets the service answer /health after a cold start before pandas, scipy
+    and scikit-learn are loaded; each library loads when the first code path
+    that needs it runs.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__['_module']
+        if module is None:
+            with _lock:
+                module = self.__dict__['_module']
+                if module is None:
+                    started = time.perf_counter()
+                    module = importlib.import_module(self.__name__)
+                    _load_seconds[self.__name__] = time.perf_counter() - started
+                    self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        value = getattr(self._load(), attr)
+        # Later lookups are plain attribute reads
+        self.__dict__[attr] = value
+        return value
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_module(name: str) -> LazyModule:
+    """Shared lazy stand-in for the named module"""
+    with _lock:
+        module = _modules.get(name)
+        if module is None:
+            module = _modules[name] = LazyModule(name)
+        return module
+
+
+def lazy_load_report() -> Dict[str, Optional[float]]:
+    """Seconds each lazy module took to import (None while not loaded)"""
+    with _lock:
+        return {name: round(_load_seconds[name], 4) if name in _load_seconds else None
+                for name in sorted(_modules)}
@@ -0,0 +1,77 @@
+# File: ai-service/models/phase_mapper.py
+import numpy as np
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple
+
+PHASES = ('menstrual', 'follicular', 'ovulation', 'luteal')
+
+# Phase code of days outside the cycle (cycle day 0 or missing)
+UNKNOWN_CODE = -1
+
+DEFAULT_CYCLE_LENGTH = 28
+# Shortest length that keeps the ovulation window after menstruation
+MIN_CYCLE_LENGTH = 20
+MAX_CYCLE_LENGTH = 60
+
+# Phase name of each code, with None in the last slot for UNKNOWN_CODE
+_PHASE_NAMES = np.array(PHASES + (None,), dtype=object)
+
+
+def typical_cycle_length(cycle_lengths: Sequence[float], recent: int = 6) -> int:
+    """Predicted cycle length: median of the most recent logged lengths, or 28"""
+    lengths = np.asarray(cycle_lengths, dtype=float)[-recent:]
+    lengths = lengths[~np.isnan(lengths)]
+    if len(lengths) == 0:
+        return DEFAULT_CYCLE_LENGTH
+    return int(round(float(np.median(lengths))))
+
+
+class PhaseMapper:
+    """
+    Cycle day to menstrual phase mapping for one cycle length
+
+    Ovulation is anchored to the end of the cycle (the luteal phase length
+    is the stable part), so for a cycle of L days:
+    menstrual 1-5, follicular 6 to L-15, ovulation L-14 to L-11 and
+    luteal L-10 to L. Days past L stay luteal. L = 28 gives the original
+    fixed table.
+    """
+
+    def __init__(self, cycle_length: int = DEFAULT_CYCLE_LENGTH):
+        length = min(max(int(cycle_length), MIN_CYCLE_LENGTH), MAX_CYCLE_LENGTH)
+        self.cycle_length = length
+
+        self.boundaries: Dict[str, Tuple[int, int]] = {
+            'menstrual': (1, 5),
+            'follicular': (6, length - 15),
+            'ovulation': (length - 14, length - 11),
+            'luteal': (length - 10, length)
+        }
+
+        # Code of every day 0..L+1; days past L are clipped onto L+1
+        lookup = np.full(length + 2, UNKNOWN_CODE, dtype=np.int8)
+        for code, phase in enumerate(PHASES):
+            start, end = self.boundaries[phase]
+            lookup[start:end + 1] = code
+        lookup[length + 1] = PHASES.index('luteal')
+        lookup.setflags(write=False)
+        self._lookup = lookup
+
+    def codes(self, cycle_days) -> np.ndarray:
+        """Phase code (index into PHASES, or UNKNOWN_CODE) of each cycle day"""
+        days = np.clip(np.asarray(cycle_days, dtype=np.int64), 0, self.cycle_length + 1)
+        return self._lookup[days]
+
+    def phases(self, cycle_days) -> np.ndarray:
+        """Phase name of each cycle day (None for day 0 or earlier)"""
+        return _PHASE_NAMES[self.codes(cycle_days)]
+
+    def phase(self, cycle_day: int) -> Optional[str]:
+        """Phase name of one cycle day"""
+        return _PHASE_NAMES[self.codes([cycle_day])[0]]
+
+
+@lru_cache(maxsize=64)
+def phase_mapper(cycle_length: int = DEFAULT_CYCLE_LENGTH) -> PhaseMapper:
+    """Shared PhaseMapper for a cycle length (mappers are immutable)"""
+    return PhaseMapper(cycle_length)
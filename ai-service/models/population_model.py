@@ -0,0 +1,174 @@
+# File: ai-service/models/population_model.py
+from __future__ import annotations
+import numpy as np
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+from .lazy_imports import lazy_module
+import warnings
+warnings.filterwarnings('ignore')
+
+if TYPE_CHECKING:
+    from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+    from sklearn.preprocessing import StandardScaler
+
+pd = lazy_module('pandas')
+
+# Bumped whenever the artifact layout changes
+FORMAT_VERSION = 1
+
+# Feature columns used by the ML ensemble, by whether health metrics were sent
+FEATURE_SETS = {
+    'base': ('cycle_number', 'cycle_length_ma3', 'cycle_length_ma5', 'month', 'season'),
+    'health': ('cycle_number', 'cycle_length_ma3', 'cycle_length_ma5',
+               'bmi', 'age', 'month', 'season')
+}
+
+
+def ml_feature_columns(df: pd.DataFrame) -> List[str]:
+    """Feature columns of the ML ensemble for a cycle frame"""
+    feature_cols = ['cycle_number', 'cycle_length_ma3', 'cycle_length_ma5']
+
+    if 'bmi' in df.columns:
+        feature_cols.extend(['bmi', 'age'])
+
+    if 'month' in df.columns:
+        feature_cols.extend(['month', 'season'])
+
+    return feature_cols
+
+
+def training_pairs(df: pd.DataFrame, feature_cols: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Features of each cycle paired with the length of the cycle after it"""
+    df_clean = df[feature_cols + ['cycle_length']].dropna()
+    X = df_clean[feature_cols].values[:-1].astype(float)
+    y = df_clean['cycle_length'].values[1:].astype(float)
+    return X, y
+
+
+def estimate_model_bytes(models: Tuple) -> int:
+    """Approximate memory of a (scaler, rf_model, gb_model) tuple"""
+    scaler, rf_model, gb_model = models
+    trees = list(rf_model.estimators_) + [tree for stage in gb_model.estimators_ for tree in stage]
+
+    # Each tree node stores children, feature, threshold, impurity, sample
+    # counts and its value (~72 bytes), plus fixed per-estimator overhead
+    nodes = sum(tree.tree_.node_count for tree in trees)
+    return nodes * 72 + len(trees) * 1024 + scaler.n_features_in_ * 24
+
+
+class PopulationCycleModel:
+    """
+    Cycle-length ensemble trained offline over pooled per-cycle features
+
+    Holds one fitted scaler, Random Forest and Gradient Boosting model per
+    feature set, so requests only run predict. Build it with
+    train_cycle_model.py and load it once at startup.
+    """
+
+    def __init__(self, n_estimators: int = 50, random_state: int = 42):
+        self.n_estimators = n_estimators
+        self.random_state = random_state
+        self.estimators: Dict[str, Tuple[StandardScaler, RandomForestRegressor,
+                                         GradientBoostingRegressor]] = {}
+        self.metadata: Dict = {}
+
+    def fit(self, frames: Iterable[pd.DataFrame]) -> 'PopulationCycleModel':
+        """Fit every feature set on the pooled cycles of many users"""
+        import sklearn
+        from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+        from sklearn.preprocessing import StandardScaler
+        
+        pooled = {name: ([], [], 0) for name in FEATURE_SETS}
+
+        for df in frames:
+            if df is None or len(df) < 2:
+                continue
+            name = self.feature_set_name(ml_feature_columns(df))
+            if name is None:
+                continue
+
+            X, y = training_pairs(df, list(FEATURE_SETS[name]))
+            if len(X) == 0:
+                continue
+
+            xs, ys, users = pooled[name]
+            xs.append(X)
+            ys.append(y)
+            pooled[name] = (xs, ys, users + 1)
+
+        samples = {}
+        for name, (xs, ys, users) in pooled.items():
+            if not xs:
+                continue
+
+            X = np.vstack(xs)
+            y = np.concatenate(ys)
+
+            scaler = StandardScaler()
+            X_scaled = scaler.fit_transform(X)
+            rf_model = RandomForestRegressor(n_estimators=self.n_estimators,
+                                             random_state=self.random_state)
+            gb_model = GradientBoostingRegressor(n_estimators=self.n_estimators,
+                                                 random_state=self.random_state)
+            rf_model.fit(X_scaled, y)
+            gb_model.fit(X_scaled, y)
+
+            self.estimators[name] = (scaler, rf_model, gb_model)
+            samples[name] = {'users': users, 'cycles': int(len(y))}
+
+        trained_at = datetime.now()
+        self.metadata = {
+            'formatVersion': FORMAT_VERSION,
+            'version': trained_at.strftime('%Y%m%d%H%M%S'),
+            'trainedAt': trained_at.isoformat(),
+            'sklearnVersion': sklearn.__version__,
+            'nEstimators': self.n_estimators,
+            'featureSets': {name: list(FEATURE_SETS[name]) for name in self.estimators},
+            'samples': samples
+        }
+        return self
+
+    @staticmethod
+    def feature_set_name(feature_cols: List[str]) -> Optional[str]:
+        """Name of the feature set matching these columns, if any"""
+        for name, columns in FEATURE_SETS.items():
+            if tuple(feature_cols) == columns:
+                return name
+        return None
+
+    def supports(self, feature_cols: List[str]) -> bool:
+        """Whether a fitted model exists for these feature columns"""
+        return self.feature_set_name(feature_cols) in self.estimators
+
+    def predict(self, feature_cols: List[str], X: np.ndarray) -> Tuple[float, float]:
+        """Random Forest and Gradient Boosting predictions for one row"""
+        scaler, rf_model, gb_model = self.estimators[self.feature_set_name(feature_cols)]
+        X_scaled = scaler.transform(X)
+        return rf_model.predict(X_scaled)[0], gb_model.predict(X_scaled)[0]
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.metadata.get('version')
+
+    def save(self, path: str) -> None:
+        """Write the fitted estimators and metadata to a joblib artifact"""
+        import joblib
+        joblib.dump({'metadata': self.metadata, 'estimators': self.estimators}, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'PopulationCycleModel':
+        """Load an artifact written by save"""
+        import joblib
+        artifact = joblib.load(path)
+        metadata = artifact.get('metadata', {})
+
+        if metadata.get('formatVersion') != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported cycle model format {metadata.get('formatVersion')} "
+                f"(expected {FORMAT_VERSION})"
+            )
+
+        model = cls(n_estimators=metadata.get('nEstimators', 50))
+        model.estimators = artifact['estimators']
+        model.metadata = metadata
+        return model
@@ -1,32 +1,44 @@
 # File: ai-service/models/symptom_analyzer.py
+from __future__ import annotations
 import numpy as np
-import pandas as pd
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
-from scipy import stats
-from sklearn.cluster import KMeans
-from collections import Counter
+from .analysis_context import AnalysisContext, SYMPTOM_TYPES
+from .phase_mapper import PHASES, PhaseMapper, phase_mapper, typical_cycle_length
+from .lazy_imports import lazy_module
 import warnings
 warnings.filterwarnings('ignore')
 
+pd = lazy_module('pandas')
+stats = lazy_module('scipy.stats')
+
 class AdvancedSymptomAnalyzer:
     """
     Advanced symptom analysis with pattern recognition and predictive modeling
     """
     
-    def __init__(self):
-        self.symptom_types = [
-            'cramps', 'mood', 'energy', 'headache', 'bloating',
-            'acne', 'breast_tenderness', 'cravings', 'sleep_quality',
-            'anxiety', 'irritability', 'fatigue'
-        ]
-        
-        self.phase_days = {
-            'menstrual': (1, 5),
-            'follicular': (6, 13),
-            'ovulation': (14, 17),
-            'luteal': (18, 28)
-        }
+    CLUSTER_MODES = ('full', 'fast')
+    
+    def __init__(self, cluster_mode: str = 'full', centroid_cache=None):
+        if cluster_mode not in self.CLUSTER_MODES:
+            raise ValueError(
+                f"Unknown cluster mode '{cluster_mode}', expected one of {self.CLUSTER_MODES}"
+            )
+        
+        self.symptom_types = list(SYMPTOM_TYPES)
+        
+        # 'full' runs KMeans with 10 k-means++ inits; 'fast' uses one init,
+        # warm-started from the user's cached centroids when available, and
+        # mini-batches once the history reaches minibatch_min_days
+        self.cluster_mode = cluster_mode
+        self.minibatch_min_days = 365
+        self.cluster_random_state = 42
+        
+        # Optional get/put cache (services.cache.LRUCache) of fitted centroids
+        self.centroid_cache = centroid_cache
+        
+        # Longest cycle forecast_cycle will return
+        self.max_forecast_days = 60
         
         # Symptom severity thresholds
         self.severity_thresholds = {
@@ -38,10 +50,16 @@ class AdvancedSymptomAnalyzer:
         }
     
     def analyze_patterns(self, symptoms: List[Dict], cycles: List[Dict],
-                        health_metrics: Optional[Dict] = None) -> Dict:
+                        health_metrics: Optional[Dict] = None,
+                        context: Optional[AnalysisContext] = None) -> Dict:
         """
         Comprehensive symptom pattern analysis with ML-enhanced insights
         """
+        if context is None:
+            context = AnalysisContext.from_payload(cycles, symptoms, health_metrics)
+        symptoms = context.symptoms
+        health_metrics = context.health_metrics
+        
         if not symptoms or len(symptoms) < 5:
             return {
                 'hasData': False,
@@ -51,7 +69,7 @@ class AdvancedSymptomAnalyzer:
             }
         
         # Prepare data
-        df = self._prepare_symptom_dataframe(symptoms, cycles)
+        df = self._symptom_frame(context)
         
         if df is None or len(df) < 5:
             return {
@@ -65,9 +83,21 @@ class AdvancedSymptomAnalyzer:
         temporal_patterns = {}
         severity_analysis = {}
         
-        # Analyze each symptom type
-        for s_type in self.symptom_types:
-            if s_type in df.columns:
+        # Analyze each symptom type; complete columns go through one 2-D pass
+        present = [s_type for s_type in self.symptom_types if s_type in df.columns]
+        matrix = df[present].to_numpy(dtype=float)
+        missing = np.isnan(matrix).any(axis=0)
+        logged = (matrix != 0).any(axis=0)
+        
+        dense = [j for j in range(len(present)) if logged[j] and not missing[j]]
+        dense_insights = self._analyze_symptom_matrix(
+            matrix[:, dense], [present[j] for j in dense]
+        ) if dense else {}
+        
+        for j, s_type in enumerate(present):
+            if s_type in dense_insights:
+                symptom_insights[s_type] = dense_insights[s_type]
+            elif missing[j]:
                 values = df[s_type].dropna()
                 if len(values) > 0 and not all(v == 0 for v in values):
                     symptom_insights[s_type] = self._analyze_symptom_comprehensive(
@@ -79,7 +109,8 @@ class AdvancedSymptomAnalyzer:
             phase_correlations = self._analyze_phase_correlations(df, symptom_insights.keys())
         
         # Temporal pattern detection
-        temporal_patterns = self._detect_temporal_patterns(df, symptom_insights.keys())
+        temporal_patterns = self._detect_temporal_patterns(df, symptom_insights.keys(),
+                                                           user_id=context.user_id)
         
         # Severity clustering
         severity_analysis = self._analyze_severity_patterns(df, symptom_insights.keys())
@@ -92,7 +123,8 @@ class AdvancedSymptomAnalyzer:
             symptom_insights,
             phase_correlations,
             temporal_patterns,
-            health_metrics
+            health_metrics,
+            context.bmi
         )
         
         # Risk assessment
@@ -119,105 +151,109 @@ class AdvancedSymptomAnalyzer:
     def _prepare_symptom_dataframe(self, symptoms: List[Dict], 
                                    cycles: List[Dict]) -> Optional[pd.DataFrame]:
         """Prepare comprehensive symptom dataframe"""
-        data = []
+        return self._symptom_frame(AnalysisContext.from_payload(cycles, symptoms))
+    
+    def _symptom_frame(self, context: AnalysisContext) -> Optional[pd.DataFrame]:
+        """Build the symptom dataframe from a parsed analysis context"""
+        if len(context.symptom_matrix) == 0:
+            return None
         
-        for log in symptoms:
-            if 'symptoms' not in log:
-                continue
-            
-            row = {
-                'date': pd.to_datetime(log.get('date', log.get('createdAt'))),
-                'cycleDay': log.get('cycleDay', 0)
-            }
-            
-            # Add all symptom values
-            for s_type in self.symptom_types:
-                row[s_type] = log['symptoms'].get(s_type, 0)
-            
-            # Determine phase
-            row['phase'] = self._get_phase_from_day(row['cycleDay'])
-            
-            # Add temporal features
-            row['dayOfWeek'] = row['date'].dayofweek
-            row['isWeekend'] = row['dayOfWeek'] >= 5
-            row['month'] = row['date'].month
-            
-            data.append(row)
+        dates = context.symptom_dates
+        matrix = context.symptom_matrix
+        day_of_week = np.asarray(dates.dayofweek, dtype=np.int64)
         
-        if not data:
-            return None
+        columns = {'date': dates, 'cycleDay': context.symptom_cycle_days}
+        columns.update(zip(self.symptom_types, matrix.T))
         
-        df = pd.DataFrame(data)
-        df = df.sort_values('date')
+        # Phase, weekday and month as whole arrays
+        columns['phase'] = self._phase_mapper(context).phases(context.symptom_cycle_days)
+        columns['dayOfWeek'] = day_of_week
+        columns['isWeekend'] = day_of_week >= 5
+        columns['month'] = np.asarray(dates.month, dtype=np.int64)
         
-        # Calculate rolling averages for smoothing
-        for s_type in self.symptom_types:
-            if s_type in df.columns:
-                df[f'{s_type}_ma3'] = df[s_type].rolling(window=3, min_periods=1).mean()
-                df[f'{s_type}_ma7'] = df[s_type].rolling(window=7, min_periods=1).mean()
+        # Rolling averages for smoothing, over all symptoms at once
+        ma3 = pd.DataFrame(matrix).rolling(window=3, min_periods=1).mean().to_numpy()
+        ma7 = pd.DataFrame(matrix).rolling(window=7, min_periods=1).mean().to_numpy()
+        for j, s_type in enumerate(self.symptom_types):
+            columns[f'{s_type}_ma3'] = ma3[:, j]
+            columns[f'{s_type}_ma7'] = ma7[:, j]
         
-        return df
+        return pd.DataFrame(columns)
+    
+    def _phase_mapper(self, context: AnalysisContext) -> PhaseMapper:
+        """Phase boundaries for the user's predicted cycle length"""
+        return phase_mapper(typical_cycle_length(context.cycle_lengths))
     
     def _analyze_symptom_comprehensive(self, symptom_type: str, 
                                       values: pd.Series,
                                       df: pd.DataFrame) -> Dict:
         """Comprehensive analysis of a single symptom"""
-        values_array = values.values
+        matrix = np.asarray(values.values, dtype=float)[:, None]
+        return self._analyze_symptom_matrix(matrix, [symptom_type])[symptom_type]
+    
+    def _analyze_symptom_matrix(self, matrix: np.ndarray,
+                                symptom_types: List[str]) -> Dict[str, Dict]:
+        """
+        Comprehensive analysis of every symptom column in one pass
+        
+        matrix is (days x symptoms) without NaN; statistics, percentiles and
+        trend regressions are computed for all columns at once.
+        """
+        # One contiguous row per symptom, so each reduction matches its 1-D form
+        values = np.ascontiguousarray(np.asarray(matrix, dtype=float).T)
+        n_days = values.shape[1]
         
         # Basic statistics
-        avg = np.mean(values_array)
-        median = np.median(values_array)
-        std = np.std(values_array)
-        max_val = np.max(values_array)
-        min_val = np.min(values_array)
+        avg = np.mean(values, axis=1)
+        median = np.median(values, axis=1)
+        std = np.std(values, axis=1)
+        max_val = np.max(values, axis=1)
+        min_val = np.min(values, axis=1)
+        percentiles = np.percentile(values, [25, 50, 75, 90], axis=1)
         
         # Frequency analysis
-        non_zero = values_array[values_array > 0]
-        frequency = len(non_zero) / len(values_array) if len(values_array) > 0 else 0
-        
-        # Severity classification
-        severity = self._classify_severity(avg)
+        non_zero = np.count_nonzero(values > 0, axis=1)
         
         # Trend detection
-        trend = self._detect_symptom_trend_advanced(values_array)
-        
-        # Variability analysis
-        cv = std / avg if avg > 0 else 0
-        variability_category = self._classify_variability(cv)
+        trends = self._detect_symptom_trends(values)
         
-        # Peak detection
-        peaks = self._detect_peaks(values_array)
+        # Peaks and streaks
+        peaks = self._detect_peaks_matrix(values)
+        persistence = self._analyze_persistence_matrix(values)
         
-        # Persistence analysis
-        persistence = self._analyze_persistence(values_array)
-        
-        # Calculate percentiles
-        percentiles = {
-            '25th': float(np.percentile(values_array, 25)),
-            '50th': float(np.percentile(values_array, 50)),
-            '75th': float(np.percentile(values_array, 75)),
-            '90th': float(np.percentile(values_array, 90))
-        }
+        results = {}
+        for j, symptom_type in enumerate(symptom_types):
+            frequency = int(non_zero[j]) / n_days if n_days > 0 else 0
+            
+            # Variability analysis
+            cv = std[j] / avg[j] if avg[j] > 0 else 0
+            
+            results[symptom_type] = {
+                'average': round(float(avg[j]), 1),
+                'median': round(float(median[j]), 1),
+                'standardDeviation': round(float(std[j]), 2),
+                'minimum': float(min_val[j]),
+                'maximum': float(max_val[j]),
+                'range': float(max_val[j] - min_val[j]),
+                'frequency': round(frequency, 2),
+                'frequencyPercent': round(frequency * 100, 1),
+                'severity': self._classify_severity(avg[j]),
+                'isSignificant': avg[j] > 3 or max_val[j] > 6,
+                'trend': trends[j],
+                'variability': self._classify_variability(cv),
+                'coefficientOfVariation': round(float(cv), 2),
+                'peaks': peaks[j],
+                'persistence': persistence[j],
+                'percentiles': {
+                    '25th': float(percentiles[0, j]),
+                    '50th': float(percentiles[1, j]),
+                    '75th': float(percentiles[2, j]),
+                    '90th': float(percentiles[3, j])
+                },
+                'impactScore': self._calculate_impact_score(avg[j], frequency, max_val[j])
+            }
         
-        return {
-            'average': round(float(avg), 1),
-            'median': round(float(median), 1),
-            'standardDeviation': round(float(std), 2),
-            'minimum': float(min_val),
-            'maximum': float(max_val),
-            'range': float(max_val - min_val),
-            'frequency': round(frequency, 2),
-            'frequencyPercent': round(frequency * 100, 1),
-            'severity': severity,
-            'isSignificant': avg > 3 or max_val > 6,
-            'trend': trend,
-            'variability': variability_category,
-            'coefficientOfVariation': round(float(cv), 2),
-            'peaks': peaks,
-            'persistence': persistence,
-            'percentiles': percentiles,
-            'impactScore': self._calculate_impact_score(avg, frequency, max_val)
-        }
+        return results
     
     def _classify_severity(self, avg_value: float) -> str:
         """Classify symptom severity"""
@@ -241,16 +277,45 @@ class AdvancedSymptomAnalyzer:
     
     def _detect_symptom_trend_advanced(self, values: np.ndarray) -> Dict:
         """Advanced trend detection with statistical significance"""
-        if len(values) < 4:
-            return {
+        return self._detect_symptom_trends(np.asarray(values, dtype=float)[None, :])[0]
+    
+    def _detect_symptom_trends(self, values: np.ndarray) -> List[Dict]:
+        """
+        Trend regression for each row of a (symptoms x days) array
+        
+        Least squares on x = 0..n-1, matching scipy.stats.linregress (r = 0
+        for constant rows) with a two-sided t-test p-value.
+        """
+        n_rows, n_days = values.shape
+        if n_days < 4:
+            return [{
                 'direction': 'insufficient_data',
                 'strength': 0,
                 'significance': 'unknown'
-            }
+            } for _ in range(n_rows)]
         
-        x = np.arange(len(values))
-        slope, intercept, r_value, p_value, std_err = stats.linregress(x, values)
+        x = np.arange(n_days, dtype=float)
+        dx = x - x.mean()
+        dy = values - values.mean(axis=1, keepdims=True)
         
+        ssxm = np.dot(dx, dx) / n_days
+        ssym = np.einsum('ij,ij->i', dy, dy) / n_days
+        ssxym = dy @ dx / n_days
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r_values = np.where(ssym > 0, ssxym / np.sqrt(ssxm * ssym), 0.0)
+        r_values = np.clip(r_values, -1.0, 1.0)
+        slopes = ssxym / ssxm
+        
+        dof = n_days - 2
+        t_values = r_values * np.sqrt(dof / ((1.0 - r_values + 1e-20) * (1.0 + r_values + 1e-20)))
+        p_values = 2 * stats.t.sf(np.abs(t_values), dof)
+        
+        return [self._describe_trend(slope, r_value, p_value)
+                for slope, r_value, p_value in zip(slopes, r_values, p_values)]
+    
+    def _describe_trend(self, slope: float, r_value: float, p_value: float) -> Dict:
+        """Classify one fitted trend"""
         # Determine direction
         if p_value > 0.05:
             direction = 'stable'
@@ -293,48 +358,61 @@ class AdvancedSymptomAnalyzer:
     
     def _detect_peaks(self, values: np.ndarray) -> Dict:
         """Detect symptom peaks"""
-        if len(values) < 3:
-            return {'count': 0, 'averageIntensity': 0}
-        
-        # Find local maxima
-        peaks = []
-        for i in range(1, len(values) - 1):
-            if values[i] > values[i-1] and values[i] > values[i+1] and values[i] >= 6:
-                peaks.append(values[i])
-        
-        return {
-            'count': len(peaks),
-            'averageIntensity': round(float(np.mean(peaks)), 1) if peaks else 0,
-            'maxIntensity': float(max(peaks)) if peaks else 0,
-            'frequency': round(len(peaks) / len(values), 2) if len(values) > 0 else 0
-        }
+        return self._detect_peaks_matrix(np.asarray(values, dtype=float)[None, :])[0]
+    
+    def _detect_peaks_matrix(self, values: np.ndarray) -> List[Dict]:
+        """Detect peaks in each row of a (symptoms x days) array"""
+        n_rows, n_days = values.shape
+        if n_days < 3:
+            return [{'count': 0, 'averageIntensity': 0} for _ in range(n_rows)]
+        
+        # Local maxima of at least 6, from shifted comparisons
+        middle = values[:, 1:-1]
+        is_peak = (middle > values[:, :-2]) & (middle > values[:, 2:]) & (middle >= 6)
+        
+        counts = np.count_nonzero(is_peak, axis=1)
+        highest = np.where(is_peak, middle, -np.inf).max(axis=1)
+        # Mean over the peaks themselves keeps the summation order of np.mean
+        averages = [middle[j][is_peak[j]].mean() if counts[j] else 0 for j in range(n_rows)]
+        
+        return [{
+            'count': int(count),
+            'averageIntensity': round(float(average), 1) if count else 0,
+            'maxIntensity': float(peak) if count else 0,
+            'frequency': round(int(count) / n_days, 2)
+        } for count, average, peak in zip(counts, averages, highest)]
     
     def _analyze_persistence(self, values: np.ndarray) -> Dict:
         """Analyze how long symptoms persist"""
-        if len(values) == 0:
-            return {'averageDuration': 0, 'longestStreak': 0}
-        
-        # Find consecutive days with symptoms (value > 0)
-        streaks = []
-        current_streak = 0
-        
-        for val in values:
-            if val > 0:
-                current_streak += 1
-            else:
-                if current_streak > 0:
-                    streaks.append(current_streak)
-                current_streak = 0
-        
-        if current_streak > 0:
-            streaks.append(current_streak)
-        
-        return {
-            'averageDuration': round(float(np.mean(streaks)), 1) if streaks else 0,
-            'longestStreak': int(max(streaks)) if streaks else 0,
-            'shortestStreak': int(min(streaks)) if streaks else 0,
-            'totalEpisodes': len(streaks)
-        }
+        return self._analyze_persistence_matrix(np.asarray(values, dtype=float)[None, :])[0]
+    
+    def _analyze_persistence_matrix(self, values: np.ndarray) -> List[Dict]:
+        """Streaks of consecutive symptom days (value > 0) in each row"""
+        n_rows, n_days = values.shape
+        if n_days == 0:
+            return [{'averageDuration': 0, 'longestStreak': 0} for _ in range(n_rows)]
+        
+        # Run-length encode the mask: +1 where a streak starts, -1 after it ends
+        padded = np.zeros((n_rows, n_days + 2), dtype=np.int8)
+        padded[:, 1:-1] = values > 0
+        edges = np.diff(padded, axis=1)
+        rows, starts = np.nonzero(edges == 1)
+        _, ends = np.nonzero(edges == -1)
+        lengths = ends - starts
+        
+        episodes = np.bincount(rows, minlength=n_rows)
+        total_days = np.bincount(rows, weights=lengths, minlength=n_rows)
+        longest = np.zeros(n_rows, dtype=np.int64)
+        shortest = np.full(n_rows, n_days, dtype=np.int64)
+        np.maximum.at(longest, rows, lengths)
+        np.minimum.at(shortest, rows, lengths)
+        
+        return [{
+            'averageDuration': round(float(total_days[j] / episodes[j]), 1) if episodes[j] else 0,
+            'longestStreak': int(longest[j]) if episodes[j] else 0,
+            'shortestStreak': int(shortest[j]) if episodes[j] else 0,
+            'totalEpisodes': int(episodes[j])
+        } for j in range(n_rows)]
     
     def _calculate_impact_score(self, avg: float, frequency: float, 
                                max_val: float) -> float:
@@ -343,30 +421,67 @@ class AdvancedSymptomAnalyzer:
         impact = (0.4 * avg + 0.4 * (frequency * 10) + 0.2 * max_val)
         return round(float(min(impact, 10)), 1)
     
+    def _grouped_symptom_stats(self, df: pd.DataFrame, symptom_types: List[str],
+                               key: str) -> Tuple[list, List[str], Dict[str, np.ndarray]]:
+        """
+        Per-group statistics of every symptom from one grouped aggregation
+        
+        Returns the sorted group labels, the symptom columns and a
+        (groups x symptoms) array for each of sum, mean, median, max, count
+        and positive (days above zero). Rows without a key are dropped.
+        """
+        symptom_types = [s for s in symptom_types if s in df.columns]
+        codes, groups = pd.factorize(df[key], sort=True)
+        keep = codes >= 0
+        codes = codes[keep]
+        values = df[symptom_types].to_numpy(dtype=float)[keep]
+        
+        shape = (len(groups), len(symptom_types))
+        if len(symptom_types) == 0:
+            return list(groups), symptom_types, {
+                name: np.zeros(shape) for name in ('sum', 'mean', 'median', 'max', 'count', 'positive')
+            }
+        
+        # Each reduction runs over all symptom columns of the one grouping
+        grouped = pd.DataFrame(values).groupby(codes, sort=True)
+        group_stats = {
+            name: getattr(grouped, name)().to_numpy(dtype=float)
+            for name in ('sum', 'mean', 'median', 'max', 'count')
+        }
+        
+        # Frequency and likelihood need the days above zero, from the same codes
+        positive = np.zeros(shape)
+        np.add.at(positive, codes, values > 0)
+        group_stats['positive'] = positive
+        
+        return list(groups), symptom_types, group_stats
+    
     def _analyze_phase_correlations(self, df: pd.DataFrame, 
                                    symptom_types: List[str]) -> Dict:
         """Analyze symptom correlations with menstrual phases"""
         phase_data = {}
         
-        for phase in self.phase_days.keys():
-            phase_df = df[df['phase'] == phase]
-            if len(phase_df) == 0:
+        phases, columns, group_stats = self._grouped_symptom_stats(df, symptom_types, 'phase')
+        
+        for phase in PHASES:
+            if phase not in phases:
                 continue
             
+            i = phases.index(phase)
             phase_data[phase] = {}
             
-            for s_type in symptom_types:
-                if s_type in phase_df.columns:
-                    values = phase_df[s_type].dropna()
-                    if len(values) > 0:
-                        phase_data[phase][s_type] = {
-                            'average': round(float(values.mean()), 1),
-                            'median': round(float(values.median()), 1),
-                            'frequency': round(float(len(values[values > 0]) / len(values)), 2),
-                            'maximum': float(values.max()),
-                            'daysTracked': len(values),
-                            'likelihood': self._calculate_symptom_likelihood(values)
-                        }
+            for j, s_type in enumerate(columns):
+                count = int(group_stats['count'][i, j])
+                if count > 0:
+                    frequency = group_stats['positive'][i, j] / count
+                    phase_data[phase][s_type] = {
+                        'average': round(float(group_stats['mean'][i, j]), 1),
+                        'median': round(float(group_stats['median'][i, j]), 1),
+                        'frequency': round(float(frequency), 2),
+                        'maximum': float(group_stats['max'][i, j]),
+                        'daysTracked': count,
+                        'likelihood': self._likelihood_from_frequency(frequency)
+                    }
         
         # Calculate phase with highest symptom burden
         phase_scores = {}
@@ -384,7 +499,10 @@ class AdvancedSymptomAnalyzer:
     def _calculate_symptom_likelihood(self, values: pd.Series) -> str:
         """Calculate likelihood category"""
         freq = len(values[values > 0]) / len(values) if len(values) > 0 else 0
-        
+        return self._likelihood_from_frequency(freq)
+    
+    def _likelihood_from_frequency(self, freq: float) -> str:
+        """Likelihood category of the share of days with a symptom"""
         if freq >= 0.8:
             return 'very_high'
         elif freq >= 0.6:
@@ -397,40 +515,50 @@ class AdvancedSymptomAnalyzer:
             return 'very_low'
     
     def _detect_temporal_patterns(self, df: pd.DataFrame, 
-                                  symptom_types: List[str]) -> Dict:
+                                  symptom_types: List[str],
+                                  user_id: Optional[str] = None) -> Dict:
         """Detect temporal patterns in symptoms"""
         patterns = {}
+        day_names = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
         
         # Day of week analysis
         if 'dayOfWeek' in df.columns:
             weekday_patterns = {}
-            for s_type in symptom_types:
-                if s_type in df.columns:
-                    weekday_avg = df.groupby('dayOfWeek')[s_type].mean()
-                    if len(weekday_avg) > 0:
-                        weekday_patterns[s_type] = {
-                            'worst_day': int(weekday_avg.idxmax()),
-                            'worst_day_name': ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'][int(weekday_avg.idxmax())],
-                            'worst_day_avg': round(float(weekday_avg.max()), 1),
-                            'best_day': int(weekday_avg.idxmin()),
-                            'best_day_name': ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'][int(weekday_avg.idxmin())],
-                            'weekend_vs_weekday': self._compare_weekend_weekday(df, s_type)
-                        }
+            days, columns, group_stats = self._grouped_symptom_stats(df, symptom_types, 'dayOfWeek')
+            days = np.asarray(days)
+            weekend = days >= 5
+            
+            for j, s_type in enumerate(columns):
+                weekday_avg = group_stats['mean'][:, j]
+                if len(weekday_avg) > 0:
+                    worst = int(days[np.nanargmax(weekday_avg)])
+                    best = int(days[np.nanargmin(weekday_avg)])
+                    weekday_patterns[s_type] = {
+                        'worst_day': worst,
+                        'worst_day_name': day_names[worst],
+                        'worst_day_avg': round(float(np.nanmax(weekday_avg)), 1),
+                        'best_day': best,
+                        'best_day_name': day_names[best],
+                        'weekend_vs_weekday': self._compare_weekend_weekday(
+                            self._pooled_mean(group_stats, weekend, j),
+                            self._pooled_mean(group_stats, ~weekend, j)
+                        )
+                    }
             patterns['dayOfWeek'] = weekday_patterns
         
         # Time-based clustering
-        patterns['clusters'] = self._cluster_symptom_days(df, symptom_types)
+        patterns['clusters'] = self._cluster_symptom_days(df, symptom_types, user_id)
         
         return patterns
     
-    def _compare_weekend_weekday(self, df: pd.DataFrame, symptom: str) -> Dict:
+    @staticmethod
+    def _pooled_mean(group_stats: Dict[str, np.ndarray], groups: np.ndarray, column: int) -> float:
+        """Mean of one symptom over several groups (NaN when they have no values)"""
+        count = group_stats['count'][groups, column].sum()
+        return group_stats['sum'][groups, column].sum() / count if count > 0 else np.nan
+    
+    def _compare_weekend_weekday(self, weekend: float, weekday: float) -> Dict:
         """Compare symptom intensity on weekends vs weekdays"""
-        if 'isWeekend' not in df.columns or symptom not in df.columns:
-            return {}
-        
-        weekend = df[df['isWeekend'] == True][symptom].mean()
-        weekday = df[df['isWeekend'] == False][symptom].mean()
-        
         if weekend > weekday * 1.2:
             interpretation = 'Worse on weekends'
         elif weekday > weekend * 1.2:
@@ -445,7 +573,8 @@ class AdvancedSymptomAnalyzer:
         }
     
     def _cluster_symptom_days(self, df: pd.DataFrame, 
-                             symptom_types: List[str]) -> Dict:
+                             symptom_types: List[str],
+                             user_id: Optional[str] = None) -> Dict:
         """Cluster days based on symptom patterns"""
         if len(df) < 10:
             return {'status': 'insufficient_data'}
@@ -466,8 +595,7 @@ class AdvancedSymptomAnalyzer:
         n_clusters = min(3, max(2, len(df) // 10))
         
         try:
-            kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-            clusters = kmeans.fit_predict(X)
+            clusters = self._fit_clusters(X, n_clusters, (user_id, tuple(valid_symptoms)))
             
             # Analyze clusters
             cluster_profiles = {}
@@ -496,6 +624,37 @@ class AdvancedSymptomAnalyzer:
         except Exception as e:
             return {'status': 'error', 'message': str(e)}
     
+    def _fit_clusters(self, X: np.ndarray, n_clusters: int,
+                      cache_key: Optional[Tuple] = None) -> np.ndarray:
+        """Cluster label of each day under the configured cluster mode"""
+        from sklearn.cluster import KMeans, MiniBatchKMeans
+        
+        if self.cluster_mode == 'full':
+            kmeans = KMeans(n_clusters=n_clusters, random_state=self.cluster_random_state,
+                            n_init=10)
+            return kmeans.fit_predict(X)
+        
+        # Centroids are only reused for the same user and symptom columns
+        key = None
+        centroids = None
+        if self.centroid_cache is not None and cache_key is not None and cache_key[0] is not None:
+            key = ('centroids', n_clusters) + tuple(cache_key)
+            centroids = self.centroid_cache.get(key)
+        
+        if centroids is not None:
+            kmeans = KMeans(n_clusters=n_clusters, init=centroids, n_init=1)
+        elif len(X) >= self.minibatch_min_days:
+            kmeans = MiniBatchKMeans(n_clusters=n_clusters, n_init=1, batch_size=256,
+                                     random_state=self.cluster_random_state)
+        else:
+            kmeans = KMeans(n_clusters=n_clusters, n_init=1,
+                            random_state=self.cluster_random_state)
+        
+        clusters = kmeans.fit_predict(X)
+        if key is not None:
+            self.centroid_cache.put(key, kmeans.cluster_centers_)
+        return clusters
+    
     def _classify_cluster_severity(self, profile: Dict) -> str:
         """Classify overall cluster severity"""
         avg_severity = np.mean(list(profile.values()))
@@ -514,18 +673,18 @@ class AdvancedSymptomAnalyzer:
         """Analyze overall severity patterns"""
         # Calculate daily total severity
         valid_symptoms = [s for s in symptom_types if s in df.columns]
-        df['total_severity'] = df[valid_symptoms].sum(axis=1)
+        total_severity = df[valid_symptoms].sum(axis=1)
         
         severity_stats = {
-            'average': round(float(df['total_severity'].mean()), 1),
-            'maximum': float(df['total_severity'].max()),
-            'minimum': float(df['total_severity'].min()),
-            'standardDeviation': round(float(df['total_severity'].std()), 2)
+            'average': round(float(total_severity.mean()), 1),
+            'maximum': float(total_severity.max()),
+            'minimum': float(total_severity.min()),
+            'standardDeviation': round(float(total_severity.std()), 2)
         }
         
         # Categorize days
-        high_severity_days = len(df[df['total_severity'] > df['total_severity'].quantile(0.75)])
-        low_severity_days = len(df[df['total_severity'] < df['total_severity'].quantile(0.25)])
+        high_severity_days = int((total_severity > total_severity.quantile(0.75)).sum())
+        low_severity_days = int((total_severity < total_severity.quantile(0.25)).sum())
         
         return {
             'overallStats': severity_stats,
@@ -543,39 +702,55 @@ class AdvancedSymptomAnalyzer:
         if len(valid_symptoms) < 2:
             return {'status': 'insufficient_symptoms'}
         
-        # Find common combinations
-        combinations = []
-        
-        for idx, row in df.iterrows():
-            active_symptoms = [s for s in valid_symptoms if row[s] > 3]  # Threshold of 3
-            if len(active_symptoms) >= 2:
-                combinations.append(tuple(sorted(active_symptoms)))
+        active = df[valid_symptoms].to_numpy(dtype=float) > 3  # Threshold of 3
+        is_combination = active.sum(axis=1) >= 2
         
-        if not combinations:
+        if not is_combination.any():
             return {'status': 'no_combinations_found'}
         
-        # Count combinations
-        combo_counts = Counter(combinations)
-        top_combos = combo_counts.most_common(5)
+        # Pack each day's active symptoms into one integer and count the masks
+        bits = np.left_shift(1, np.arange(len(valid_symptoms), dtype=np.int64))
+        masks = active[is_combination].astype(np.int64) @ bits
+        unique_masks, first_seen, counts = np.unique(masks, return_index=True, return_counts=True)
+        
+        # Most frequent first, ties in order of first occurrence (as Counter.most_common)
+        top = np.lexsort((first_seen, -counts))[:5]
+        
+        # Days on which each pair of symptoms is active together
+        active_counts = active.astype(np.int64)
+        cooccurrence = active_counts.T @ active_counts
+        rows, cols = np.triu_indices(len(valid_symptoms), k=1)
+        pair_counts = cooccurrence[rows, cols]
+        pair_order = np.argsort(-pair_counts, kind='stable')
         
         return {
             'status': 'success',
             'topCombinations': [
                 {
-                    'symptoms': list(combo),
-                    'frequency': count,
-                    'percentage': round(count / len(df) * 100, 1)
+                    'symptoms': sorted(s for j, s in enumerate(valid_symptoms)
+                                       if unique_masks[i] & bits[j]),
+                    'frequency': int(counts[i]),
+                    'percentage': round(int(counts[i]) / len(df) * 100, 1)
                 }
-                for combo, count in top_combos
+                for i in top
             ],
-            'totalCombinations': len(combinations),
-            'uniqueCombinations': len(combo_counts)
+            'totalCombinations': int(is_combination.sum()),
+            'uniqueCombinations': len(unique_masks),
+            'pairwiseCooccurrence': [
+                {
+                    'symptoms': sorted((valid_symptoms[rows[k]], valid_symptoms[cols[k]])),
+                    'frequency': int(pair_counts[k]),
+                    'percentage': round(int(pair_counts[k]) / len(df) * 100, 1)
+                }
+                for k in pair_order if pair_counts[k] > 0
+            ]
         }
     
     def _generate_advanced_recommendations(self, symptom_insights: Dict,
                                           phase_correlations: Dict,
                                           temporal_patterns: Dict,
-                                          health_metrics: Optional[Dict]) -> List[Dict]:
+                                          health_metrics: Optional[Dict],
+                                          bmi: float = 0) -> List[Dict]:
         """Generate personalized recommendations based on comprehensive analysis"""
         recommendations = []
         
@@ -599,7 +774,7 @@ class AdvancedSymptomAnalyzer:
         
         # Health-based recommendations
         if health_metrics:
-            health_rec = self._get_health_based_recommendations(health_metrics, symptom_insights)
+            health_rec = self._get_health_based_recommendations(bmi, symptom_insights)
             recommendations.extend(health_rec)
         
         return recommendations[:10]  # Limit to top 10
@@ -646,14 +821,11 @@ class AdvancedSymptomAnalyzer:
         
         return None
     
-    def _get_health_based_recommendations(self, health_metrics: Dict,
+    def _get_health_based_recommendations(self, bmi: float,
                                          symptom_insights: Dict) -> List[Dict]:
-        """Generate recommendations based on health metrics and symptoms"""
+        """Generate recommendations based on BMI and symptoms"""
         recommendations = []
         
-        # Calculate BMI
-        bmi = self._calculate_bmi(health_metrics)
-        
         if bmi > 0:
             if bmi < 18.5 and 'fatigue' in symptom_insights:
                 recommendations.append({
@@ -672,25 +844,6 @@ class AdvancedSymptomAnalyzer:
         
         return recommendations
     
-    def _calculate_bmi(self, health_metrics: Dict) -> float:
-        """Calculate BMI from health metrics"""
-        height = health_metrics.get('height', 0)
-        weight = health_metrics.get('weight', 0)
-        use_metric = health_metrics.get('useMetric', True)
-        
-        if height <= 0 or weight <= 0:
-            return 0
-        
-        if not use_metric:
-            height_cm = height * 30.48
-            weight_kg = weight * 0.453592
-        else:
-            height_cm = height
-            weight_kg = weight
-        
-        height_m = height_cm / 100
-        return weight_kg / (height_m ** 2) if height_m > 0 else 0
-    
     def _assess_symptom_risk(self, symptom_insights: Dict, 
                             severity_analysis: Dict) -> Dict:
         """Assess overall symptom risk level"""
@@ -754,19 +907,17 @@ class AdvancedSymptomAnalyzer:
             'impactLevel': 'high' if avg_impact > 6 else 'moderate' if avg_impact > 3 else 'low'
         }
     
-    def _get_phase_from_day(self, cycle_day: int) -> Optional[str]:
-        """Determine cycle phase from day number"""
-        for phase, (start, end) in self.phase_days.items():
-            if start <= cycle_day <= end:
-                return phase
-        return None
-    
     def predict_symptom_likelihood(self, symptoms: List[Dict], 
                                    current_cycle_day: int,
-                                   cycles: List[Dict]) -> Dict:
+                                   cycles: List[Dict],
+                                   context: Optional[AnalysisContext] = None) -> Dict:
         """
         Advanced symptom prediction with ML
         """
+        if context is None:
+            context = AnalysisContext.from_payload(cycles, symptoms)
+        symptoms = context.symptoms
+        
         if not symptoms or len(symptoms) < 10:
             return {
                 'hasData': False,
@@ -775,62 +926,20 @@ class AdvancedSymptomAnalyzer:
                 'current': len(symptoms)
             }
         
-        df = self._prepare_symptom_dataframe(symptoms, cycles)
+        df = self._symptom_frame(context)
         if df is None:
             return {'hasData': False, 'message': 'Invalid symptom data'}
         
-        current_phase = self._get_phase_from_day(current_cycle_day)
+        current_phase = self._phase_mapper(context).phase(current_cycle_day)
         if not current_phase:
             current_phase = 'unknown'
         
-        predictions = {}
-        
-        for s_type in self.symptom_types:
-            if s_type not in df.columns:
-                continue
-            
-            # Get historical data for this phase
-            phase_data = df[df['phase'] == current_phase][s_type].dropna()
-            
-            if len(phase_data) < 3:
-                continue
-            
-            # Calculate prediction
-            mean_val = phase_data.mean()
-            std_val = phase_data.std()
-            frequency = len(phase_data[phase_data > 0]) / len(phase_data)
-            
-            # Adjust for recent trend
-            recent_data = df[s_type].tail(7).dropna()
-            if len(recent_data) >= 3:
-                recent_avg = recent_data.mean()
-                trend_adjustment = (recent_avg - mean_val) * 0.3
-                predicted_value = mean_val + trend_adjustment
-            else:
-                predicted_value = mean_val
-            
-            # Calculate confidence
-            data_points = len(phase_data)
-            confidence = min(0.5 + (data_points / 20), 0.85)
-            
-            # Generate probability ranges
-            lower_bound = max(0, predicted_value - std_val)
-            upper_bound = min(10, predicted_value + std_val)
-            
-            predictions[s_type] = {
-                'predicted': round(float(predicted_value), 1),
-                'probabilityRange': {
-                    'lower': round(float(lower_bound), 1),
-                    'upper': round(float(upper_bound), 1)
-                },
-                'frequency': round(frequency, 2),
-                'likelihood': self._calculate_symptom_likelihood(phase_data),
-                'confidence': round(confidence, 2),
-                'severity': self._classify_severity(predicted_value),
-                'description': self._generate_prediction_description(
-                    s_type, predicted_value, frequency
-                )
-            }
+        forecast = self._phase_forecast(df, [current_phase])
+        predictions = {
+            s_type: self._format_symptom_prediction(s_type, forecast, 0, j)
+            for j, s_type in enumerate(self.symptom_types)
+            if forecast['count'][0, j] >= 3
+        }
         
         return {
             'hasData': True,
@@ -841,6 +950,150 @@ class AdvancedSymptomAnalyzer:
             'overallOutlook': self._generate_overall_outlook(predictions, current_phase)
         }
     
+    def forecast_cycle(self, symptoms: List[Dict], cycles: List[Dict],
+                       cycle_length: Optional[int] = None,
+                       context: Optional[AnalysisContext] = None) -> Dict:
+        """
+        Symptom forecast for every day of the upcoming cycle
+        
+        Returns (cycle day x symptom) tables of the values predict_symptom_likelihood
+        gives for each day, with phase boundaries for the forecast cycle
+        length; phase statistics are computed once and shared by the days of
+        each phase. Cells are None where a phase has fewer than 3
+        logged days of a symptom.
+        """
+        if context is None:
+            context = AnalysisContext.from_payload(cycles, symptoms)
+        symptoms = context.symptoms
+        
+        if not symptoms or len(symptoms) < 10:
+            return {
+                'hasData': False,
+                'message': 'Need at least 10 days of symptom history for predictions',
+                'minRequired': 10,
+                'current': len(symptoms)
+            }
+        
+        df = self._symptom_frame(context)
+        if df is None:
+            return {'hasData': False, 'message': 'Invalid symptom data'}
+        
+        # Default to the user's predicted cycle length
+        if cycle_length is None:
+            cycle_length = typical_cycle_length(context.cycle_lengths)
+        cycle_length = min(max(int(cycle_length), 1), self.max_forecast_days)
+        
+        cycle_days = list(range(1, cycle_length + 1))
+        day_phases = [phase or 'unknown' for phase in phase_mapper(cycle_length).phases(cycle_days)]
+        phases = list(dict.fromkeys(day_phases))
+        day_index = [phases.index(phase) for phase in day_phases]
+        
+        forecast = self._phase_forecast(df, phases)
+        available = forecast['count'] >= 3
+        
+        def by_day(name: str, digits: int) -> List[List[Optional[float]]]:
+            # Round each phase row once, then repeat it for the phase's days
+            rows = [[round(float(value), digits) if ok else None
+                     for value, ok in zip(forecast[name][i], available[i])]
+                    for i in range(len(phases))]
+            return [rows[i] for i in day_index]
+        
+        phase_outlook = {}
+        for i, phase in enumerate(phases):
+            predictions = {
+                s_type: self._format_symptom_prediction(s_type, forecast, i, j)
+                for j, s_type in enumerate(self.symptom_types) if available[i, j]
+            }
+            phase_outlook[phase] = self._generate_overall_outlook(predictions, phase)
+        
+        return {
+            'hasData': True,
+            'cycleLength': cycle_length,
+            'cycleDays': cycle_days,
+            'phases': day_phases,
+            'symptoms': list(self.symptom_types),
+            'predicted': by_day('predicted', 1),
+            'probabilityRange': {
+                'lower': by_day('lower', 1),
+                'upper': by_day('upper', 1)
+            },
+            'frequency': by_day('frequency', 2),
+            'confidence': by_day('confidence', 2),
+            'outlook': [phase_outlook[phase]['level'] for phase in day_phases],
+            'phaseOutlook': phase_outlook,
+            'dataPoints': len(symptoms)
+        }
+    
+    def _phase_forecast(self, df: pd.DataFrame, phases: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Predicted intensity of every symptom in each phase, as (phases x symptoms) arrays
+        
+        The phase mean is nudged 30% toward the last 7 days when at least 3
+        of them are logged, with a one standard deviation range clipped to 0-10.
+        """
+        values = df[self.symptom_types].to_numpy(dtype=float)
+        labels = df['phase'].to_numpy()
+        shape = (len(phases), len(self.symptom_types))
+        
+        # Recent average, shared by every phase
+        recent = np.ascontiguousarray(values[-7:].T)
+        recent_logged = ~np.isnan(recent)
+        recent_count = recent_logged.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            recent_avg = np.where(recent_logged, recent, 0.0).sum(axis=1) / recent_count
+        
+        count = np.zeros(shape)
+        mean = np.full(shape, np.nan)
+        std = np.full(shape, np.nan)
+        positive = np.zeros(shape)
+        
+        for i, phase in enumerate(phases):
+            # One contiguous row per symptom, so sums match Series.mean/std
+            rows = np.ascontiguousarray(values[labels == phase].T)
+            logged = ~np.isnan(rows)
+            count[i] = logged.sum(axis=1)
+            positive[i] = (rows > 0).sum(axis=1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean[i] = np.where(logged, rows, 0.0).sum(axis=1) / count[i]
+                squares = np.where(logged, (mean[i][:, None] - rows) ** 2, 0.0)
+                std[i] = np.sqrt(squares.sum(axis=1) / (count[i] - 1))
+        
+        # Adjust for recent trend
+        predicted = np.where(recent_count >= 3, mean + (recent_avg - mean) * 0.3, mean)
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            frequency = positive / count
+        
+        return {
+            'count': count,
+            'predicted': predicted,
+            'lower': np.maximum(0, predicted - std),
+            'upper': np.minimum(10, predicted + std),
+            'frequency': frequency,
+            'confidence': np.minimum(0.5 + (count / 20), 0.85)
+        }
+    
+    def _format_symptom_prediction(self, s_type: str, forecast: Dict[str, np.ndarray],
+                                   i: int, j: int) -> Dict:
+        """Prediction of one symptom in one phase of _phase_forecast"""
+        predicted_value = forecast['predicted'][i, j]
+        frequency = float(forecast['frequency'][i, j])
+        
+        return {
+            'predicted': round(float(predicted_value), 1),
+            'probabilityRange': {
+                'lower': round(float(forecast['lower'][i, j]), 1),
+                'upper': round(float(forecast['upper'][i, j]), 1)
+            },
+            'frequency': round(frequency, 2),
+            'likelihood': self._likelihood_from_frequency(frequency),
+            'confidence': round(float(forecast['confidence'][i, j]), 2),
+            'severity': self._classify_severity(predicted_value),
+            'description': self._generate_prediction_description(
+                s_type, predicted_value, frequency
+            )
+        }
+    
     def _generate_prediction_description(self, symptom: str, 
                                         value: float, 
                                         frequency: float) -> str:
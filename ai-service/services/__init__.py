@@ -0,0 +1,19 @@
+from .cache import LRUCache, payload_fingerprint
+from .coalescing import SingleFlight
+from .encoding import NumpyEncoder
+from .pipeline import AnalysisPipeline, analysis_result, calculate_user_engagement
+from .metrics import MetricsRegistry, REGISTRY
+from .state_store import UserStateStore
+
+__all__ = [
+    'LRUCache',
+    'payload_fingerprint',
+    'SingleFlight',
+    'NumpyEncoder',
+    'AnalysisPipeline',
+    'analysis_result',
+    'calculate_user_engagement',
+    'MetricsRegistry',
+    'REGISTRY',
+    'UserStateStore'
+]
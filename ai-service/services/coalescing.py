@@ -0,0 +1,79 @@
+# File: ai-service/services/coalescing.py
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    """One in-flight computation and its outcome"""
+
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key onto one computation
+
+    The first caller for a key (the leader) computes; callers arriving while
+    it runs wait for its result, or its exception, instead of computing
+    again. A follower that waits longer than ``follower_timeout`` seconds
+    computes on its own. Nothing is kept once the leader finishes, so pair
+    this with a cache for requests that arrive later.
+    """
+
+    def __init__(self, follower_timeout: float = 10.0):
+        self.follower_timeout = follower_timeout
+
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+        self.executions = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def do(self, key: Hashable, compute: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return (value, shared), where shared means another caller computed it"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+
+        if leader:
+            try:
+                call.value = compute()
+                return call.value, False
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if not call.done.wait(self.follower_timeout):
+            with self._lock:
+                self.timeouts += 1
+                self.executions += 1
+            return compute(), False
+
+        with self._lock:
+            self.coalesced += 1
+        if call.error is not None:
+            raise call.error
+        return call.value, True
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'inFlight': len(self._calls),
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'timeouts': self.timeouts,
+                'followerTimeoutSeconds': self.follower_timeout
+            }
@@ -0,0 +1,232 @@
+# File: ai-service/services/metrics.py
+import bisect
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# (metric name, type, help, [(labels, value), ...]) produced at scrape time
+MetricFamily = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 365, 500, 1000, 2000, 5000)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Labelled metric with one state object per label combination"""
+
+    type = ''
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self._labels(key))} {_format_value(value)}'
+                for key, value in values]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram of observed values"""
+
+    type = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [per-bucket counts (+Inf last), sum, count]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(state[0]), state[1], state[2]))
+                            for key, state in self._values.items())
+
+        lines = []
+        for key, (counts, total, count) in values:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels({**labels, 'le': _format_value(bound)})
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-local metrics rendered in the Prometheus text exposition format
+
+    Metrics are recorded as requests run; collectors are called at scrape
+    time for values that live elsewhere, such as cache statistics.
+    """
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[MetricFamily]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.collect())
+
+        for collector in self._collectors:
+            for name, metric_type, help_text, samples in collector():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                lines.extend(f'{name}{_format_labels(labels)} {_format_value(value)}'
+                             for labels, value in samples)
+
+        return '\n'.join(lines) + '\n'
+
+    def _register(self, metric: _Metric):
+        self._metrics.append(metric)
+        return metric
+
+
+def cache_collector(caches: Dict[str, object]) -> Callable[[], List[MetricFamily]]:
+    """Collector exposing LRUCache.stats() counters, labelled by cache name"""
+    def collect() -> List[MetricFamily]:
+        stats = {name: cache.stats() for name, cache in caches.items()}
+        families = []
+        for field, metric_type, help_text in (
+            ('hits', 'counter', 'Cache lookups that found a live entry'),
+            ('misses', 'counter', 'Cache lookups that found nothing'),
+            ('evictions', 'counter', 'Entries evicted to respect size limits'),
+            ('expirations', 'counter', 'Entries dropped after their TTL'),
+            ('entries', 'gauge', 'Entries currently cached'),
+            ('bytes', 'gauge', 'Estimated size of cached entries')
+        ):
+            suffix = '_total' if metric_type == 'counter' else ''
+            families.append((
+                f'solaris_cache_{field}{suffix}', metric_type, help_text,
+                [({'cache': name}, values[field]) for name, values in stats.items()]
+            ))
+        return families
+    return collect
+
+
+def single_flight_collector(flights: Dict[str, object]) -> Callable[[], List[MetricFamily]]:
+    """Collector exposing SingleFlight.stats() counters, labelled by endpoint"""
+    def collect() -> List[MetricFamily]:
+        stats = {name: flight.stats() for name, flight in flights.items()}
+        families = []
+        for field, metric, metric_type, help_text in (
+            ('executions', 'solaris_coalescing_executions_total', 'counter',
+             'Computations run by a leader or a timed-out follower'),
+            ('coalesced', 'solaris_coalesced_requests_total', 'counter',
+             'Requests served the result of an identical in-flight request'),
+            ('timeouts', 'solaris_coalescing_timeouts_total', 'counter',
+             'Followers that stopped waiting and computed on their own'),
+            ('inFlight', 'solaris_coalescing_in_flight', 'gauge',
+             'Computations currently in flight')
+        ):
+            families.append((
+                metric, metric_type, help_text,
+                [({'endpoint': name}, values[field]) for name, values in stats.items()]
+            ))
+        return families
+    return collect
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    'solaris_request_duration_seconds',
+    'Request latency by endpoint and status code',
+    ('endpoint', 'status')
+)
+STAGE_LATENCY = REGISTRY.histogram(
+    'solaris_analyze_stage_duration_seconds',
+    'Latency of each /analyze stage, including JSON encoding',
+    ('stage',),
+    buckets=STAGE_BUCKETS
+)
+PAYLOAD_ITEMS = REGISTRY.histogram(
+    'solaris_payload_items',
+    'Number of cycles, symptom logs or users in request payloads',
+    ('endpoint', 'kind'),
+    buckets=COUNT_BUCKETS
+)
+REQUEST_ERRORS = REGISTRY.counter(
+    'solaris_request_errors_total',
+    'Unhandled errors by endpoint and exception type',
+    ('endpoint', 'exception')
+)
+
+
+def observe_payload(endpoint: str, payload: Optional[Dict]) -> None:
+    """Record the size of the list fields of a JSON request body"""
+    if not isinstance(payload, dict):
+        return
+    for kind in ('cycles', 'symptoms', 'users'):
+        items = payload.get(kind)
+        if isinstance(items, list):
+            PAYLOAD_ITEMS.observe(len(items), endpoint=endpoint, kind=kind)
@@ -0,0 +1,330 @@
+# File: ai-service/services/pipeline.py
+import time
+from concurrent.futures import Executor, Future
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from models.analysis_context import AnalysisContext
+from .cache import LRUCache, payload_fingerprint
+
+_MISSING = object()
+
+
+class AnalysisPipeline:
+    """
+    The stages behind /analyze, with per-stage result caching
+
+    Each cacheable stage is keyed by a hash of only the payload sections it
+    reads, so logging a new symptom leaves the cycle-only stages cached.
+    Stages that read per-user model state (cached estimators, warm-started
+    centroids) also key on userId, so users with identical inputs never
+    share them. Cached results are shared between requests and must be
+    treated as read-only.
+
+    With an executor, the independent model stages run concurrently and the
+    recommender stages wait for the outputs they consume.
+    """
+
+    # Stage -> stages whose outputs it consumes, in execution order
+    STAGE_DEPENDENCIES = {
+        'prediction': (),
+        'anomaly': (),
+        'cycleInsights': (),
+        'symptomInsights': (),
+        'healthInsights': (),
+        'userEngagement': (),
+        'recommendations': ('prediction', 'anomaly', 'symptomInsights',
+                            'healthInsights', 'userEngagement'),
+        'riskAssessment': ('anomaly', 'symptomInsights', 'healthInsights'),
+        'personalizedInsights': ('prediction', 'anomaly', 'symptomInsights',
+                                 'healthInsights', 'recommendations')
+    }
+
+    # Payload sections read by each cacheable stage. prediction reads the
+    # user's cached estimators and symptomInsights the user's centroids.
+    STAGE_INPUTS = {
+        'prediction': ('userId', 'cycles', 'healthMetrics', 'engine'),
+        'anomaly': ('cycles',),
+        'cycleInsights': ('cycles',),
+        'symptomInsights': ('userId', 'symptoms', 'cycles', 'healthMetrics'),
+        'healthInsights': ('healthMetrics', 'cycleLengths', 'symptomTotals')
+    }
+
+    def __init__(self, cycle_predictor, symptom_analyzer, health_tracker, recommender,
+                 stage_cache: Optional[LRUCache] = None,
+                 executor: Optional[Executor] = None):
+        self.cycle_predictor = cycle_predictor
+        self.symptom_analyzer = symptom_analyzer
+        self.health_tracker = health_tracker
+        self.recommender = recommender
+        self.stage_cache = stage_cache
+        self.executor = executor
+
+    @classmethod
+    def parse_sections(cls, sections: Union[None, str, Iterable[str]]) -> Optional[Tuple[str, ...]]:
+        """
+        Requested output sections, from a comma-separated string or a list
+
+        None (or an empty value) means every section. Sections are returned
+        in pipeline order; unknown names raise ValueError.
+        """
+        if sections is None:
+            return None
+        if isinstance(sections, str):
+            sections = sections.split(',')
+        names = {str(name).strip() for name in sections} - {''}
+        if not names:
+            return None
+
+        unknown = sorted(names - set(cls.STAGE_DEPENDENCIES))
+        if unknown:
+            raise ValueError(f"Unknown sections {unknown}, expected any of "
+                             f"{list(cls.STAGE_DEPENDENCIES)}")
+        return tuple(name for name in cls.STAGE_DEPENDENCIES if name in names)
+
+    @classmethod
+    def required_stages(cls, sections: Optional[Iterable[str]] = None) -> Tuple[str, ...]:
+        """The requested stages plus every stage they depend on, in pipeline order"""
+        if sections is None:
+            return tuple(cls.STAGE_DEPENDENCIES)
+
+        required = set()
+        stack = list(sections)
+        while stack:
+            name = stack.pop()
+            if name not in required:
+                required.add(name)
+                stack.extend(cls.STAGE_DEPENDENCIES[name])
+        return tuple(name for name in cls.STAGE_DEPENDENCIES if name in required)
+
+    def run(self, context: AnalysisContext, serial: bool = False,
+            use_cache: bool = True, engine: str = 'ensemble',
+            posterior=None, sections: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Run the analysis steps for one parsed payload
+
+        Returns the stage outputs keyed by their response field, plus
+        ``cachedStages`` (stages served from the stage cache) and
+        ``timings`` (per-stage and wall-clock milliseconds). ``serial`` keeps
+        every stage on the calling thread and ``use_cache=False`` recomputes
+        every stage, as profiling needs. ``engine`` (and, for 'bayesian', an
+        up-to-date ``posterior``) selects the prediction engine. ``sections``
+        limits the run to those stages and the stages they depend on.
+        """
+        started = time.perf_counter()
+        executor = None if serial else self.executor
+        stage_cache = self.stage_cache if use_cache else None
+        stages = self.required_stages(sections)
+        stage_functions = self._stage_functions(context, engine, posterior)
+        digests = self._section_digests(context, engine, stages) if stage_cache is not None else {}
+
+        results: Dict[str, Any] = {}
+        stage_ms: Dict[str, float] = {}
+        cached_stages: List[str] = []
+        pending: Dict[str, Future] = {}
+
+        for name in stages:
+            dependencies = self.STAGE_DEPENDENCIES[name]
+            task = (name, stage_functions[name], results, stage_cache, digests,
+                    stage_ms, cached_stages)
+
+            if executor is not None and name in self.STAGE_INPUTS:
+                pending[name] = executor.submit(self._run_stage, *task)
+                continue
+
+            # Wait only for the outputs this stage consumes
+            for dependency in dependencies:
+                if dependency in pending:
+                    results[dependency] = pending.pop(dependency).result()
+            results[name] = self._run_stage(*task)
+
+        for name, future in pending.items():
+            results[name] = future.result()
+
+        wall_ms = (time.perf_counter() - started) * 1000
+        total_ms = sum(stage_ms.values())
+
+        results['cachedStages'] = [name for name in self.STAGE_DEPENDENCIES if name in cached_stages]
+        results['timings'] = {
+            'executor': 'threads' if executor is not None else 'serial',
+            'stagesMs': {name: round(stage_ms[name], 2)
+                         for name in self.STAGE_DEPENDENCIES if name in stage_ms},
+            'sumOfStagesMs': round(total_ms, 2),
+            'wallClockMs': round(wall_ms, 2),
+            'savedMs': round(max(total_ms - wall_ms, 0), 2)
+        }
+        return results
+
+    def _stage_functions(self, context: AnalysisContext, engine: str = 'ensemble',
+                         posterior=None) -> Dict[str, Callable[[Dict], Any]]:
+        """Callables computing each stage from the outputs it depends on"""
+        cycles = context.cycles
+        symptoms = context.symptoms
+        health_metrics = context.health_metrics
+
+        return {
+            # 1. Advanced cycle prediction
+            'prediction': lambda r: self.cycle_predictor.predict_next_period(
+                cycles, health_metrics, context=context, engine=engine, posterior=posterior
+            ),
+            # 2. Enhanced anomaly detection
+            'anomaly': lambda r: self.cycle_predictor.detect_anomaly(
+                cycles, context=context
+            ),
+            # 3. Comprehensive cycle insights
+            'cycleInsights': lambda r: self.cycle_predictor.get_detailed_insights(
+                cycles, context=context
+            ),
+            # 4. Advanced symptom analysis
+            'symptomInsights': lambda r: self.symptom_analyzer.analyze_patterns(
+                symptoms, cycles, health_metrics, context=context
+            ) if symptoms and len(symptoms) >= 5 else None,
+            # 5. Health metrics analysis
+            'healthInsights': lambda r: self.health_tracker.comprehensive_health_analysis(
+                health_metrics, cycles, symptoms, context=context
+            ) if health_metrics else None,
+            # 6. User engagement metrics
+            'userEngagement': lambda r: calculate_user_engagement(symptoms),
+            # 7. Advanced recommendations
+            'recommendations': lambda r: self.recommender.generate_comprehensive_recommendations(
+                r['prediction'],
+                r['anomaly'],
+                r['symptomInsights'],
+                r['healthInsights'],
+                r['userEngagement'],
+                cycles
+            ),
+            # 8. Risk assessment
+            'riskAssessment': lambda r: self.recommender.assess_overall_risk(
+                r['anomaly'],
+                r['symptomInsights'],
+                r['healthInsights']
+            ),
+            # 9. Personalized insights
+            'personalizedInsights': lambda r: self.recommender.generate_personalized_insights(
+                r['prediction'],
+                r['anomaly'],
+                r['symptomInsights'],
+                r['healthInsights'],
+                r['recommendations']
+            )
+        }
+
+    def _run_stage(self, name: str, compute: Callable[[Dict], Any], results: Dict[str, Any],
+                   stage_cache: Optional[LRUCache], digests: Dict[str, str],
+                   stage_ms: Dict[str, float], cached_stages: List[str]) -> Any:
+        """Run one stage, serving it from the stage cache when possible"""
+        started = time.perf_counter()
+        try:
+            if stage_cache is None or name not in self.STAGE_INPUTS:
+                return compute(results)
+
+            key = payload_fingerprint(name, [digests[section] for section in self.STAGE_INPUTS[name]])
+
+            result = stage_cache.get(key, _MISSING)
+            if result is not _MISSING:
+                cached_stages.append(name)
+                return result
+
+            result = compute(results)
+            stage_cache.put(key, result)
+            return result
+        finally:
+            stage_ms[name] = (time.perf_counter() - started) * 1000
+
+    def _section_digests(self, context: AnalysisContext, engine: str = 'ensemble',
+                         stages: Iterable[str] = STAGE_INPUTS) -> Dict[str, str]:
+        """Hash the payload sections read by the cacheable stages among stages"""
+        sections = {
+            'userId': lambda: context.user_id,
+            'engine': lambda: engine,
+            'cycles': lambda: context.cycles,
+            'symptoms': lambda: context.symptoms,
+            'healthMetrics': lambda: context.health_metrics,
+            'cycleLengths': lambda: context.cycle_lengths.tolist(),
+            # The health stage also gates on the raw log count, and only
+            # reads the totals when health metrics were sent
+            'symptomTotals': lambda: [len(context.symptoms), context.symptom_totals.tolist()
+                                      if context.health_metrics else None]
+        }
+        needed = {section for name in stages for section in self.STAGE_INPUTS.get(name, ())}
+        return {section: payload_fingerprint(sections[section]()) for section in needed}
+
+
+def analysis_result(user_id: Optional[str], context: AnalysisContext,
+                    stages: Dict[str, Any],
+                    sections: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    The /analyze response body for one user's pipeline outputs
+
+    With ``sections``, only those outputs are included (stages that ran
+    only as dependencies are left out) and metadata lists them.
+    """
+    result = {
+        'userId': user_id,
+        'timestamp': datetime.now().isoformat()
+    }
+    for name in AnalysisPipeline.STAGE_DEPENDENCIES:
+        if sections is None or name in sections:
+            result[name] = stages[name]
+
+    prediction = stages.get('prediction')
+    result['metadata'] = {
+        'cyclesAnalyzed': len(context.cycles),
+        'symptomsAnalyzed': len(context.symptoms),
+        'hasHealthData': context.health_metrics is not None,
+        'predictionQuality': prediction.get('predictionQuality') if prediction else None,
+        'cachedStages': stages['cachedStages'],
+        'timings': stages['timings']
+    }
+    if sections is not None:
+        result['metadata']['sections'] = list(sections)
+    return result
+
+
+def calculate_user_engagement(symptoms: List[Dict]) -> Dict:
+    """Calculate user engagement metrics from symptom logs"""
+    return {
+        'daysSinceLastLog': _calculate_days_since_last_log(symptoms),
+        'totalLogs': len(symptoms),
+        'consistencyScore': min(len(symptoms) / 30, 1.0),
+        'trackingStreak': _calculate_tracking_streak(symptoms)
+    }
+
+def _calculate_days_since_last_log(symptoms):
+    """Calculate days since last symptom log"""
+    if not symptoms:
+        return 999
+
+    try:
+        last_log = symptoms[0]
+        last_date = datetime.fromisoformat(
+            last_log.get('date', last_log.get('createdAt')).replace('Z', '+00:00')
+        )
+        return (datetime.now() - last_date).days
+    except:
+        return 999
+
+def _calculate_tracking_streak(symptoms):
+    """Calculate current tracking streak"""
+    if not symptoms:
+        return 0
+
+    try:
+        dates = []
+        for log in symptoms:
+            date_str = log.get('date', log.get('createdAt'))
+            dates.append(datetime.fromisoformat(date_str.replace('Z', '+00:00')).date())
+
+        dates = sorted(set(dates), reverse=True)
+        streak = 1
+
+        for i in range(len(dates) - 1):
+            diff = (dates[i] - dates[i+1]).days
+            if diff == 1:
+                streak += 1
+            else:
+                break
+
+        return streak
+    except:
+        return 0
@@ -0,0 +1,149 @@
+# File: ai-service/services/profiling.py
+import hmac
+import json
+import os
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# (file, first line, function name) identifying a profiled function
+FrameKey = Tuple[str, int, str]
+
+PROFILE_HEADER = 'X-Profile-Token'
+
+
+def profiling_requested(token: Optional[str], secret: Optional[str]) -> bool:
+    """Whether a request's profile token matches the configured secret"""
+    if not secret or not token:
+        return False
+    return hmac.compare_digest(token.encode('utf-8'), secret.encode('utf-8'))
+
+
+def _short_path(filename: str) -> str:
+    """Path relative to site-packages or the working directory"""
+    marker = 'site-packages' + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    try:
+        relative = os.path.relpath(filename)
+    except ValueError:
+        return filename
+    return filename if relative.startswith('..') else relative
+
+
+class StackProfiler:
+    """
+    Deterministic profiler that records full call stacks
+
+    Every Python and C call in the profiled thread is timed through
+    sys.setprofile, giving per-function call counts, self and cumulative
+    time (file:line), plus collapsed stacks for flamegraph.pl / speedscope.
+    Only the thread that enters the profiler is traced.
+    """
+
+    def __init__(self):
+        # [key, started, time spent in children]
+        self._stack: List[list] = []
+        self._active: Dict[FrameKey, int] = defaultdict(int)
+        self._stats: Dict[FrameKey, List[float]] = defaultdict(lambda: [0, 0.0, 0.0])
+        self._stack_self: Dict[Tuple[FrameKey, ...], float] = defaultdict(float)
+        self.elapsed = 0.0
+
+    def __enter__(self) -> 'StackProfiler':
+        self._started = time.perf_counter()
+        sys.setprofile(self._callback)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        sys.setprofile(None)
+        now = time.perf_counter()
+        # Close frames still open when profiling stopped
+        while self._stack:
+            self._pop(now)
+        self.elapsed = now - self._started
+
+    def _callback(self, frame, event: str, arg) -> None:
+        now = time.perf_counter()
+        if event == 'call':
+            code = frame.f_code
+            self._push((code.co_filename, code.co_firstlineno, code.co_name), now)
+        elif event == 'c_call':
+            module = getattr(arg, '__module__', None) or ''
+            name = getattr(arg, '__qualname__', None) or getattr(arg, '__name__', repr(arg))
+            self._push(('~', 0, f'<built-in {module}.{name}>' if module else f'<built-in {name}>'), now)
+        elif event in ('return', 'c_return', 'c_exception') and self._stack:
+            self._pop(now)
+
+    def _push(self, key: FrameKey, now: float) -> None:
+        self._stack.append([key, now, 0.0])
+        self._active[key] += 1
+
+    def _pop(self, now: float) -> None:
+        key, started, children = self._stack.pop()
+        total = now - started
+        stats = self._stats[key]
+        stats[0] += 1
+        stats[2] += total - children
+
+        # Count recursive calls once in cumulative time
+        self._active[key] -= 1
+        if self._active[key] == 0:
+            stats[1] += total
+
+        self._stack_self[tuple(entry[0] for entry in self._stack) + (key,)] += total - children
+        if self._stack:
+            self._stack[-1][2] += total
+
+    @staticmethod
+    def _label(key: FrameKey) -> str:
+        filename, line, name = key
+        if filename == '~':
+            return name
+        return f'{name} ({_short_path(filename)}:{line})'
+
+    def top_functions(self, limit: int = 25) -> List[Dict]:
+        """Functions ordered by cumulative time"""
+        ranked = sorted(self._stats.items(), key=lambda item: item[1][1], reverse=True)
+        return [{
+            'function': key[2],
+            'file': _short_path(key[0]) if key[0] != '~' else None,
+            'line': key[1] if key[0] != '~' else None,
+            'calls': int(calls),
+            'cumulativeMs': round(cumulative * 1000, 3),
+            'selfMs': round(self_time * 1000, 3)
+        } for key, (calls, cumulative, self_time) in ranked[:limit]]
+
+    def collapsed_stacks(self) -> str:
+        """Folded stacks ('a;b;c <microseconds>'), one line per unique stack"""
+        lines = []
+        for stack, seconds in sorted(self._stack_self.items(), key=lambda item: item[1], reverse=True):
+            microseconds = int(round(seconds * 1e6))
+            if microseconds > 0:
+                frames = ';'.join(self._label(key).replace(';', ',') for key in stack)
+                lines.append(f'{frames} {microseconds}')
+        return '\n'.join(lines) + '\n'
+
+    def report(self, limit: int = 25) -> Dict:
+        return {
+            'elapsedMs': round(self.elapsed * 1000, 3),
+            'functionsProfiled': len(self._stats),
+            'topCumulative': self.top_functions(limit)
+        }
+
+    def save(self, directory: str, name: str, limit: int = 25) -> Dict[str, str]:
+        """Write the report (.json) and collapsed stacks (.folded) to directory"""
+        os.makedirs(directory, exist_ok=True)
+        stem = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{name}-{uuid.uuid4().hex[:8]}"
+
+        paths = {
+            'report': os.path.join(directory, f'{stem}.json'),
+            'collapsedStacks': os.path.join(directory, f'{stem}.folded')
+        }
+        with open(paths['report'], 'w') as f:
+            json.dump(self.report(limit), f, indent=2)
+        with open(paths['collapsedStacks'], 'w') as f:
+            f.write(self.collapsed_stacks())
+        return paths
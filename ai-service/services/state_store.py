@@ -0,0 +1,70 @@
+# File: ai-service/services/state_store.py
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+
+class UserStateStore:
+    """
+    Per-user model state kept between requests
+
+    Each user has a dict of named states guarded by that user's lock, so
+    updates for one user are serialized while other users proceed. Users
+    beyond max_users are dropped least recently used first; callers rebuild
+    a dropped state from the full history.
+    """
+
+    def __init__(self, max_users: int = 10000):
+        self.max_users = max_users
+
+        # user_id -> (lock, states)
+        self._users: 'OrderedDict[str, Tuple[threading.Lock, Dict[str, Any]]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @contextmanager
+    def session(self, user_id: str) -> Iterator[Dict[str, Any]]:
+        """Hold a user's lock and yield their (mutable) dict of states"""
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                entry = self._users[user_id] = (threading.Lock(), {})
+                self.misses += 1
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._users.move_to_end(user_id)
+                self.hits += 1
+
+        lock, states = entry
+        with lock:
+            yield states
+
+    def discard(self, user_id: str) -> None:
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """Occupancy and counters, in the same shape as LRUCache.stats()"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._users),
+                'bytes': 0,
+                'maxEntries': self.max_users,
+                'maxBytes': None,
+                'ttlSeconds': None,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': 0,
+                'hitRate': round(self.hits / lookups, 3) if lookups else None
+            }
+
+    def __len__(self) -> int:
+        return len(self._users)
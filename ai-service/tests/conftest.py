@@ -0,0 +1,6 @@
+# File: ai-service/tests/conftest.py
+import os
+import sys
+
+# Import the service modules as app.py does, from the ai-service directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,35 @@
+# File: ai-service/tests/test_analysis_context.py
+import copy
+import pytest
+from benchmark import synthetic_user
+from models.analysis_context import AnalysisContext
+
+
+def _user_with_log_values(values, health: bool):
+    """A payload whose first symptom log also carries the given values"""
+    payload = copy.deepcopy(synthetic_user(3, 6, 40, health=health))
+    payload['symptoms'][0]['symptoms'].update(values)
+    return payload
+
+
+def test_symptom_totals_sum_only_numeric_values():
+    context = AnalysisContext.from_payload([], [
+        {'date': '2024-01-02', 'symptoms': {'cramps': 3, 'mood': None, 'note': 'tired'}},
+        {'date': '2024-01-01', 'symptoms': {'cramps': 1, 'headache': 2}}
+    ])
+
+    assert context.symptom_totals.tolist() == [3.0, 3.0]
+
+
+@pytest.mark.parametrize('values', [{'cramps': None}, {'note': 'slept badly'}],
+                         ids=['null-value', 'string-key'])
+@pytest.mark.parametrize('health', [False, True], ids=['no-health', 'health'])
+@pytest.mark.parametrize('endpoint', ['/analyze', '/symptom-prediction'])
+def test_non_numeric_symptom_values_are_accepted(endpoint, health, values):
+    import app
+    payload = _user_with_log_values(values, health)
+    payload['userId'] = f'non-numeric-{endpoint}-{health}-{sorted(values)}'
+
+    response = app.app.test_client().post(endpoint, json=payload)
+
+    assert response.status_code == 200
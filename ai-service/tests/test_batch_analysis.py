@@ -0,0 +1,62 @@
+# File: ai-service/tests/test_batch_analysis.py
+import json
+import pytest
+from benchmark import synthetic_user
+from models.batch_predictor import BatchCyclePredictor
+from models.cycle_predictor import AdvancedCyclePredictor
+from services.encoding import NumpyEncoder
+
+# Below the prediction and anomaly thresholds, between them and past the ensemble's
+USERS = [synthetic_user(seed, n_cycles, 30) for seed, n_cycles in
+         [(1, 1), (2, 2), (3, 3), (4, 5), (5, 8), (6, 14)]]
+
+
+def _encoded(result) -> str:
+    return json.dumps(result, cls=NumpyEncoder, sort_keys=True)
+
+
+@pytest.fixture(scope='module')
+def predictor():
+    return AdvancedCyclePredictor(ml_mode='per_request')
+
+
+def test_batch_prediction_matches_single_user(predictor):
+    batch = BatchCyclePredictor(predictor).predict_next_period(
+        [user['cycles'] for user in USERS], [user['healthMetrics'] for user in USERS])
+
+    for user, prediction in zip(USERS, batch):
+        expected = predictor.predict_next_period(user['cycles'], user['healthMetrics'])
+        assert _encoded(prediction) == _encoded(expected)
+
+
+def test_batch_anomaly_matches_single_user(predictor):
+    batch = BatchCyclePredictor(predictor).detect_anomaly([user['cycles'] for user in USERS])
+
+    for user, anomaly in zip(USERS, batch):
+        assert _encoded(anomaly) == _encoded(predictor.detect_anomaly(user['cycles']))
+
+
+def test_batch_endpoint_keys_results_by_user():
+    import app
+    client = app.app.test_client()
+    users = [dict(user, userId=f'user-{i}') for i, user in enumerate(USERS[2:5])]
+    users.append({'userId': 'no-cycles', 'cycles': []})
+
+    response = client.post('/analyze/batch', json={'users': users})
+    body = response.get_json()
+
+    assert response.status_code == 200
+    assert body['metadata']['usersReceived'] == 4
+    assert body['metadata']['usersAnalyzed'] == 3
+    assert body['results']['no-cycles']['hasData'] is False
+    for user in users[:3]:
+        result = body['results'][user['userId']]
+        expected = app.cycle_predictor.predict_next_period(user['cycles'], user['healthMetrics'])
+        assert result['prediction'] == json.loads(_encoded(expected))
+
+
+def test_batch_endpoint_requires_users():
+    import app
+    response = app.app.test_client().post('/analyze/batch', json={'users': []})
+
+    assert response.status_code == 400
@@ -0,0 +1,113 @@
+# File: ai-service/tests/test_batch_precompute.py
+import json
+import os
+import pytest
+import batch_precompute
+from benchmark import synthetic_user
+from batch_precompute import Checkpoint
+from models.analysis_context import AnalysisContext
+from models.cycle_predictor import AdvancedCyclePredictor
+from models.health_tracker import AdvancedHealthTracker
+from models.recommender import AdvancedRecommenderSystem
+from models.symptom_analyzer import AdvancedSymptomAnalyzer
+from services.encoding import NumpyEncoder
+from services.pipeline import AnalysisPipeline, analysis_result
+
+USERS = [synthetic_user(seed, n_cycles, 40) for seed, n_cycles in
+         [(31, 3), (32, 6), (33, 9), (34, 12), (35, 4)]]
+
+
+def _stable(line: dict) -> dict:
+    """An output line without its timestamp and timings"""
+    result = line.get('result')
+    if result and 'metadata' in result:
+        result.pop('timestamp')
+        result['metadata'].pop('timings')
+    return line
+
+
+def _read_output(path) -> list:
+    with open(path) as f:
+        return [_stable(json.loads(line)) for line in f]
+
+
+@pytest.fixture
+def users_file(tmp_path):
+    path = tmp_path / 'users.jsonl'
+    lines = [json.dumps(user) for user in USERS]
+    lines.insert(2, '{"userId": "broken", "cycles": [{"startDate": "not a date"}]}')
+    path.write_text('\n'.join(lines) + '\n')
+    return path
+
+
+def _run(users_file, output, *extra) -> int:
+    return batch_precompute.main([str(users_file), '-o', str(output), '--workers', '1',
+                                  '--batch-size', '2', '--ml-mode', 'per_request', *extra])
+
+
+def test_output_matches_single_user_analysis(users_file, tmp_path):
+    output = tmp_path / 'insights.jsonl'
+    assert _run(users_file, output) == 0
+
+    pipeline = AnalysisPipeline(AdvancedCyclePredictor(ml_mode='per_request'),
+                                AdvancedSymptomAnalyzer(), AdvancedHealthTracker(),
+                                AdvancedRecommenderSystem())
+    lines = _read_output(output)
+    assert [line['userId'] for line in lines] == [user['userId'] for user in USERS[:2]] + \
+        ['broken'] + [user['userId'] for user in USERS[2:]]
+
+    for user, line in zip(USERS, lines[:2] + lines[3:]):
+        context = AnalysisContext.from_payload(user['cycles'], user['symptoms'],
+                                               user['healthMetrics'], user_id=user['userId'])
+        stages = pipeline.run(context, serial=True, use_cache=False)
+        result = analysis_result(user['userId'], context, stages)
+        expected = _stable({'userId': user['userId'],
+                            'result': json.loads(json.dumps(result, cls=NumpyEncoder))})
+        assert line == expected
+
+
+def test_bad_payload_is_reported_in_its_line(users_file, tmp_path):
+    output = tmp_path / 'insights.jsonl'
+    assert _run(users_file, output) == 0
+
+    broken = _read_output(output)[2]
+    assert broken['userId'] == 'broken'
+    assert 'result' not in broken and broken['error']
+    with open(f'{output}.checkpoint') as f:
+        assert json.load(f)['errors'] == 1
+
+
+def test_resume_after_interruption_matches_full_run(users_file, tmp_path):
+    full = tmp_path / 'full.jsonl'
+    assert _run(users_file, full) == 0
+
+    # Interrupted after the first batch, partway through writing the second
+    output = tmp_path / 'insights.jsonl'
+    with open(full, 'rb') as f:
+        first_batch = f.readline() + f.readline()
+    output.write_bytes(first_batch + b'{"userId": "partial"')
+    checkpoint = Checkpoint(f'{output}.checkpoint', [os.path.abspath(users_file)])
+    checkpoint.completed = 2
+    checkpoint.output_bytes = len(first_batch)
+    checkpoint.save()
+
+    assert _run(users_file, output) == 0
+    assert _read_output(output) == _read_output(full)
+
+
+def test_existing_output_without_checkpoint_needs_restart(users_file, tmp_path):
+    output = tmp_path / 'insights.jsonl'
+    output.write_text('kept\n')
+
+    assert _run(users_file, output) == 1
+    assert output.read_text() == 'kept\n'
+
+    assert _run(users_file, output, '--restart') == 0
+    assert len(_read_output(output)) == len(USERS) + 1
+
+
+def test_checkpoint_for_other_inputs_is_refused(users_file, tmp_path):
+    output = tmp_path / 'insights.jsonl'
+    Checkpoint(f'{output}.checkpoint', ['/elsewhere/users.jsonl']).save()
+
+    assert _run(users_file, output) == 1
@@ -0,0 +1,82 @@
+# File: ai-service/tests/test_cache.py
+import copy
+import pytest
+from benchmark import synthetic_user
+from services import cache
+from services.cache import LRUCache, payload_fingerprint
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic for TTL checks"""
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_fingerprint_ignores_key_order():
+    assert (payload_fingerprint({'a': 1, 'b': [1, 2]}, None)
+            == payload_fingerprint({'b': [1, 2], 'a': 1}, None))
+    assert payload_fingerprint({'a': 1}) != payload_fingerprint({'a': 2})
+
+
+def test_lru_evicts_least_recently_used_entry():
+    lru = LRUCache(max_entries=2, max_bytes=None)
+    lru.put('a', 1)
+    lru.put('b', 2)
+    assert lru.get('a') == 1
+
+    lru.put('c', 3)
+
+    assert lru.get('b') is None
+    assert (lru.get('a'), lru.get('c')) == (1, 3)
+    assert lru.stats()['evictions'] == 1
+
+
+def test_lru_bounds_total_bytes():
+    lru = LRUCache(max_entries=10, max_bytes=10)
+    lru.put('a', 'x' * 6)
+    lru.put('b', 'y' * 6)
+
+    assert lru.get('a') is None
+    assert lru.total_bytes == 6
+    assert not lru.put('big', 'z' * 11)
+
+
+def test_lru_expires_entries_after_ttl(clock):
+    lru = LRUCache(max_entries=10, max_bytes=None, ttl_seconds=60)
+    lru.put('a', 1)
+
+    clock[0] += 59
+    assert lru.get('a') == 1
+    clock[0] += 1
+
+    assert lru.get('a', 'missing') == 'missing'
+    assert lru.stats()['expirations'] == 1
+
+
+def test_analyze_serves_repeated_payloads_from_cache():
+    import app
+    client = app.app.test_client()
+    payload = dict(synthetic_user(11, 6, 40), userId='response-cache')
+
+    first = client.post('/analyze', json=payload)
+    second = client.post('/analyze', json=payload)
+
+    assert first.headers['X-Cache'] == 'MISS'
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.get_data() == first.get_data()
+
+
+def test_analyze_cache_misses_when_payload_changes():
+    import app
+    client = app.app.test_client()
+    payload = dict(synthetic_user(12, 6, 40), userId='response-cache-changed')
+    client.post('/analyze', json=payload)
+
+    changed = copy.deepcopy(payload)
+    changed['symptoms'][-1]['symptoms']['cramps'] = 9
+
+    assert client.post('/analyze', json=changed).headers['X-Cache'] == 'MISS'
+    other_user = dict(payload, userId='response-cache-other')
+    assert client.post('/analyze', json=other_user).headers['X-Cache'] == 'MISS'
@@ -0,0 +1,134 @@
+# File: ai-service/tests/test_coalescing.py
+import threading
+import time
+import pytest
+from benchmark import synthetic_user
+from services.coalescing import SingleFlight
+
+
+def _start(flights, key, compute, outcomes):
+    def call():
+        try:
+            outcomes.append(flights.do(key, compute))
+        except ValueError as e:
+            outcomes.append(e)
+
+    thread = threading.Thread(target=call)
+    thread.start()
+    return thread
+
+
+def _blocking(release, value):
+    calls = []
+
+    def compute():
+        calls.append(threading.current_thread())
+        release.wait(5)
+        return value() if callable(value) else value
+    return compute, calls
+
+
+def test_concurrent_callers_share_one_computation():
+    flights = SingleFlight()
+    release = threading.Event()
+    compute, calls = _blocking(release, 'body')
+    outcomes = []
+
+    threads = [_start(flights, 'key', compute, outcomes) for _ in range(4)]
+    time.sleep(0.2)
+    assert flights.stats()['inFlight'] == 1
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(outcomes) == [('body', False)] + [('body', True)] * 3
+    assert flights.stats()['executions'] == 1 and flights.stats()['coalesced'] == 3
+    assert flights.stats()['inFlight'] == 0
+
+
+def test_leader_error_reaches_followers():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        raise ValueError('stage failed')
+    compute, calls = _blocking(release, fail)
+    outcomes = []
+
+    threads = [_start(flights, 'key', compute, outcomes) for _ in range(3)]
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(outcomes) == 3
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+    assert flights.stats()['inFlight'] == 0
+
+
+def test_follower_computes_alone_after_timeout():
+    flights = SingleFlight(follower_timeout=0.05)
+    release = threading.Event()
+    compute, calls = _blocking(release, 'leader')
+    outcomes = []
+
+    leader = _start(flights, 'key', compute, outcomes)
+    time.sleep(0.1)
+    assert flights.do('key', lambda: 'follower') == ('follower', False)
+    release.set()
+    leader.join()
+
+    assert outcomes == [('leader', False)]
+    assert flights.stats()['timeouts'] == 1 and flights.stats()['executions'] == 2
+
+
+def test_different_keys_do_not_coalesce():
+    flights = SingleFlight()
+
+    assert flights.do('a', lambda: 1) == (1, False)
+    assert flights.do('b', lambda: 2) == (2, False)
+    assert flights.stats()['coalesced'] == 0
+
+
+@pytest.fixture
+def client():
+    import app
+    return app.app.test_client()
+
+
+def test_analyze_rejects_invalid_requests_before_computing(client):
+    payload = synthetic_user(91, 6, 20)
+
+    bad_engine = client.post('/analyze', json=dict(payload, engine='magic'))
+    bad_sections = client.post('/analyze', json=dict(payload, sections='prediction,weather'))
+    cycles = [dict(cycle, cycleLength=400) for cycle in payload['cycles']]
+    bad_cycles = client.post('/analyze', json=dict(payload, cycles=cycles, engine='bayesian'))
+
+    assert [bad_engine.status_code, bad_sections.status_code, bad_cycles.status_code] == \
+        [400, 400, 400]
+    assert 'weather' in bad_sections.get_json()['error']
+
+
+def test_analyze_stage_value_error_is_a_server_error(client, monkeypatch):
+    import app
+
+    def detect_anomaly(*args, **kwargs):
+        raise ValueError('anomaly stage failed')
+
+    monkeypatch.setattr(app.cycle_predictor, 'detect_anomaly', detect_anomaly)
+    response = client.post('/analyze', json=synthetic_user(92, 6, 20))
+
+    assert response.status_code == 500
+    assert response.get_json()['error'] == 'anomaly stage failed'
+
+
+def test_analyze_repeat_is_served_from_cache(client):
+    payload = synthetic_user(93, 6, 20)
+
+    first = client.post('/analyze', json=payload)
+    second = client.post('/analyze', json=payload)
+
+    assert first.headers['X-Cache'] == 'MISS' and second.headers['X-Cache'] == 'HIT'
+    assert first.get_json() == second.get_json()
@@ -0,0 +1,11 @@
+# File: ai-service/tests/test_concurrency.py
+import argparse
+import benchmark
+
+
+def test_concurrent_requests_match_serial_results():
+    # The stress check fits per-request estimators and runs every stage
+    # from many threads, comparing each output with a serial run
+    args = argparse.Namespace(users=6, threads=8, rounds=2)
+
+    assert benchmark.stress(args) == 0
@@ -0,0 +1,142 @@
+# File: ai-service/tests/test_cycle_state.py
+import os
+import subprocess
+import sys
+from datetime import date, timedelta
+import pytest
+from models.analysis_context import AnalysisContext
+from models.cycle_posterior import CycleLengthPosterior
+from models.cycle_predictor import AdvancedCyclePredictor
+from models import cycle_statistics
+from models.cycle_statistics import CycleTrendStats, match_history
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LENGTHS = [28, 30, 27, 29, 31, 26, 33, 28]
+ORDINALS = [738000 + 30 * i for i in range(len(LENGTHS))]
+
+
+def _trend_values(state: CycleTrendStats):
+    return (*state.linear_trend()[:3], *state.quadratic_trend(), state.rolling_features())
+
+
+def test_trend_sync_reuses_and_appends_matching_history():
+    state = CycleTrendStats.sync(None, LENGTHS[:-1], ORDINALS[:-1])
+
+    assert CycleTrendStats.sync(state, LENGTHS[:-1], ORDINALS[:-1]) is state
+    assert CycleTrendStats.sync(state, LENGTHS, ORDINALS) is state
+    assert _trend_values(state) == _trend_values(CycleTrendStats.sync(None, LENGTHS, ORDINALS))
+
+
+@pytest.mark.parametrize('edited', [0, 3, len(LENGTHS) - 2])
+def test_trend_sync_rebuilds_after_older_cycle_edit(edited):
+    state = CycleTrendStats.sync(None, LENGTHS, ORDINALS)
+    lengths = list(LENGTHS)
+    lengths[edited] += 9
+
+    synced = CycleTrendStats.sync(state, lengths, ORDINALS)
+
+    assert synced is not state
+    assert _trend_values(synced) == _trend_values(CycleTrendStats.sync(None, lengths, ORDINALS))
+
+
+def test_trend_sync_rebuilds_after_older_cycle_edit_with_new_cycle():
+    state = CycleTrendStats.sync(None, LENGTHS[:-1], ORDINALS[:-1])
+    lengths = list(LENGTHS)
+    lengths[1] = 40
+
+    synced = CycleTrendStats.sync(state, lengths, ORDINALS)
+
+    assert _trend_values(synced) == _trend_values(CycleTrendStats.sync(None, lengths, ORDINALS))
+
+
+def test_trend_sync_rebuilds_state_without_start_dates():
+    state = CycleTrendStats(LENGTHS)
+
+    assert CycleTrendStats.sync(state, LENGTHS, ORDINALS) is not state
+
+
+def test_match_history_rejects_other_newest_cycle_without_hashing(monkeypatch):
+    state = CycleTrendStats.sync(None, LENGTHS, ORDINALS)
+
+    def rehash(lengths, start_ordinals):
+        raise AssertionError('history was hashed')
+
+    monkeypatch.setattr(cycle_statistics, 'history_fingerprints', rehash)
+    assert match_history(state, LENGTHS[:-1] + [40], ORDINALS) == (None, None)
+    assert match_history(state, LENGTHS + [29, 30], ORDINALS + [738300, 738330]) == (None, None)
+
+
+def test_trend_sync_stamps_fingerprint_of_synced_history():
+    state = CycleTrendStats.sync(None, LENGTHS[:-1], ORDINALS[:-1])
+    CycleTrendStats.sync(state, LENGTHS, ORDINALS)
+
+    assert state.last_cycle == (ORDINALS[-1], LENGTHS[-1])
+    assert state.fingerprint == CycleTrendStats.sync(None, LENGTHS, ORDINALS).fingerprint
+    assert match_history(state, LENGTHS, ORDINALS)[0] == 'current'
+
+
+def _payload(lengths, first_start=date(2023, 1, 5)):
+    """/analyze cycles, newest first"""
+    cycles = []
+    start = first_start
+    for length in lengths:
+        cycles.append({'startDate': f'{start.isoformat()}T00:00:00.000Z', 'cycleLength': length})
+        start += timedelta(days=length)
+    return cycles[::-1]
+
+
+def _posterior_values(posterior: CycleLengthPosterior):
+    return (posterior.count, posterior.predictive(), posterior.history.summary(),
+            posterior.last_start)
+
+
+def test_posterior_reuses_and_appends_matching_history():
+    predictor = AdvancedCyclePredictor(ml_mode='per_request')
+    older = AnalysisContext.from_payload(_payload(LENGTHS[:-1]), [])
+    context = AnalysisContext.from_payload(_payload(LENGTHS), [])
+    posterior = predictor.cycle_posterior(older)
+
+    assert predictor.cycle_posterior(older, posterior) is posterior
+    assert predictor.cycle_posterior(context, posterior) is posterior
+    assert _posterior_values(posterior) == _posterior_values(predictor.cycle_posterior(context))
+
+
+@pytest.mark.parametrize('edited', [0, 3, len(LENGTHS) - 2])
+def test_posterior_rebuilds_after_older_cycle_edit(edited):
+    predictor = AdvancedCyclePredictor(ml_mode='per_request')
+    posterior = predictor.cycle_posterior(AnalysisContext.from_payload(_payload(LENGTHS), []))
+    lengths = list(LENGTHS)
+    lengths[edited] += 9
+    context = AnalysisContext.from_payload(_payload(lengths), [])
+
+    synced = predictor.cycle_posterior(context, posterior)
+    rebuilt = predictor.cycle_posterior(context)
+
+    assert synced is not posterior
+    assert _posterior_values(synced) == _posterior_values(rebuilt)
+
+
+def test_predict_for_known_user_follows_older_cycle_edit():
+    import app
+    client = app.app.test_client()
+    lengths = list(LENGTHS)
+    lengths[2] = 38
+
+    def predict(user_id, cycle_lengths):
+        response = client.post('/predict', json={'userId': user_id, 'engine': 'bayesian',
+                                                 'cycles': _payload(cycle_lengths)})
+        assert response.status_code == 200
+        return response.get_json()
+
+    predict('edited-history', LENGTHS)
+    assert predict('edited-history', lengths) == predict('fresh-history', lengths)
+
+
+def test_app_import_leaves_heavy_packages_unloaded():
+    probe = ("import sys, app; "
+             "print([name for name in ('pandas', 'scipy', 'sklearn') if name in sys.modules])")
+    completed = subprocess.run([sys.executable, '-c', probe], cwd=SERVICE_DIR,
+                               capture_output=True, text=True, check=True)
+
+    assert completed.stdout.strip().splitlines()[-1] == '[]'
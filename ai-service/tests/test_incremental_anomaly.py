@@ -0,0 +1,86 @@
+# File: ai-service/tests/test_incremental_anomaly.py
+import random
+from datetime import date, timedelta
+import numpy as np
+import pytest
+from models.cycle_predictor import AdvancedCyclePredictor
+from models.cycle_statistics import CycleLengthStats
+
+
+def _cycles(lengths):
+    """/analyze cycles for consecutive lengths, newest first"""
+    cycles, start = [], date(2022, 3, 1)
+    for length in lengths:
+        cycles.append({'startDate': f'{start.isoformat()}T00:00:00.000Z', 'cycleLength': length})
+        start += timedelta(days=length)
+    return cycles[::-1]
+
+
+def _random_lengths(seed: int, n_cycles: int):
+    rng = random.Random(seed)
+    return [rng.choice([21, 25, 26, 27, 28, 28, 29, 30, 31, 34, 45]) for _ in range(n_cycles)]
+
+
+@pytest.fixture(scope='module')
+def predictor():
+    return AdvancedCyclePredictor(ml_mode='per_request')
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_running_summary_matches_numpy(seed):
+    lengths = _random_lengths(seed, 1 + seed * 7)
+    state = CycleLengthStats(lengths)
+    values = np.array(lengths, dtype=float)
+    median = np.median(values)
+
+    assert state.summary() == pytest.approx((
+        np.mean(values), np.std(values), np.percentile(values, 25), np.percentile(values, 75),
+        median, np.median(np.abs(values - median))
+    ), abs=1e-12)
+    assert state.lengths().tolist() == sorted(values.tolist())
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_incremental_anomaly_matches_full_recomputation(predictor, seed):
+    lengths = _random_lengths(100 + seed, 25)
+    state = predictor.cycle_length_state([])
+
+    for n_cycles, length in enumerate(lengths, start=1):
+        result = predictor.detect_anomaly_incremental(state, length, verify=n_cycles > 2)
+        if n_cycles > 2:
+            assert result.pop('consistencyCheck')['matches']
+        assert result == predictor.detect_anomaly(_cycles(lengths[:n_cycles]))
+    assert state.count == len(lengths)
+
+
+@pytest.mark.parametrize('length', [0, 28.5, 181])
+def test_incremental_anomaly_rejects_invalid_lengths(predictor, length):
+    state = predictor.cycle_length_state([28, 29, 30])
+
+    with pytest.raises(ValueError):
+        predictor.detect_anomaly_incremental(state, length)
+    assert state.count == 3
+
+
+def test_incremental_anomaly_endpoint():
+    import app
+    client = app.app.test_client()
+    lengths = _random_lengths(7, 12)
+
+    first = client.post('/anomaly/incremental', json={'userId': 'incremental-user',
+                                                      'cycles': _cycles(lengths)})
+    second = client.post('/anomaly/incremental', json={'userId': 'incremental-user',
+                                                       'cycleLength': 44, 'verify': True})
+
+    assert first.status_code == second.status_code == 200
+    assert first.get_json()['cyclesTracked'] == 12
+    assert second.get_json()['cyclesTracked'] == 13
+    assert second.get_json()['anomaly']['consistencyCheck']['matches']
+    assert second.get_json()['anomaly']['detected']
+
+    unknown = client.post('/anomaly/incremental', json={'userId': 'unknown-user',
+                                                        'cycleLength': 28})
+    invalid = client.post('/anomaly/incremental', json={'userId': 'incremental-user',
+                                                        'cycleLength': 400})
+    assert unknown.status_code == 409
+    assert invalid.status_code == 400
@@ -0,0 +1,62 @@
+# File: ai-service/tests/test_metrics.py
+import pytest
+from benchmark import synthetic_user
+from services.cache import LRUCache
+from services.metrics import MetricsRegistry, cache_collector
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram('test_seconds', 'Test latency', ('stage',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, stage='parse')
+
+    lines = registry.render().splitlines()
+
+    assert '# TYPE test_seconds histogram' in lines
+    assert 'test_seconds_bucket{stage="parse",le="0.1"} 2' in lines
+    assert 'test_seconds_bucket{stage="parse",le="1"} 3' in lines
+    assert 'test_seconds_bucket{stage="parse",le="+Inf"} 4' in lines
+    assert 'test_seconds_sum{stage="parse"} 3.65' in lines
+    assert 'test_seconds_count{stage="parse"} 4' in lines
+
+
+def test_counter_requires_its_labels():
+    counter = MetricsRegistry().counter('test_total', 'Test count', ('endpoint',))
+    counter.inc(endpoint='analyze')
+    counter.inc(2, endpoint='analyze')
+
+    assert counter.collect() == ['test_total{endpoint="analyze"} 3']
+    with pytest.raises(ValueError):
+        counter.inc(stage='analyze')
+
+
+def test_cache_collector_reads_cache_stats():
+    registry = MetricsRegistry()
+    cache = LRUCache(max_entries=4, max_bytes=None)
+    registry.add_collector(cache_collector({'responses': cache}))
+    cache.put('a', 1)
+    cache.get('a')
+    cache.get('b')
+
+    lines = registry.render().splitlines()
+
+    assert 'solaris_cache_hits_total{cache="responses"} 1' in lines
+    assert 'solaris_cache_misses_total{cache="responses"} 1' in lines
+    assert 'solaris_cache_entries{cache="responses"} 1' in lines
+
+
+def test_metrics_endpoint_reports_request_and_stage_latency():
+    import app
+    client = app.app.test_client()
+    client.post('/analyze', json=dict(synthetic_user(41, 6, 30), userId='metrics-user'))
+
+    response = client.get('/metrics')
+    body = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    endpoint = 'endpoint="comprehensive_analysis"'
+    assert f'solaris_request_duration_seconds_count{{{endpoint},status="200"}}' in body
+    assert 'solaris_analyze_stage_duration_seconds_count{stage="prediction"}' in body
+    assert f'solaris_payload_items_count{{{endpoint},kind="cycles"}}' in body
@@ -0,0 +1,67 @@
+# File: ai-service/tests/test_model_cache.py
+import copy
+from datetime import date, timedelta
+import pytest
+from benchmark import _canonical, synthetic_user
+from models.analysis_context import AnalysisContext
+from models.cycle_predictor import AdvancedCyclePredictor
+from models.population_model import estimate_model_bytes
+from services.cache import LRUCache
+
+
+@pytest.fixture
+def predictor(monkeypatch):
+    """Per-request predictor with a model cache that counts estimator fits"""
+    predictor = AdvancedCyclePredictor(ml_mode='per_request', model_cache=LRUCache(
+        max_entries=16, max_bytes=64 * 1024 * 1024, sizeof=estimate_model_bytes))
+    predictor.fits = 0
+    fit_models = predictor._fit_models
+
+    def counting_fit(X, y):
+        predictor.fits += 1
+        return fit_models(X, y)
+
+    monkeypatch.setattr(predictor, '_fit_models', counting_fit)
+    return predictor
+
+
+def _predict(predictor, payload, user_id='model-cache-user'):
+    context = AnalysisContext.from_payload(payload['cycles'],
+                                           health_metrics=payload['healthMetrics'],
+                                           user_id=user_id)
+    return predictor.predict_next_period(payload['cycles'], payload['healthMetrics'],
+                                         context=context)
+
+
+@pytest.fixture
+def payload():
+    return copy.deepcopy(synthetic_user(31, 14, 10))
+
+
+def test_unchanged_history_reuses_fitted_estimators(predictor, payload):
+    first = _predict(predictor, payload)
+    second = _predict(predictor, payload)
+
+    assert predictor.fits == 1
+    assert _canonical(second) == _canonical(first)
+    assert _canonical(first) == _canonical(
+        _predict(AdvancedCyclePredictor(ml_mode='per_request'), payload))
+
+
+def test_new_cycle_refits_estimators(predictor, payload):
+    _predict(predictor, payload)
+
+    newest = payload['cycles'][0]
+    start = date.fromisoformat(newest['startDate'][:10]) + timedelta(days=newest['cycleLength'])
+    payload['cycles'].insert(0, dict(newest, startDate=f'{start}T00:00:00.000Z', cycleLength=33))
+    _predict(predictor, payload)
+
+    assert predictor.fits == 2
+
+
+def test_estimators_are_cached_per_user(predictor, payload):
+    _predict(predictor, payload, 'first-user')
+    _predict(predictor, payload, 'second-user')
+    _predict(predictor, payload, 'first-user')
+
+    assert predictor.fits == 2
@@ -0,0 +1,61 @@
+# File: ai-service/tests/test_phase_mapper.py
+import numpy as np
+import pytest
+from models.phase_mapper import PhaseMapper, phase_mapper, typical_cycle_length
+
+
+def _phase_runs(mapper: PhaseMapper, last_day: int):
+    """(phase, first day, last day) of each run of days 1..last_day"""
+    runs = []
+    for day, phase in enumerate(mapper.phases(range(1, last_day + 1)), start=1):
+        if runs and runs[-1][0] == phase:
+            runs[-1][2] = day
+        else:
+            runs.append([phase, day, day])
+    return [tuple(run) for run in runs]
+
+
+@pytest.mark.parametrize('length, runs', [
+    (20, [('menstrual', 1, 5), ('ovulation', 6, 9), ('luteal', 10, 20)]),
+    (28, [('menstrual', 1, 5), ('follicular', 6, 13), ('ovulation', 14, 17),
+          ('luteal', 18, 28)]),
+    (60, [('menstrual', 1, 5), ('follicular', 6, 45), ('ovulation', 46, 49),
+          ('luteal', 50, 60)])
+])
+def test_phase_boundaries(length, runs):
+    assert _phase_runs(PhaseMapper(length), length) == runs
+
+
+@pytest.mark.parametrize('length', [20, 28, 60])
+def test_days_outside_the_cycle(length):
+    mapper = PhaseMapper(length)
+
+    assert mapper.phase(0) is None
+    assert mapper.phase(-3) is None
+    assert mapper.phase(length + 1) == 'luteal'
+    assert mapper.phase(length + 40) == 'luteal'
+
+
+def test_vectorized_and_single_day_lookups_agree():
+    mapper = PhaseMapper(31)
+    days = np.arange(-2, 40)
+
+    assert list(mapper.phases(days)) == [mapper.phase(int(day)) for day in days]
+
+
+@pytest.mark.parametrize('requested, clamped', [(12, 20), (20, 20), (45, 45), (90, 60)])
+def test_cycle_length_is_clamped(requested, clamped):
+    assert PhaseMapper(requested).cycle_length == clamped
+    assert phase_mapper(requested).cycle_length == clamped
+
+
+@pytest.mark.parametrize('lengths, expected', [
+    ([], 28),
+    ([30], 30),
+    ([40, 40, 40, 26, 27, 28, 29, 30, 31], 28),
+    ([27, 28], 28),
+    ([29, 30], 30),
+    ([30, np.nan, 34], 32)
+])
+def test_typical_cycle_length_is_median_of_recent_cycles(lengths, expected):
+    assert typical_cycle_length(lengths) == expected
@@ -0,0 +1,103 @@
+# File: ai-service/tests/test_pipeline.py
+import copy
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import pytest
+from benchmark import _canonical, synthetic_user
+from models.analysis_context import AnalysisContext
+from models.cycle_predictor import AdvancedCyclePredictor
+from models.health_tracker import AdvancedHealthTracker
+from models.recommender import AdvancedRecommenderSystem
+from models.symptom_analyzer import AdvancedSymptomAnalyzer
+from services.cache import LRUCache
+from services.pipeline import AnalysisPipeline
+
+CYCLE_STAGES = ['prediction', 'anomaly', 'cycleInsights']
+
+
+def _pipeline(**kwargs) -> AnalysisPipeline:
+    return AnalysisPipeline(AdvancedCyclePredictor(ml_mode='per_request'),
+                            AdvancedSymptomAnalyzer(), AdvancedHealthTracker(),
+                            AdvancedRecommenderSystem(), **kwargs)
+
+
+def _context(payload, user_id='pipeline-user') -> AnalysisContext:
+    return AnalysisContext.from_payload(payload['cycles'], payload['symptoms'],
+                                        payload['healthMetrics'], user_id=user_id)
+
+
+def _outputs(stages) -> str:
+    stages = dict(stages)
+    stages.pop('timings')
+    stages.pop('cachedStages')
+    return _canonical(stages)
+
+
+@pytest.fixture
+def payload():
+    return copy.deepcopy(synthetic_user(21, 8, 60))
+
+
+def test_stage_cache_serves_unchanged_stages(payload):
+    pipeline = _pipeline(stage_cache=LRUCache(max_entries=64, max_bytes=None))
+    first = pipeline.run(_context(payload))
+    second = pipeline.run(_context(payload))
+
+    assert first['cachedStages'] == []
+    assert second['cachedStages'] == list(AnalysisPipeline.STAGE_INPUTS)
+    assert _outputs(second) == _outputs(first)
+
+
+def test_new_symptom_log_keeps_cycle_stages_cached(payload):
+    pipeline = _pipeline(stage_cache=LRUCache(max_entries=64, max_bytes=None))
+    pipeline.run(_context(payload))
+
+    last_day = date.fromisoformat(payload['symptoms'][-1]['date'][:10])
+    payload['symptoms'].append({'date': f'{last_day + timedelta(days=1)}T00:00:00.000Z',
+                                'cycleDay': 3, 'symptoms': {'cramps': 7}})
+    stages = pipeline.run(_context(payload))
+
+    assert stages['cachedStages'] == CYCLE_STAGES
+    assert _outputs(stages) == _outputs(_pipeline().run(_context(payload)))
+
+
+def test_new_cycle_invalidates_cycle_stages(payload):
+    pipeline = _pipeline(stage_cache=LRUCache(max_entries=64, max_bytes=None))
+    pipeline.run(_context(payload))
+
+    newest = payload['cycles'][0]
+    start = date.fromisoformat(newest['startDate'][:10]) + timedelta(days=newest['cycleLength'])
+    payload['cycles'].insert(0, dict(newest, startDate=f'{start}T00:00:00.000Z', cycleLength=30))
+    stages = pipeline.run(_context(payload))
+
+    assert not set(CYCLE_STAGES) & set(stages['cachedStages'])
+    assert _outputs(stages) == _outputs(_pipeline().run(_context(payload)))
+
+
+def test_stages_with_per_user_state_are_not_shared_between_users(payload):
+    pipeline = _pipeline(stage_cache=LRUCache(max_entries=64, max_bytes=None))
+    pipeline.run(_context(payload, 'first-user'))
+
+    stages = pipeline.run(_context(payload, 'second-user'))
+
+    assert stages['cachedStages'] == ['anomaly', 'cycleInsights', 'healthInsights']
+
+
+def test_use_cache_false_recomputes_every_stage(payload):
+    pipeline = _pipeline(stage_cache=LRUCache(max_entries=64, max_bytes=None))
+    pipeline.run(_context(payload))
+
+    assert pipeline.run(_context(payload), use_cache=False)['cachedStages'] == []
+
+
+@pytest.mark.parametrize('seed', [22, 23, 24])
+def test_threaded_pipeline_matches_serial(seed):
+    payload = synthetic_user(seed, 6 + seed % 5, 45, health=seed % 2 == 0)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        pipeline = _pipeline(executor=executor)
+        threaded = pipeline.run(_context(payload), use_cache=False)
+        serial = pipeline.run(_context(payload), serial=True, use_cache=False)
+
+    assert threaded['timings']['executor'] == 'threads'
+    assert serial['timings']['executor'] == 'serial'
+    assert _outputs(threaded) == _outputs(serial)
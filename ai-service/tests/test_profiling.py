@@ -0,0 +1,50 @@
+# File: ai-service/tests/test_profiling.py
+import os
+from benchmark import synthetic_user
+from services.profiling import PROFILE_HEADER, StackProfiler, profiling_requested
+
+
+def _leaf():
+    return sum(range(100))
+
+
+def _outer():
+    return [_leaf() for _ in range(3)]
+
+
+def test_profiling_requires_matching_token():
+    assert profiling_requested('secret', 'secret')
+    assert not profiling_requested('wrong', 'secret')
+    assert not profiling_requested(None, 'secret')
+    assert not profiling_requested('secret', None)
+
+
+def test_stack_profiler_counts_calls_and_stacks():
+    with StackProfiler() as profiler:
+        _outer()
+
+    calls = {row['function']: row['calls'] for row in profiler.top_functions(limit=100)}
+    assert calls['_outer'] == 1
+    assert calls['_leaf'] == 3
+    assert any('_outer' in line and '_leaf' in line
+               for line in profiler.collapsed_stacks().splitlines())
+
+
+def test_analyze_profile_only_with_token(monkeypatch, tmp_path):
+    import app
+    monkeypatch.setattr(app, 'PROFILE_SECRET', 'test-secret')
+    monkeypatch.setattr(app, 'PROFILE_DIR', str(tmp_path))
+    client = app.app.test_client()
+    payload = dict(synthetic_user(51, 6, 30), userId='profiled-user')
+
+    plain = client.post('/analyze', json=payload, headers={PROFILE_HEADER: 'wrong'})
+    profiled = client.post('/analyze', json=payload, headers={PROFILE_HEADER: 'test-secret'})
+
+    assert 'profile' not in plain.get_json()
+    profile = profiled.get_json()['profile']
+    assert profile['topCumulative']
+    assert 'X-Profile-Elapsed-Ms' in profiled.headers
+    # Profiled requests recompute instead of reading the response cache
+    assert profiled.headers['X-Cache'] == 'MISS'
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(path)
+                                                  for path in profile['files'].values())
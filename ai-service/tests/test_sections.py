@@ -0,0 +1,104 @@
+# File: ai-service/tests/test_sections.py
+import pytest
+from benchmark import _canonical, synthetic_user
+from models.analysis_context import AnalysisContext
+from models.cycle_predictor import AdvancedCyclePredictor
+from models.health_tracker import AdvancedHealthTracker
+from models.recommender import AdvancedRecommenderSystem
+from models.symptom_analyzer import AdvancedSymptomAnalyzer
+from services.pipeline import AnalysisPipeline, analysis_result
+
+PAYLOAD = synthetic_user(25, 8, 60)
+
+
+def _pipeline() -> AnalysisPipeline:
+    return AnalysisPipeline(AdvancedCyclePredictor(ml_mode='per_request'),
+                            AdvancedSymptomAnalyzer(), AdvancedHealthTracker(),
+                            AdvancedRecommenderSystem())
+
+
+def _context(user_id='sections-user') -> AnalysisContext:
+    return AnalysisContext.from_payload(PAYLOAD['cycles'], PAYLOAD['symptoms'],
+                                        PAYLOAD['healthMetrics'], user_id=user_id)
+
+
+@pytest.fixture(scope='module')
+def full_run():
+    return _pipeline().run(_context(), serial=True, use_cache=False)
+
+
+@pytest.mark.parametrize('sections, expected', [
+    (None, None),
+    ('', None),
+    ([], None),
+    ('anomaly', ('anomaly',)),
+    ('riskAssessment, prediction', ('prediction', 'riskAssessment')),
+    (['userEngagement', 'anomaly', 'anomaly'], ('anomaly', 'userEngagement')),
+])
+def test_parse_sections(sections, expected):
+    assert AnalysisPipeline.parse_sections(sections) == expected
+
+
+def test_parse_sections_rejects_unknown_names():
+    with pytest.raises(ValueError, match='weather'):
+        AnalysisPipeline.parse_sections('prediction,weather')
+
+
+@pytest.mark.parametrize('sections, expected', [
+    (None, tuple(AnalysisPipeline.STAGE_DEPENDENCIES)),
+    (('anomaly',), ('anomaly',)),
+    (('riskAssessment',), ('anomaly', 'symptomInsights', 'healthInsights', 'riskAssessment')),
+    (('recommendations',), ('prediction', 'anomaly', 'symptomInsights', 'healthInsights',
+                            'userEngagement', 'recommendations')),
+    (('personalizedInsights',), ('prediction', 'anomaly', 'symptomInsights', 'healthInsights',
+                                 'userEngagement', 'recommendations', 'personalizedInsights')),
+])
+def test_required_stages_include_dependencies(sections, expected):
+    assert AnalysisPipeline.required_stages(sections) == expected
+
+
+@pytest.mark.parametrize('sections', [('prediction', 'anomaly'), ('riskAssessment',),
+                                      ('personalizedInsights',), ('userEngagement',)])
+def test_section_run_matches_full_run(full_run, sections):
+    stages = _pipeline().run(_context(), serial=True, use_cache=False, sections=sections)
+    required = AnalysisPipeline.required_stages(sections)
+
+    assert list(stages['timings']['stagesMs']) == list(required)
+    for name in AnalysisPipeline.STAGE_DEPENDENCIES:
+        if name in required:
+            assert _canonical(stages[name]) == _canonical(full_run[name])
+        else:
+            assert name not in stages
+
+
+def test_analysis_result_includes_only_requested_sections(full_run):
+    sections = ('anomaly', 'riskAssessment')
+    result = analysis_result('sections-user', _context(), full_run, sections)
+
+    assert [name for name in AnalysisPipeline.STAGE_DEPENDENCIES if name in result] == \
+        list(sections)
+    assert result['metadata']['sections'] == list(sections)
+    assert 'sections' not in analysis_result('sections-user', _context(), full_run)['metadata']
+
+
+def test_analyze_endpoint_returns_requested_sections():
+    import app
+    client = app.app.test_client()
+    payload = dict(PAYLOAD, userId='sections-endpoint')
+
+    partial = client.post('/analyze', json=dict(payload, sections='anomaly,userEngagement'))
+    full = client.post('/analyze', json=payload)
+
+    assert partial.status_code == 200 and full.status_code == 200
+    body = partial.get_json()
+    assert body['metadata']['sections'] == ['anomaly', 'userEngagement']
+    assert 'prediction' not in body and 'recommendations' not in body
+    assert body['anomaly'] == full.get_json()['anomaly']
+
+
+def test_analyze_endpoint_rejects_unknown_sections():
+    import app
+    response = app.app.test_client().post('/analyze', json=dict(PAYLOAD, sections=['forecast']))
+
+    assert response.status_code == 400
+    assert 'forecast' in response.get_json()['error']
@@ -0,0 +1,239 @@
+# File: ai-service/tests/test_symptom_analyzer.py
+import random
+from collections import Counter
+import numpy as np
+import pandas as pd
+import pytest
+from models.phase_mapper import PHASES
+from models.symptom_analyzer import AdvancedSymptomAnalyzer
+from services.cache import LRUCache
+
+SYMPTOMS = ['cramps', 'headache', 'bloating', 'fatigue', 'mood']
+
+
+@pytest.fixture(scope='module')
+def analyzer():
+    return AdvancedSymptomAnalyzer()
+
+
+def _random_frame(seed: int, n_days: int) -> pd.DataFrame:
+    rng = random.Random(seed)
+    return pd.DataFrame({s_type: [rng.choice([0, 0, 2, 4, 5, 7, 9]) for _ in range(n_days)]
+                         for s_type in SYMPTOMS})
+
+
+def _counter_combinations(df: pd.DataFrame) -> dict:
+    """The row-by-row Counter mining the bitmask version replaced"""
+    combinations = []
+    for _, row in df.iterrows():
+        active = [s for s in SYMPTOMS if row[s] > 3]
+        if len(active) >= 2:
+            combinations.append(tuple(sorted(active)))
+    counts = Counter(combinations)
+    return {
+        'topCombinations': [{'symptoms': list(combo), 'frequency': count,
+                             'percentage': round(count / len(df) * 100, 1)}
+                            for combo, count in counts.most_common(5)],
+        'totalCombinations': len(combinations),
+        'uniqueCombinations': len(counts)
+    }
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_combinations_match_counter_mining(analyzer, seed):
+    df = _random_frame(seed, 10 + seed * 7)
+
+    result = analyzer._analyze_symptom_combinations(df, SYMPTOMS)
+    expected = _counter_combinations(df)
+
+    for field, value in expected.items():
+        assert result[field] == value
+
+
+def test_pairwise_cooccurrence_counts_days_active_together(analyzer):
+    df = pd.DataFrame({'cramps': [5, 5, 5, 0], 'headache': [4, 0, 0, 8], 'mood': [9, 9, 9, 9]})
+
+    result = analyzer._analyze_symptom_combinations(df, ['cramps', 'headache', 'mood'])
+
+    assert result['pairwiseCooccurrence'] == [
+        {'symptoms': ['cramps', 'mood'], 'frequency': 3, 'percentage': 75.0},
+        {'symptoms': ['headache', 'mood'], 'frequency': 2, 'percentage': 50.0},
+        {'symptoms': ['cramps', 'headache'], 'frequency': 1, 'percentage': 25.0}
+    ]
+
+
+def test_combinations_need_two_active_symptoms(analyzer):
+    df = pd.DataFrame({'cramps': [5, 0], 'headache': [0, 6]})
+
+    assert analyzer._analyze_symptom_combinations(df, ['cramps', 'headache']) == {
+        'status': 'no_combinations_found'}
+    assert analyzer._analyze_symptom_combinations(df, ['cramps']) == {
+        'status': 'insufficient_symptoms'}
+
+
+def _loop_peaks(values) -> dict:
+    """The element loop the shifted comparisons replaced"""
+    if len(values) < 3:
+        return {'count': 0, 'averageIntensity': 0}
+    peaks = [values[i] for i in range(1, len(values) - 1)
+             if values[i] > values[i - 1] and values[i] > values[i + 1] and values[i] >= 6]
+    return {
+        'count': len(peaks),
+        'averageIntensity': round(float(np.mean(peaks)), 1) if peaks else 0,
+        'maxIntensity': float(max(peaks)) if peaks else 0,
+        'frequency': round(len(peaks) / len(values), 2)
+    }
+
+
+def _loop_persistence(values) -> dict:
+    """The element loop the run-length encoding replaced"""
+    if len(values) == 0:
+        return {'averageDuration': 0, 'longestStreak': 0}
+    streaks, current = [], 0
+    for value in values:
+        if value > 0:
+            current += 1
+        else:
+            if current:
+                streaks.append(current)
+            current = 0
+    if current:
+        streaks.append(current)
+    return {
+        'averageDuration': round(float(np.mean(streaks)), 1) if streaks else 0,
+        'longestStreak': int(max(streaks)) if streaks else 0,
+        'shortestStreak': int(min(streaks)) if streaks else 0,
+        'totalEpisodes': len(streaks)
+    }
+
+
+@pytest.mark.parametrize('n_days', [0, 1, 2, 3, 17, 90, 365])
+def test_peaks_and_streaks_match_element_loops(analyzer, n_days):
+    rng = np.random.default_rng(n_days)
+    values = rng.choice([0, 0, 0, 1, 3, 6, 7, 9, 10], size=(12, n_days)).astype(float)
+
+    peaks = analyzer._detect_peaks_matrix(values)
+    persistence = analyzer._analyze_persistence_matrix(values)
+
+    assert peaks == [_loop_peaks(row) for row in values]
+    assert persistence == [_loop_persistence(row) for row in values]
+
+
+def test_streaks_at_both_ends(analyzer):
+    assert analyzer._analyze_persistence(np.array([3, 1, 0, 0, 5, 0, 2, 2, 2])) == {
+        'averageDuration': 2.0, 'longestStreak': 3, 'shortestStreak': 1, 'totalEpisodes': 3}
+    assert analyzer._detect_peaks(np.array([9, 7, 8, 6, 6, 10, 2]))['count'] == 2
+
+
+def _clustered_days(n_days: int, seed: int = 0) -> pd.DataFrame:
+    """Symptom days drawn around three well separated profiles"""
+    rng = np.random.default_rng(seed)
+    profiles = np.array([[0, 0, 1, 0, 1], [8, 7, 2, 6, 3], [2, 1, 8, 2, 9]], dtype=float)
+    rows = profiles[rng.integers(0, 3, n_days)] + rng.normal(0, 0.5, (n_days, 5))
+    return pd.DataFrame(np.clip(rows, 0, 10).round(), columns=SYMPTOMS)
+
+
+def _inertia(df: pd.DataFrame, result: dict) -> float:
+    """Within-cluster sum of squares with each day assigned to its nearest profile"""
+    labels = _labels(df, result)
+    return float(sum(((df[labels == k] - df[labels == k].mean()) ** 2).to_numpy().sum()
+                     for k in set(labels)))
+
+
+def _labels(df: pd.DataFrame, result: dict) -> np.ndarray:
+    """Nearest profile of each day"""
+    profiles = np.array([[profile['symptomProfile'][s] for s in SYMPTOMS]
+                         for profile in result['profiles'].values()])
+    distances = ((df.to_numpy()[:, None, :] - profiles[None, :, :]) ** 2).sum(axis=2)
+    return distances.argmin(axis=1)
+
+
+@pytest.mark.parametrize('n_days', [60, 400])
+def test_fast_clustering_is_deterministic_and_close_to_full(n_days):
+    df = _clustered_days(n_days)
+    full = AdvancedSymptomAnalyzer(cluster_mode='full')._cluster_symptom_days(df, SYMPTOMS)
+    fast = AdvancedSymptomAnalyzer(cluster_mode='fast')._cluster_symptom_days(df, SYMPTOMS)
+    again = AdvancedSymptomAnalyzer(cluster_mode='fast')._cluster_symptom_days(df, SYMPTOMS)
+
+    assert fast['status'] == 'success'
+    assert fast == again
+    assert _inertia(df, fast) <= 1.05 * _inertia(df, full)
+
+
+def test_fast_clustering_warm_starts_from_the_users_centroids():
+    cache = LRUCache(max_entries=16, max_bytes=None)
+    analyzer = AdvancedSymptomAnalyzer(cluster_mode='fast', centroid_cache=cache)
+    df = _clustered_days(80)
+
+    first = analyzer._cluster_symptom_days(df, SYMPTOMS, user_id='clustered-user')
+    assert len(cache) == 1
+    warm = analyzer._cluster_symptom_days(df, SYMPTOMS, user_id='clustered-user')
+
+    assert cache.stats()['hits'] == 1
+    assert warm == first
+
+    analyzer._cluster_symptom_days(df, SYMPTOMS, user_id='other-user')
+    analyzer._cluster_symptom_days(df, SYMPTOMS)
+    assert cache.stats()['hits'] == 1
+    assert len(cache) == 2
+
+
+def _phase_and_weekday_frame(seed: int, n_days: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.choice([0, 0, 1, 3, 5, 8], size=(n_days, len(SYMPTOMS))).astype(float),
+                      columns=SYMPTOMS)
+    df.loc[rng.random(n_days) < 0.1, 'mood'] = np.nan
+    df['phase'] = rng.choice(['menstrual', 'follicular', 'ovulation', 'luteal', None], n_days)
+    df['dayOfWeek'] = rng.integers(0, 7, n_days)
+    return df
+
+
+def _filtered_phase_stats(df: pd.DataFrame) -> dict:
+    """Per-phase statistics from filtering the frame per phase and symptom"""
+    by_phase = {}
+    for phase in PHASES:
+        phase_df = df[df['phase'] == phase]
+        if len(phase_df) == 0:
+            continue
+        by_phase[phase] = {}
+        for s_type in SYMPTOMS:
+            values = phase_df[s_type].dropna()
+            if len(values) > 0:
+                frequency = len(values[values > 0]) / len(values)
+                by_phase[phase][s_type] = {
+                    'average': round(float(values.mean()), 1),
+                    'median': round(float(values.median()), 1),
+                    'frequency': round(float(frequency), 2),
+                    'maximum': float(values.max()),
+                    'daysTracked': len(values)
+                }
+    return by_phase
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_grouped_phase_statistics_match_filtered_frames(analyzer, seed):
+    df = _phase_and_weekday_frame(seed, 20 + 60 * seed)
+
+    by_phase = analyzer._analyze_phase_correlations(df, SYMPTOMS)['byPhase']
+    for symptoms in by_phase.values():
+        for stats in symptoms.values():
+            stats.pop('likelihood')
+
+    assert by_phase == _filtered_phase_stats(df)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_grouped_weekday_patterns_match_groupby(analyzer, seed):
+    df = _phase_and_weekday_frame(seed, 20 + 60 * seed)
+
+    patterns = analyzer._detect_temporal_patterns(df, SYMPTOMS)['dayOfWeek']
+
+    for s_type in SYMPTOMS:
+        weekday_avg = df.groupby('dayOfWeek')[s_type].mean()
+        weekend = df[df['dayOfWeek'] >= 5][s_type].mean()
+        weekday = df[df['dayOfWeek'] < 5][s_type].mean()
+        assert patterns[s_type]['worst_day'] == int(weekday_avg.idxmax())
+        assert patterns[s_type]['best_day'] == int(weekday_avg.idxmin())
+        assert patterns[s_type]['worst_day_avg'] == round(float(weekday_avg.max()), 1)
+        assert patterns[s_type]['weekend_vs_weekday'] == analyzer._compare_weekend_weekday(
+            weekend, weekday)
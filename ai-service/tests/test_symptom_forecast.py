@@ -0,0 +1,65 @@
+# File: ai-service/tests/test_symptom_forecast.py
+import pytest
+from benchmark import synthetic_user
+from models.analysis_context import AnalysisContext
+from models.symptom_analyzer import AdvancedSymptomAnalyzer
+
+
+@pytest.fixture(scope='module')
+def analyzer():
+    return AdvancedSymptomAnalyzer()
+
+
+@pytest.fixture(scope='module')
+def payload():
+    return synthetic_user(61, 8, 120)
+
+
+def test_forecast_rows_match_single_day_predictions(analyzer, payload):
+    context = AnalysisContext.from_payload(payload['cycles'], payload['symptoms'])
+    forecast = analyzer.forecast_cycle([], [], context=context)
+    ranges = forecast['probabilityRange']
+
+    assert forecast['cycleDays'] == list(range(1, forecast['cycleLength'] + 1))
+    for d, cycle_day in enumerate(forecast['cycleDays']):
+        day = analyzer.predict_symptom_likelihood([], cycle_day, [], context=context)
+        assert forecast['phases'][d] == day['phase']
+        assert forecast['outlook'][d] == day['overallOutlook']['level']
+        for j, s_type in enumerate(forecast['symptoms']):
+            prediction = day['predictions'].get(s_type)
+            if prediction is None:
+                assert forecast['predicted'][d][j] is None
+                continue
+            assert forecast['predicted'][d][j] == prediction['predicted']
+            assert ranges['lower'][d][j] == prediction['probabilityRange']['lower']
+            assert ranges['upper'][d][j] == prediction['probabilityRange']['upper']
+            assert forecast['frequency'][d][j] == prediction['frequency']
+            assert forecast['confidence'][d][j] == prediction['confidence']
+
+
+@pytest.mark.parametrize('requested, expected', [(21, 21), (75, 60), (0, 1)])
+def test_forecast_cycle_length_is_bounded(analyzer, payload, requested, expected):
+    forecast = analyzer.forecast_cycle(payload['symptoms'], payload['cycles'], requested)
+
+    assert forecast['cycleLength'] == expected
+    assert len(forecast['predicted']) == len(forecast['phases']) == expected
+
+
+def test_forecast_needs_ten_symptom_logs(analyzer, payload):
+    forecast = analyzer.forecast_cycle(payload['symptoms'][:9], payload['cycles'])
+
+    assert forecast['hasData'] is False
+    assert forecast['current'] == 9
+
+
+def test_symptom_prediction_endpoint_cycle_mode(payload):
+    import app
+    response = app.app.test_client().post('/symptom-prediction', json={
+        'mode': 'cycle', 'cycleLength': 30,
+        'symptoms': payload['symptoms'], 'cycles': payload['cycles']
+    })
+    body = response.get_json()
+
+    assert response.status_code == 200
+    assert body['cycleLength'] == 30
+    assert set(body['phaseOutlook']) == set(body['phases'])
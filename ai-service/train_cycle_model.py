@@ -0,0 +1,84 @@
+# File: ai-service/train_cycle_model.py
+"""
+Train the population cycle-length model offline
+
+Reads user payloads shaped like the /analyze body ({"cycles": [...],
+"healthMetrics": {...}}), either one JSON object per line or a JSON list /
+{"users": [...]} document, and writes a versioned joblib artifact.
+
+    python train_cycle_model.py users.jsonl -o models/artifacts/cycle_population.joblib
+
+Point CYCLE_MODEL_PATH at the artifact to serve it.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+from typing import Dict, Iterator
+from models.analysis_context import AnalysisContext
+from models.population_model import PopulationCycleModel
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT = os.path.join('models', 'artifacts', 'cycle_population.joblib')
+
+
+def read_payloads(path: str) -> Iterator[Dict]:
+    """Yield user payloads from a JSON Lines or JSON file"""
+    with open(path) as f:
+        text = f.read()
+
+    try:
+        document = json.loads(text)
+    except json.JSONDecodeError:
+        document = None
+
+    if isinstance(document, dict):
+        yield from document.get('users', [document])
+    elif isinstance(document, list):
+        yield from document
+    else:
+        for line in text.splitlines():
+            if line.strip():
+                yield json.loads(line)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('input', help='JSON Lines or JSON file of user payloads')
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT,
+                        help=f'artifact path (default: {DEFAULT_OUTPUT})')
+    parser.add_argument('--n-estimators', type=int, default=50)
+    parser.add_argument('--random-state', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    frames = (
+        AnalysisContext.from_payload(
+            payload.get('cycles', []),
+            health_metrics=payload.get('healthMetrics')
+        ).cycle_frame
+        for payload in read_payloads(args.input)
+    )
+
+    model = PopulationCycleModel(n_estimators=args.n_estimators,
+                                 random_state=args.random_state).fit(frames)
+
+    if not model.estimators:
+        logger.error("No user had enough cycles to train on")
+        return 1
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    model.save(args.output)
+
+    logger.info(f"Saved cycle model {model.version} to {args.output}")
+    for name, counts in model.metadata['samples'].items():
+        logger.info(f"  {name}: {counts['cycles']} cycles from {counts['users']} users")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
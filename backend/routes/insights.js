@@ -8,6 +8,37 @@ const SymptomLog = require('../models/SymptomLog');
 const auth = require('../middleware/auth');
 const { pool } = require('../config/database');
 
+// Phase of a cycle day for a cycle of cycleLength days. Mirrors the AI
+// service's PhaseMapper: ovulation is anchored 14 days before the end of the
+// cycle, and days past the cycle length stay in the luteal phase.
+function phaseForCycleDay(cycleDay, cycleLength) {
+  const length = Math.min(Math.max(Math.round(cycleLength), 20), 60);
+  if (cycleDay < 1) return 'unknown';
+  if (cycleDay <= 5) return 'menstrual';
+  if (cycleDay <= length - 15) return 'follicular';
+  if (cycleDay <= length - 11) return 'ovulation';
+  return 'luteal';
+}
+
+// Cycle length the phases are mapped with. Mirrors the AI service's
+// typical_cycle_length: median of the 6 most recent logged lengths (rounded
+// half to even, as Python's round), or 28. cycles are ordered newest first.
+function typicalCycleLength(cycles, recent = 6) {
+  const lengths = cycles
+    .filter(c => c.cycle_length)
+    .slice(0, recent)
+    .map(c => Number(c.cycle_length))
+    .sort((a, b) => a - b);
+  if (lengths.length === 0) return 28;
+
+  const middle = Math.floor(lengths.length / 2);
+  const median = lengths.length % 2
+    ? lengths[middle]
+    : (lengths[middle - 1] + lengths[middle]) / 2;
+  const rounded = Math.round(median);
+  return rounded - median === 0.5 && rounded % 2 ? rounded - 1 : rounded;
+}
+
 // Get current cycle insights with AI predictions
 router.get('/current', auth, async (req, res) => {
   try {
@@ -29,17 +60,8 @@ router.get('/current', auth, async (req, res) => {
     const stats = await Cycle.getAverageCycleLength(req.userId);
     const avgCycleLength = stats.avg_length ? parseFloat(stats.avg_length) : 28;
 
-    // Determine current phase
-    let currentPhase = 'unknown';
-    if (daysSinceStart >= 0 && daysSinceStart <= 5) {
-      currentPhase = 'menstrual';
-    } else if (daysSinceStart > 5 && daysSinceStart <= 13) {
-      currentPhase = 'follicular';
-    } else if (daysSinceStart > 13 && daysSinceStart <= 17) {
-      currentPhase = 'ovulation';
-    } else {
-      currentPhase = 'luteal';
-    }
+    // Determine current phase (cycle day 1 is the start date)
+    const currentPhase = phaseForCycleDay(daysSinceStart + 1, typicalCycleLength(cycles));
 
     // Try to get AI prediction
     let aiInsights = null;